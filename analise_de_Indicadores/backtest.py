@@ -0,0 +1,235 @@
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+
+# Matrizes do backtest no processo worker (preenchidas pelo initializer do pool)
+_WORKER_BACKTESTER = None
+
+# Defasagem entre a data de referência do VP (fim do trimestre) e a sua divulgação: no backtest o VP só
+# entra no sinal de P/VP depois dela, para não ranquear com um relatório que ainda não era público
+VP_PUBLICATION_LAG = pd.Timedelta(days=45)
+
+def param_grid(**options):
+    """
+    Gera a lista de combinações de parâmetros (produto cartesiano).
+    Ex.: param_grid(signal=['P_VP'], quantile=[0.1, 0.2], min_liquidity=[0, 1e6])
+    """
+    keys = list(options)
+    return [dict(zip(keys, values)) for values in itertools.product(*options.values())]
+
+class Backtester:
+    """
+    Backtest de carteiras de FIIs com rebalanceamento mensal e reinvestimento de proventos.
+    Tudo é calculado sobre matrizes mês x ticker (preço, provento, P/VP, DY 12M e liquidez),
+    montadas uma única vez a partir do IndicadoresCalculator.
+
+    Parâmetros de estratégia aceitos por run():
+    - signal: coluna usada no ranking ('P_VP' ou 'DY_12M')
+    - ascending: True escolhe os menores valores (ex.: menor P/VP), False os maiores (ex.: maior DY)
+    - quantile: fração do universo elegível comprada (0.1 = decil) ou
+    - top_n: número fixo de ativos (tem prioridade sobre quantile)
+    - min_liquidity: volume financeiro médio diário mínimo (R$) no mês da decisão
+    - cost_bps: custo de transação em pontos-base sobre o giro da carteira
+    - risk_free: taxa livre de risco anual (ex.: 0.10 para CDI de 10%) usada no Sharpe
+
+    O P/VP das matrizes é point-in-time: VPs históricos só valem depois de vp_lag (padrão
+    VP_PUBLICATION_LAG) e meses sem relatório divulgado ficam sem sinal, em vez de usar o VP atual.
+    """
+
+    DEFAULT_PARAMS = {
+        'signal': 'P_VP',
+        'ascending': True,
+        'quantile': 0.1,
+        'top_n': None,
+        'min_liquidity': 0,
+        'cost_bps': 0,
+        'risk_free': 0.0,
+    }
+
+    def __init__(self, calc=None, *, matrices=None, start=None, end=None, vp_lag=VP_PUBLICATION_LAG):
+        if matrices is None:
+            matrices = self._build_matrices(calc, vp_lag)
+        if start is not None or end is not None:
+            matrices = {name: df.loc[start:end] for name, df in matrices.items()}
+        self.matrices = matrices
+
+        close = matrices['Close']
+        dividend = matrices['Dividend'].reindex_like(close).fillna(0)
+        # Retorno total do mês com o provento reinvestido: (P_t + D_t) / P_{t-1} - 1
+        self.returns = (close + dividend) / close.shift(1) - 1
+
+    @staticmethod
+    def _build_matrices(calc, vp_lag=VP_PUBLICATION_LAG):
+        df_price = calc.get_price_panel('M')
+        if df_price.empty:
+            raise ValueError("Sem cotações para montar o backtest.")
+        close = df_price.pivot(index='Date', columns='Ticker', values='Close')
+
+        matrices = {'Close': close}
+
+        matrices['P_VP'] = Backtester._point_in_time_pvp(df_price, calc._get_vp_events_panel(), vp_lag)
+
+        df_dy = calc.get_dy_panel()
+        if not df_dy.empty:
+            matrices['Dividend'] = df_dy.pivot(index='Date', columns='Ticker', values='Dividend')
+            # DY 12M vale até o próximo provento (no máximo 12 meses)
+            matrices['DY_12M'] = (df_dy.pivot(index='Date', columns='Ticker', values='DY_12M')
+                                  .reindex(close.index).ffill(limit=11))
+        else:
+            matrices['Dividend'] = pd.DataFrame(index=close.index)
+            matrices['DY_12M'] = pd.DataFrame(index=close.index)
+
+        matrices['Liquidez'] = Backtester._monthly_liquidity(calc)
+        return {name: df.reindex(index=close.index, columns=close.columns) for name, df in matrices.items()}
+
+    @staticmethod
+    def _point_in_time_pvp(df_price, df_vp, vp_lag=VP_PUBLICATION_LAG):
+        """
+        P/VP mensal (mês x ticker) só com os VPs já divulgados em cada mês: os eventos de VP
+        [Ticker, Date, VP_Cota] são deslocados por vp_lag antes do merge_asof e, diferente de
+        get_pvp_panel, não há complemento com o VP atual (sem relatório divulgado o P/VP fica NaN).
+        """
+        if df_vp.empty:
+            return pd.DataFrame(index=df_price['Date'].unique())
+        eventos = df_vp[['Ticker', 'Date', 'VP_Cota']].assign(Date=df_vp['Date'] + vp_lag)
+        eventos = eventos.astype({'Date': 'datetime64[ns]'}).sort_values('Date', kind='stable')
+        precos = df_price[['Ticker', 'Date', 'Close']].astype({'Date': 'datetime64[ns]'}).sort_values('Date', kind='stable')
+        merged = pd.merge_asof(precos, eventos, on='Date', by='Ticker', direction='backward')
+        merged['P_VP'] = merged['Close'] / merged['VP_Cota']
+        return merged.pivot(index='Date', columns='Ticker', values='P_VP')
+
+    @staticmethod
+    def _monthly_liquidity(calc):
+        """Volume financeiro médio diário (Close x Volume) por mês e ticker."""
+        df = calc.df_yahoo
+        if df.empty or 'Volume' not in df.columns:
+            return pd.DataFrame()
+        if 'Intervalo' in df.columns:
+            df = df[df['Intervalo'] == '1d']
+        df = df[['Ticker', 'Date', 'Close', 'Volume']].dropna()
+        codes, uniques = pd.factorize(df['Ticker'])
+        tickers = pd.Index(uniques).astype(str).str.removesuffix('.SA').to_numpy()[codes]
+        mes = df['Date'].dt.to_period('M').dt.to_timestamp(how='end').dt.normalize().astype('datetime64[ns]')
+        financeiro = (df['Close'] * df['Volume']).groupby([mes.values, tickers]).mean()
+        return financeiro.unstack()
+
+    def weights(self, params):
+        """Pesos (mês x ticker) definidos no fechamento de cada mês, iguais entre os selecionados."""
+        p = {**self.DEFAULT_PARAMS, **params}
+        signal = self.matrices[p['signal']]
+
+        elegivel = signal.notna() & self.matrices['Close'].notna()
+        if p['min_liquidity']:
+            elegivel &= self.matrices['Liquidez'] >= p['min_liquidity']
+
+        ranks = signal.where(elegivel).rank(axis=1, ascending=p['ascending'], method='first')
+        if p['top_n']:
+            n_sel = pd.Series(p['top_n'], index=signal.index)
+        else:
+            n_sel = np.ceil(elegivel.sum(axis=1) * p['quantile'])
+        selecionados = ranks.le(n_sel, axis=0)
+
+        return selecionados.div(selecionados.sum(axis=1), axis=0).fillna(0)
+
+    def run(self, params):
+        """
+        Executa uma estratégia. Retorna dict com 'params', 'returns' (Series mensal líquida de custos),
+        'equity' (curva acumulada), 'weights' e 'stats'.
+        """
+        p = {**self.DEFAULT_PARAMS, **params}
+        w = self.weights(p)
+
+        # Pesos decididos em t-1 valem durante o mês t; ativos sem retorno no mês são redistribuídos
+        w_prev = w.shift(1).fillna(0)
+        disponivel = self.returns.notna()
+        w_eff = w_prev.where(disponivel, 0)
+        w_eff = w_eff.div(w_eff.sum(axis=1).replace(0, np.nan), axis=0)
+        bruto = (w_eff * self.returns.fillna(0)).sum(axis=1, min_count=1)
+
+        giro = (w - w_prev).abs().sum(axis=1) / 2
+        liquido = bruto - giro.shift(1).fillna(0) * p['cost_bps'] / 1e4
+
+        # Começa no primeiro mês com carteira montada
+        investido = w_eff.sum(axis=1) > 0
+        liquido = liquido[investido.cummax()].fillna(0)
+        equity = (1 + liquido).cumprod()
+
+        return {
+            'params': p,
+            'returns': liquido,
+            'equity': equity,
+            'weights': w,
+            'stats': self._stats(liquido, equity, giro[liquido.index], p['risk_free']),
+        }
+
+    @staticmethod
+    def _stats(returns, equity, giro, risk_free=0.0):
+        n = len(returns)
+        if n == 0:
+            return {'meses': 0}
+        anos = n / 12
+        vol = returns.std() * math.sqrt(12) if n > 1 else np.nan
+        cagr = equity.iloc[-1] ** (1 / anos) - 1 if equity.iloc[-1] > 0 else -1.0
+        # Sharpe anualizado: média do excesso de retorno mensal / desvio mensal x raiz de 12
+        excesso = returns - ((1 + risk_free) ** (1 / 12) - 1)
+        return {
+            'meses': n,
+            'retorno_total': equity.iloc[-1] - 1,
+            'cagr': cagr,
+            'volatilidade': vol,
+            'sharpe': excesso.mean() / returns.std() * math.sqrt(12) if vol and not np.isnan(vol) else np.nan,
+            'max_drawdown': (equity / equity.cummax() - 1).min(),
+            'giro_medio': giro.mean(),
+        }
+
+    def run_grid(self, param_list, max_workers=None):
+        """
+        Executa várias combinações de parâmetros em paralelo (um processo por núcleo).
+        As matrizes são enviadas uma vez por worker no initializer, não a cada tarefa.
+        Retorna DataFrame com uma linha por combinação (parâmetros + estatísticas); o tempo total fica em
+        df.attrs['elapsed_s'] e o número de processos em df.attrs['workers'].
+        """
+        max_workers = max_workers or os.cpu_count()
+        start = time.perf_counter()
+
+        if max_workers == 1:
+            stats = [self.run(p)['stats'] for p in param_list]
+        else:
+            chunksize = max(1, len(param_list) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(self.matrices,)) as executor:
+                stats = list(executor.map(_run_worker, param_list, chunksize=chunksize))
+
+        elapsed = time.perf_counter() - start
+        df = pd.concat([pd.DataFrame(param_list), pd.DataFrame(stats)], axis=1)
+        df = df.sort_values('sharpe', ascending=False, na_position='last').reset_index(drop=True)
+        df.attrs.update(elapsed_s=elapsed, workers=max_workers)
+        return df
+
+def _init_worker(matrices):
+    global _WORKER_BACKTESTER
+    _WORKER_BACKTESTER = Backtester(matrices=matrices)
+
+def _run_worker(params):
+    return _WORKER_BACKTESTER.run(params)['stats']
+
+if __name__ == "__main__":
+    from calculo_indicadores import IndicadoresCalculator
+    calc = IndicadoresCalculator()
+    bt = Backtester(calc)
+
+    # Ex.: menor decil de P/VP e maior DY com filtro de liquidez
+    grid = (
+        param_grid(signal=['P_VP'], ascending=[True], quantile=[0.1, 0.2, 0.3],
+                   min_liquidity=[0, 100_000, 500_000, 1_000_000], cost_bps=[0, 10])
+        + param_grid(signal=['DY_12M'], ascending=[False], top_n=[5, 10, 20],
+                     min_liquidity=[0, 100_000, 500_000, 1_000_000], cost_bps=[0, 10])
+    )
+    resultado = bt.run_grid(grid)
+    print(f"Backtest de {len(grid)} combinações em {resultado.attrs['elapsed_s']:.1f}s "
+          f"({resultado.attrs['workers']} processos)")
+    print(resultado.head(10))
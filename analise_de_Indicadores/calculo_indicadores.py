@@ -2,7 +2,14 @@ import pandas as pd
 import os
 import sys
 import numpy as np
-import yfinance as yf # Importando yfinance para fallback de DY
+
+try:
+    from result_cache import ResultCache, cached_method, data_fingerprint
+    from profiling import profiled, profiler
+except ImportError:
+    # Importado como pacote (ex.: ETL e stock-market-dashboard adicionam a raiz do projeto ao path)
+    from analise_de_Indicadores.result_cache import ResultCache, cached_method, data_fingerprint
+    from analise_de_Indicadores.profiling import profiled, profiler
 
 # Caminho para os dados (relativo à execução ou estrutura do projeto)
 # Assumindo que este script está em analise_de_Indicadores/
@@ -11,17 +18,28 @@ DATA_DIR_BRONZE = os.path.join(PROJECT_ROOT, 'stock-market-etl', 'data', 'bronze
 DATA_DIR_OCEANS = os.path.join(PROJECT_ROOT, 'dados', 'oceans14_output_csvs')
 
 class IndicadoresCalculator:
-    def __init__(self, data_dir_bronze=DATA_DIR_BRONZE, data_dir_oceans=DATA_DIR_OCEANS):
+    # Frequências de saída aceitas por get_pvp_history (regra de período do pandas)
+    PVP_FREQS = ('D', 'W', 'M')
+
+    def __init__(self, data_dir_bronze=DATA_DIR_BRONZE, data_dir_oceans=DATA_DIR_OCEANS, cache_size=128):
         self.data_dir_bronze = data_dir_bronze
         self.data_dir_oceans = data_dir_oceans
+        # Resultados por ticker (get_dy_history, get_pvp_history...) dos dados carregados abaixo.
+        # fingerprint identifica esses dados: se mudar, crie uma nova calculadora.
+        self.fingerprint = data_fingerprint(data_dir_bronze, data_dir_oceans)
+        self.result_cache = ResultCache(cache_size)
         
         self.df_rendimentos = self._load_rendimentos()
         self.df_indicadores_atual = self._load_indicadores_atual()
+        # Último snapshot por ticker, calculado no primeiro uso (_latest_indicadores)
+        self._indicadores_latest = None
         self.df_yahoo = self._load_yahoo()
         # Carregar Oceans (fallback)
         self.df_indicadores_oceans = self._load_oceans_indicadores()
         # Carregar Yahoo Histórico (prioridade)
         self.df_yahoo_hist = self._load_yahoo_historical()
+        # Lista de ativos (Categoria/Tipo) para filtros
+        self.df_ativos = self._load_ativos()
 
     def _load_rendimentos(self):
         path = os.path.join(self.data_dir_bronze, 'funds_rendimentos.csv')
@@ -64,6 +82,12 @@ class IndicadoresCalculator:
             return pd.DataFrame()
         return pd.read_csv(path)
 
+    def _load_ativos(self):
+        path = os.path.join(self.data_dir_bronze, 'funds_ativos.csv')
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_csv(path)
+
     def _load_yahoo(self):
         path = os.path.join(self.data_dir_bronze, 'yahoo_cotacoes.csv')
         if not os.path.exists(path):
@@ -131,39 +155,45 @@ class IndicadoresCalculator:
             print(f"Erro ao carregar Oceans14 Indicadores: {e}")
             return pd.DataFrame()
 
-    def get_dy_history(self, ticker):
+    def _prepare_dy_local(self, df):
+        """Padroniza linhas de funds_rendimentos para [Ticker, Date, Dividend, Price_at_Database, DY_Monthly]."""
+        cols_map = {
+            'Ticker': 'Ticker',
+            'Data Base': 'Date',
+            'Valor por Cota (R$)': 'Dividend',
+            'Fechamento (R$)': 'Price_at_Database',
+            'Yield 1M': 'DY_Monthly'
+        }
+        existing_cols = [c for c in cols_map.keys() if c in df.columns]
+        result = df[existing_cols].rename(columns=cols_map)
+        result = result.dropna(subset=['Date'])
+
+        # Calcular se necessário
+        if 'DY_Monthly' not in result.columns and 'Dividend' in result.columns and 'Price_at_Database' in result.columns:
+             result['DY_Monthly'] = np.where(
+                 result['Price_at_Database'] > 0, 
+                 (result['Dividend'] / result['Price_at_Database']) * 100, 
+                 0
+             )
+        return result.sort_values(['Ticker', 'Date'], kind='stable')
+
+    @cached_method
+    def get_dy_history(self, ticker, allow_fallback=True):
         """
         Calcula o histórico de Dividend Yield (Mensal).
-        Tenta usar dados locais (Funds Explorer). Se falhar, tenta Yahoo Finance ao vivo.
+        Tenta usar dados locais (Funds Explorer). Se falhar, tenta Yahoo Finance ao vivo
+        (desligável com allow_fallback=False, ex.: processamento em lote no ETL).
         Retorna DataFrame com [Date, Dividend, Price_at_Database, DY_Monthly]
         """
         # 1. Tentar dados locais
         result = pd.DataFrame()
         if not self.df_rendimentos.empty:
-            df = self.df_rendimentos[self.df_rendimentos['Ticker'] == ticker].copy()
+            df = self.df_rendimentos[self.df_rendimentos['Ticker'] == ticker]
             if not df.empty:
-                df = df.sort_values('Data Base')
-                cols_map = {
-                    'Data Base': 'Date',
-                    'Valor por Cota (R$)': 'Dividend',
-                    'Fechamento (R$)': 'Price_at_Database',
-                    'Yield 1M': 'DY_Monthly'
-                }
-                existing_cols = [c for c in cols_map.keys() if c in df.columns]
-                result = df[existing_cols].copy()
-                result = result.rename(columns=cols_map)
-                result = result.dropna(subset=['Date'])
-                
-                # Calcular se necessário
-                if 'DY_Monthly' not in result.columns and 'Dividend' in result.columns and 'Price_at_Database' in result.columns:
-                     result['DY_Monthly'] = np.where(
-                         result['Price_at_Database'] > 0, 
-                         (result['Dividend'] / result['Price_at_Database']) * 100, 
-                         0
-                     )
+                result = self._prepare_dy_local(df).drop(columns='Ticker')
         
         # 2. Se local falhou (vazio), tenta Yahoo Finance
-        if result.empty:
+        if result.empty and allow_fallback:
             try:
                 result = self._get_dy_history_from_yahoo(ticker)
             except Exception as e:
@@ -171,10 +201,77 @@ class IndicadoresCalculator:
 
         return result.sort_values('Date') if not result.empty else pd.DataFrame()
 
+    @cached_method
+    def get_dy_history_monthly(self, ticker, allow_fallback=True):
+        """
+        Agrega o histórico de DY por mês (fim do mês) e calcula o DY acumulado dos últimos 12 meses.
+        Meses sem provento contam como zero no acumulado, mas não geram linha.
+        Retorna DataFrame com [Date, Dividend, Price_at_Database, DY_Monthly, DY_12M]
+        """
+        df = self.get_dy_history(ticker, allow_fallback=allow_fallback)
+        if df.empty or 'DY_Monthly' not in df.columns:
+            return pd.DataFrame()
+        return self._aggregate_dy_monthly(df.assign(Ticker=ticker)).drop(columns='Ticker')
+
+    def get_dividend_events(self, tickers=None, since=None):
+        """
+        Proventos locais (Funds Explorer) de vários tickers, um registro por data-base.
+        since filtra apenas datas posteriores (Timestamp ou mapeamento Ticker -> Timestamp).
+        Retorna DataFrame com [Ticker, Date, Dividend, Price_at_Database, DY_Monthly]
+        """
+        if self.df_rendimentos.empty:
+            return pd.DataFrame()
+        df = self.df_rendimentos
+        if tickers is not None:
+            df = df[df['Ticker'].isin(tickers)]
+        return self._filter_since(self._prepare_dy_local(df), since)
+
+    def get_dy_panel(self, tickers=None):
+        """
+        Versão em lote de get_dy_history_monthly: DY mensal e DY 12M de vários tickers
+        (tickers=None processa todo o universo), apenas com dados locais do Funds Explorer.
+        Retorna DataFrame longo com [Ticker, Date, Dividend, Price_at_Database, DY_Monthly, DY_12M]
+        """
+        df = self.get_dividend_events(tickers)
+        if df.empty or 'DY_Monthly' not in df.columns:
+            return pd.DataFrame()
+        return self._aggregate_dy_monthly(df)
+
+    @staticmethod
+    def _filter_since(df, since):
+        """Mantém apenas linhas com Date posterior a since (Timestamp ou mapeamento Ticker -> Timestamp)."""
+        if since is None or df.empty:
+            return df
+        if isinstance(since, (dict, pd.Series)):
+            limites = pd.Series(since, dtype='datetime64[ns]')
+            limite = limites.reindex(df['Ticker'].to_numpy()).to_numpy()
+            return df[pd.isna(limite) | (df['Date'].to_numpy() > limite)]
+        return df[df['Date'] > pd.Timestamp(since)]
+
+    @staticmethod
+    def _aggregate_dy_monthly(df):
+        """Agrupa [Ticker, Date, ...] por ticker e mês e calcula o DY 12M de todos os tickers numa passada."""
+        aggs = {'Dividend': 'sum', 'Price_at_Database': 'last', 'DY_Monthly': 'sum'}
+        aggs = {col: how for col, how in aggs.items() if col in df.columns}
+        monthly = df.groupby(['Ticker', df['Date'].dt.to_period('M').rename('Month')]).agg(aggs)
+
+        # Matriz mês x ticker no calendário completo para a janela de 12M considerar meses sem provento
+        wide = monthly['DY_Monthly'].unstack('Ticker')
+        meses = pd.period_range(wide.index.min(), wide.index.max(), freq='M', name='Month')
+        dy_12m = wide.reindex(meses).fillna(0).rolling(12, min_periods=1).sum()
+        monthly['DY_12M'] = dy_12m.stack().swaplevel().reindex(monthly.index)
+
+        monthly = monthly.reset_index()
+        monthly.insert(1, 'Date', monthly.pop('Month').dt.to_timestamp(how='end').dt.normalize())
+        return monthly
+
     def _get_dy_history_from_yahoo(self, ticker):
         """
         Busca histórico de dividendos e preços do Yahoo Finance para calcular DY.
         """
+        # Importado só aqui: o fallback é raro e o yfinance pesa na inicialização dos dashboards e do ETL
+        import yfinance as yf
+
         ticker_sa = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
         stock = yf.Ticker(ticker_sa)
         
@@ -210,134 +307,277 @@ class IndicadoresCalculator:
         
         return merged[['Date', 'Dividend', 'Price_at_Database', 'DY_Monthly']].dropna()
 
-    def get_pvp_history(self, ticker):
+    def _get_price_panel(self, freq='D', tickers=None, since=None):
         """
-        Calcula o histórico de P/VP DIÁRIO.
-        Prioridade:
-        1. Histórico Yahoo (se disponível e completo)
-        2. Histórico Oceans14 (se disponível)
-        3. VP Atual (Fallback)
+        Retorna as cotações de fechamento [Ticker, Date, Close] já na frequência pedida.
+        Para 'W' e 'M' mantém apenas o último pregão de cada período, sem reamostrar a série.
+        since descarta pregões até a data informada (ver _filter_since).
         """
-        # 1. Pegar histórico de Preço (Yahoo)
         if self.df_yahoo.empty:
             return pd.DataFrame()
 
-        ticker_variants = [ticker, ticker + ".SA"]
-        df_price = self.df_yahoo[self.df_yahoo['Ticker'].isin(ticker_variants)].copy()
-        
+        cols = [c for c in ['Ticker', 'Date', 'Close', 'Intervalo'] if c in self.df_yahoo.columns]
+        df_price = self.df_yahoo[cols]
+        if tickers is not None:
+            ticker_variants = list(tickers) + [f"{t}.SA" for t in tickers]
+            df_price = df_price[df_price['Ticker'].isin(ticker_variants)]
         if df_price.empty:
             return pd.DataFrame()
-        
-        df_price = df_price.sort_values('Date').set_index('Date')
 
-        # 2. Fonte de VP (Prioridade: Yahoo Histórico -> Oceans14 -> VP Atual)
-        source_used = "current"
-        df_vp_hist = pd.DataFrame()
+        # Unificar sufixo .SA (aplicado aos valores únicos, não a cada linha)
+        codes, uniques = pd.factorize(df_price['Ticker'])
+        uniques = pd.Index(uniques).astype(str).str.removesuffix('.SA').to_numpy()
+        df_price = df_price.assign(Ticker=uniques[codes])
+
+        # O yahoo_cotacoes mistura vários intervalos; o P/VP usa apenas o diário quando existir
+        if 'Intervalo' in df_price.columns:
+            is_daily = df_price['Intervalo'] == '1d'
+            has_daily = is_daily.groupby(df_price['Ticker']).transform('any')
+            df_price = df_price[is_daily | ~has_daily]
+
+        df_price = df_price[['Ticker', 'Date', 'Close']].dropna()
+        df_price['Date'] = df_price['Date'].astype('datetime64[ns]')
+        df_price = self._filter_since(df_price, since).sort_values(['Ticker', 'Date'], kind='stable')
+
+        if freq != 'D':
+            # Com a série ordenada por [Ticker, Date], o último pregão do período é a linha cuja
+            # seguinte muda de ticker ou de período (comparação de ordinais, sem agrupar Periods)
+            periodos = df_price['Date'].dt.to_period(freq).array.asi8
+            tickers_arr = df_price['Ticker'].to_numpy()
+            ultimo = np.ones(len(df_price), dtype=bool)
+            ultimo[:-1] = (periodos[1:] != periodos[:-1]) | (tickers_arr[1:] != tickers_arr[:-1])
+            df_price = df_price[ultimo]
+            # Rótulo = fim do período (mesmo comportamento do antigo resample('ME').last())
+            df_price['Period_End'] = df_price['Date'].dt.to_period(freq).dt.end_time.dt.normalize().astype('datetime64[ns]')
+
+        return df_price.reset_index(drop=True)
+
+    def get_price_panel(self, freq='M', tickers=None):
+        """
+        Cotações de fechamento [Ticker, Date, Close] de vários tickers na frequência pedida,
+        com Date no fim do período para 'W' e 'M' (mesmo rótulo de get_pvp_panel).
+        """
+        df_price = self._get_price_panel(freq, tickers)
+        if df_price.empty or freq == 'D':
+            return df_price
+        return df_price.assign(Date=df_price.pop('Period_End'))
+
+    def _get_vp_events_panel(self, tickers=None):
+        """
+        Retorna DataFrame [Ticker, Date, VP_Cota, VP_Source] apenas com as datas de referência
+        do VP, sem expandir para série diária.
+        Prioridade por ticker: Yahoo Histórico -> Oceans14. Tickers sem histórico ficam de fora.
+        """
+        events = []
 
         # Tentar Yahoo Histórico
         if not self.df_yahoo_hist.empty:
-             df_yh = self.df_yahoo_hist[self.df_yahoo_hist['Ticker'] == ticker].copy()
-             if not df_yh.empty:
-                 # Se tem Cotas e PL, calcula VP/Cota
-                 # Se não tem Cotas (comum no Yahoo), tenta pegar Cotas Atuais para estimar
-                 if 'Cotas' not in df_yh.columns or df_yh['Cotas'].isnull().all():
-                      current_shares = self._get_current_shares(ticker)
-                      if current_shares:
-                          df_yh['VP_Cota'] = df_yh['Patrimonio_Liquido'] / current_shares
-                          source_used = "yahoo_hist_estimated_shares"
-                 else:
-                      source_used = "yahoo_hist"
-                 
-                 if 'VP_Cota' in df_yh.columns:
-                     df_yh = df_yh.dropna(subset=['VP_Cota']).sort_values('Date').set_index('Date')
-                     df_vp_hist = df_yh[['VP_Cota']].resample('D').ffill()
-
-        # Fallback para Oceans14 se Yahoo falhou
-        if df_vp_hist.empty and not self.df_indicadores_oceans.empty:
-            df_oc = self.df_indicadores_oceans[self.df_indicadores_oceans['Ticker'] == ticker].copy()
-            if not df_oc.empty:
-                df_oc = df_oc.sort_values('Date').set_index('Date')
-                df_vp_hist = df_oc[['VP por cota']].rename(columns={'VP por cota': 'VP_Cota'}).resample('D').ffill()
-                source_used = "oceans14"
+            df_yh = self.df_yahoo_hist
+            if tickers is not None:
+                df_yh = df_yh[df_yh['Ticker'].isin(tickers)]
+            if not df_yh.empty:
+                # Se não tem Cotas (comum no Yahoo), usa as Cotas Atuais para estimar o VP/Cota
+                if 'Cotas' in df_yh.columns:
+                    sem_cotas = df_yh['Cotas'].isnull().groupby(df_yh['Ticker']).transform('all')
+                else:
+                    sem_cotas = pd.Series(True, index=df_yh.index)
+                vp_cota = df_yh['VP_Cota'] if 'VP_Cota' in df_yh.columns else pd.Series(np.nan, index=df_yh.index)
+                pl = df_yh['Patrimonio_Liquido'] if 'Patrimonio_Liquido' in df_yh.columns else np.nan
+                vp_estimado = pl / df_yh['Ticker'].map(self._current_shares_map(tickers))
 
-        # 3. Cruzamento
-        if not df_vp_hist.empty:
-            merged = df_price.join(df_vp_hist, how='left')
-            merged['VP_Used'] = merged['VP_Cota'].ffill()
-            
-            # Preencher começo com VP Atual se necessário
-            vp_atual = self._get_current_vp(ticker)
-            if vp_atual:
-                 merged['VP_Used'] = merged['VP_Used'].fillna(vp_atual)
+                df_yh = pd.DataFrame({
+                    'Ticker': df_yh['Ticker'],
+                    'Date': df_yh['Date'],
+                    'VP_Cota': vp_cota.where(~sem_cotas, vp_estimado),
+                    'VP_Source': np.where(sem_cotas, 'yahoo_hist_estimated_shares', 'yahoo_hist'),
+                })
+                events.append(df_yh.dropna(subset=['Date', 'VP_Cota']))
+
+        # Fallback para Oceans14 nos tickers em que o Yahoo falhou
+        if not self.df_indicadores_oceans.empty:
+            df_oc = self.df_indicadores_oceans
+            if tickers is not None:
+                df_oc = df_oc[df_oc['Ticker'].isin(tickers)]
+            if events:
+                df_oc = df_oc[~df_oc['Ticker'].isin(events[0]['Ticker'])]
+            df_oc = df_oc[['Ticker', 'Date', 'VP por cota']].rename(columns={'VP por cota': 'VP_Cota'})
+            events.append(df_oc.dropna().assign(VP_Source='oceans14'))
+
+        if not events:
+            return pd.DataFrame()
 
-            merged['P_VP'] = merged['Close'] / merged['VP_Used']
-            merged = merged.reset_index()
-            # Adicionar metadado da fonte usada (hacky way: adicionar ao primeiro registro ou retornar tupla)
-            # Para simplificar o dashboard, vamos apenas retornar os dados
-            return merged[['Date', 'Close', 'VP_Used', 'P_VP']]
+        df_vp = pd.concat(events, ignore_index=True)
+        df_vp['Date'] = df_vp['Date'].astype('datetime64[ns]')
+        return df_vp.sort_values('Date', kind='stable').reset_index(drop=True)
 
+    @profiled('calculadora.get_pvp_panel')
+    def get_pvp_panel(self, freq='D', tickers=None, since=None):
+        """
+        Calcula o P/VP de vários tickers de uma vez (tickers=None processa todo o universo),
+        na frequência 'D' (diário), 'W' (semanal) ou 'M' (mensal).
+        since restringe a saída aos pregões posteriores (Timestamp ou mapeamento Ticker -> Timestamp),
+        útil para atualizações incrementais; o VP continua vindo do histórico completo.
+        O VP vigente em cada data é obtido por um único merge_asof por Ticker sobre as datas
+        de referência do VP, sem reamostrar o VP para diário.
+        Prioridade do VP:
+        1. Histórico Yahoo (se disponível e completo)
+        2. Histórico Oceans14 (se disponível)
+        3. VP Atual (Fallback)
+        Retorna DataFrame longo com [Ticker, Date, Close, VP_Used, P_VP, VP_Source].
+        """
+        if freq not in self.PVP_FREQS:
+            raise ValueError(f"Frequência inválida: {freq}. Use uma de {self.PVP_FREQS}")
+
+        # 1. Histórico de Preço (Yahoo) já na frequência de saída
+        df_price = self._get_price_panel(freq, tickers, since)
+        if df_price.empty:
+            return pd.DataFrame()
+
+        # 2. Fonte de VP (Prioridade: Yahoo Histórico -> Oceans14 -> VP Atual)
+        df_vp = self._get_vp_events_panel(tickers)
+        latest = self._latest_indicadores(tickers)
+        if not latest.empty and 'valor_patrimonial_cota' in latest.columns:
+            vp_atual = pd.to_numeric(latest['valor_patrimonial_cota'], errors='coerce')
+            vp_atual = vp_atual[vp_atual.notna() & (vp_atual != 0)]
+        else:
+            vp_atual = pd.Series(dtype=float)
+
+        # 3. Cruzamento
+        df_price = df_price.sort_values('Date', kind='stable')
+        if not df_vp.empty:
+            merged = pd.merge_asof(df_price, df_vp.drop(columns='VP_Source'), on='Date', by='Ticker', direction='backward')
+            fontes = df_vp.groupby('Ticker')['VP_Source'].last()
         else:
-            # Modo Legado: VP Atual Fixo
-            vp = self._get_current_vp(ticker)
-            if vp is None or pd.isna(vp) or vp == 0:
-                return pd.DataFrame()
+            merged = df_price.assign(VP_Cota=np.nan)
+            fontes = pd.Series(dtype=str)
+
+        merged['VP_Source'] = merged['Ticker'].map(fontes).fillna('current')
+        # Preencher começo (ou tudo, no modo legado de VP fixo) com VP Atual
+        merged['VP_Used'] = merged['VP_Cota'].fillna(merged['Ticker'].map(vp_atual))
+        # Modo legado sem VP atual válido: ticker sem P/VP
+        merged = merged[(merged['VP_Source'] != 'current') | merged['VP_Used'].notna()]
+        merged['P_VP'] = merged['Close'] / merged['VP_Used']
+
+        if freq != 'D':
+            merged['Date'] = merged['Period_End']
+            # Remove períodos sem P/VP (ex.: antes do primeiro VP e sem VP atual)
+            merged = merged.dropna(subset=['P_VP'])
 
-            df_price['VP_Used'] = vp
-            df_price['P_VP'] = df_price['Close'] / vp
-            df_price = df_price.reset_index()
-            return df_price[['Date', 'Close', 'VP_Used', 'P_VP']]
+        merged = merged.sort_values(['Ticker', 'Date'], kind='stable')
+        return merged[['Ticker', 'Date', 'Close', 'VP_Used', 'P_VP', 'VP_Source']].reset_index(drop=True)
+
+    @cached_method
+    @profiled('calculadora.get_pvp_history')
+    def get_pvp_history(self, ticker, freq='D'):
+        """
+        Calcula o histórico de P/VP de um ticker na frequência pedida: 'D', 'W' ou 'M'.
+        Retorna DataFrame com [Date, Close, VP_Used, P_VP, VP_Source] (ver get_pvp_panel).
+        """
+        df = self.get_pvp_panel(freq, tickers=[ticker])
+        if df.empty:
+            return pd.DataFrame()
+        return df.drop(columns='Ticker')
 
     def get_pvp_history_monthly(self, ticker):
         """
         Retorna o histórico MENSAL do P/VP (fechamento do mês).
         """
-        df_daily = self.get_pvp_history(ticker)
-        if df_daily.empty:
+        return self.get_pvp_history(ticker, freq='M')
+
+    @cached_method
+    def get_comparison_panel(self, tickers, freq='M'):
+        """
+        Séries alinhadas de vários tickers para comparação, montadas com chamadas em lote
+        (preço, P/VP e DY) em vez de uma chamada por ticker.
+        DY_12M é o último valor conhecido até a data (no máximo 12 meses antes).
+        Retorna DataFrame longo com [Ticker, Date, Close, P_VP, DY_12M]
+        """
+        tickers = list(tickers)
+        df_price = self.get_price_panel(freq, tickers)
+        if df_price.empty:
             return pd.DataFrame()
-        
-        # Define Data como índice para resample
-        df_daily = df_daily.set_index('Date')
-        
-        # Resample para fim de mês ('ME' no pandas novo, 'M' no antigo)
-        # Pegamos o último valor de P/VP do mês
-        try:
-            df_monthly = df_daily.resample('ME').last()
-        except:
-            # Fallback para versões pandas antigas
-            df_monthly = df_daily.resample('M').last()
-        
-        # Remove meses sem dados
-        df_monthly = df_monthly.dropna(subset=['P_VP'])
-        
-        return df_monthly.reset_index()
 
-    def _get_current_vp(self, ticker):
+        df = df_price[['Ticker', 'Date', 'Close']]
+        df_pvp = self.get_pvp_panel(freq, tickers)
+        if not df_pvp.empty:
+            df = df.merge(df_pvp[['Ticker', 'Date', 'P_VP']], on=['Ticker', 'Date'], how='left')
+        else:
+            df = df.assign(P_VP=np.nan)
+
+        df_dy = self.get_dy_panel(tickers)
+        if not df_dy.empty:
+            df = pd.merge_asof(
+                df.sort_values('Date', kind='stable'),
+                df_dy[['Ticker', 'Date', 'DY_12M']].astype({'Date': 'datetime64[ns]'}).sort_values('Date', kind='stable'),
+                on='Date', by='Ticker', direction='backward', tolerance=pd.Timedelta(days=366),
+            )
+        else:
+            df = df.assign(DY_12M=np.nan)
+
+        return df.sort_values(['Ticker', 'Date'], kind='stable').reset_index(drop=True)
+
+    def _load_latest_indicadores(self):
+        """
+        Último snapshot de cada ticker. Vem do índice latest do store de indicadores diários do ETL
+        (bronze/indicadores_diarios/latest.parquet, valores já numéricos) quando ele existe; senão é calculado
+        uma vez a partir do funds_indicadores_diarios.csv.
+        """
+        store_dir = os.path.join(self.data_dir_bronze, 'indicadores_diarios')
+        for name, reader in (('latest.parquet', pd.read_parquet), ('latest.pkl', pd.read_pickle)):
+            path = os.path.join(store_dir, name)
+            if os.path.exists(path):
+                try:
+                    latest = reader(path).drop(columns=['primeira_captura', 'ultima_captura'], errors='ignore')
+                    return latest.set_index('Ticker')
+                except Exception as e:
+                    print(f"Erro ao ler {path}: {e}")
         if self.df_indicadores_atual.empty:
-             return None
-        df_ind = self.df_indicadores_atual[self.df_indicadores_atual['Ticker'] == ticker]
-        if df_ind.empty:
+            return pd.DataFrame()
+        df_ind = self.df_indicadores_atual.sort_values('timestamp', kind='stable')
+        return df_ind.drop_duplicates('Ticker', keep='last').set_index('Ticker')
+
+    def _latest_indicadores(self, tickers=None):
+        """Último snapshot do Funds Explorer por ticker (indexado por Ticker)."""
+        if self._indicadores_latest is None:
+            self._indicadores_latest = self._load_latest_indicadores()
+        latest = self._indicadores_latest
+        if tickers is not None and not latest.empty:
+            latest = latest[latest.index.isin(tickers)]
+        return latest
+
+    def _current_shares_map(self, tickers=None):
+        """Número de cotas atual por ticker, inferido como PL / VP_Cota."""
+        latest = self._latest_indicadores(tickers)
+        if latest.empty or not {'patrimonio_liquido', 'valor_patrimonial_cota'} <= set(latest.columns):
+            return pd.Series(dtype=float)
+        pl = pd.to_numeric(latest['patrimonio_liquido'], errors='coerce')
+        vp = pd.to_numeric(latest['valor_patrimonial_cota'], errors='coerce')
+        return (pl / vp.where(vp != 0)).dropna()
+
+    def _get_current_vp(self, ticker):
+        latest = self._latest_indicadores([ticker])
+        if latest.empty:
             return None
-        return df_ind.sort_values('timestamp', ascending=False).iloc[0]['valor_patrimonial_cota']
+        return latest.iloc[0]['valor_patrimonial_cota']
 
     def _get_current_shares(self, ticker):
         """Tenta inferir o número de cotas atual: PL / VP_Cota"""
-        if self.df_indicadores_atual.empty:
-             return None
-        df_ind = self.df_indicadores_atual[self.df_indicadores_atual['Ticker'] == ticker]
-        if df_ind.empty:
-            return None
-        
-        row = df_ind.sort_values('timestamp', ascending=False).iloc[0]
-        pl = row.get('patrimonio_liquido')
-        vp = row.get('valor_patrimonial_cota')
-        
-        if pd.notnull(pl) and pd.notnull(vp) and vp != 0:
-            return pl / vp
-        return None
+        shares = self._current_shares_map([ticker])
+        return shares.iloc[0] if not shares.empty else None
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Teste rápido do IndicadoresCalculator.")
+    parser.add_argument('ticker', nargs='?', default='CPTR11')
+    parser.add_argument('--profile', action='store_true', help="Ativa o profiling (equivale a PROFILE_HOT_PATHS=1)")
+    args = parser.parse_args()
+    if args.profile:
+        profiler.enable()
+
     calc = IndicadoresCalculator()
-    ticker_test = "CPTR11" 
+    ticker_test = args.ticker
     print(f"--- DY History for {ticker_test} ---")
     df = calc.get_dy_history(ticker_test)
     print(df.tail())
+    print(f"--- P/VP History (M) for {ticker_test} ---")
+    print(calc.get_pvp_history(ticker_test, freq='M').tail())
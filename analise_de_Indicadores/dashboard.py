@@ -2,7 +2,10 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from calculo_indicadores import IndicadoresCalculator
+from calculo_indicadores import IndicadoresCalculator, DATA_DIR_BRONZE, DATA_DIR_OCEANS
+from result_cache import data_fingerprint
+from warmup import calculator_warmup, top_liquidity_tickers
+from downsampling import downsample, DEFAULT_POINTS
 
 # Configuração da Página
 st.set_page_config(
@@ -16,13 +19,29 @@ st.markdown("""
 Este dashboard permite analisar o histórico de **Dividend Yield (DY)** e **P/VP** dos Fundos Imobiliários.
 """)
 
-# Inicializar Calculadora (Cache para não recarregar CSVs toda vez)
-@st.cache_resource
-def get_calculator():
+# Descrição das fontes de VP retornadas em VP_Source
+VP_SOURCE_LABELS = {
+    'yahoo_hist': 'Yahoo Finance',
+    'yahoo_hist_estimated_shares': 'Yahoo Finance, cotas atuais estimadas',
+    'oceans14': 'Oceans14 trimestral',
+}
+
+# Inicializar Calculadora (Cache para não recarregar CSVs toda vez).
+# A chave é a impressão digital dos CSVs: quando o ETL regrava os dados, uma nova calculadora
+# (com cache de resultados vazio) substitui a anterior.
+@st.cache_resource(max_entries=1)
+def get_calculator(fingerprint):
     return IndicadoresCalculator()
 
+# Pré-cálculo em segundo plano dos ativos mais líquidos (uma vez por calculadora)
+@st.cache_resource(max_entries=1)
+def start_warmup(fingerprint):
+    return calculator_warmup(get_calculator(fingerprint)).start()
+
 try:
-    calc = get_calculator()
+    fingerprint = data_fingerprint(DATA_DIR_BRONZE, DATA_DIR_OCEANS)
+    calc = get_calculator(fingerprint)
+    warmup = start_warmup(fingerprint)
 except Exception as e:
     st.error(f"Erro ao inicializar calculadora: {e}")
     st.stop()
@@ -30,18 +49,105 @@ except Exception as e:
 # Barra Lateral
 st.sidebar.header("Filtros")
 
+warmup_status = warmup.status()
+if not warmup_status['ready']:
+    st.sidebar.caption(f"⏳ Pré-carregando ativos mais líquidos ({warmup_status['done']} tarefas concluídas)...")
+
 # Obter lista de tickers disponíveis
-tickers_rend = calc.df_rendimentos['Ticker'].unique() if not calc.df_rendimentos.empty else []
-tickers_yahoo = calc.df_yahoo['Ticker'].unique() if not calc.df_yahoo.empty else []
-# Limpar sufixo .SA do Yahoo para unificar
-tickers_yahoo_clean = [t.replace('.SA', '') for t in tickers_yahoo]
-all_tickers = sorted(list(set(list(tickers_rend) + list(tickers_yahoo_clean))))
+def list_tickers():
+    tickers_rend = calc.df_rendimentos['Ticker'].unique() if not calc.df_rendimentos.empty else []
+    tickers_yahoo = calc.df_yahoo['Ticker'].unique() if not calc.df_yahoo.empty else []
+    # Limpar sufixo .SA do Yahoo para unificar
+    tickers_yahoo_clean = [t.replace('.SA', '') for t in tickers_yahoo]
+    return sorted(list(set(list(tickers_rend) + list(tickers_yahoo_clean))))
+
+all_tickers = calc.result_cache.get_or_compute(('tickers',), list_tickers)
 
 if not all_tickers:
     st.warning("Nenhum dado encontrado nos arquivos CSV. Verifique se o ETL foi executado.")
     st.stop()
 
-selected_ticker = st.sidebar.selectbox("Selecione o Ativo", all_tickers)
+modo = st.sidebar.radio("Modo", ["Ativo individual", "Comparação"], horizontal=True)
+
+if modo == "Ativo individual":
+    selected_ticker = st.sidebar.selectbox("Selecione o Ativo", all_tickers)
+else:
+    # Padrão: os ativos mais líquidos (os mesmos pré-carregados no aquecimento)
+    mais_liquidos = calc.result_cache.get_or_compute(('top_liquidez', 5), lambda: top_liquidity_tickers(calc, 5))
+    default_tickers = [t for t in mais_liquidos if t in all_tickers] or all_tickers[:5]
+    comparison_tickers = st.sidebar.multiselect("Ativos para comparar", all_tickers, default=default_tickers)
+
+# Frequência do P/VP: diária traz milhares de pontos por ativo, reduzidos antes de ir ao gráfico
+PVP_FREQ_LABELS = {'D': 'Diária', 'W': 'Semanal', 'M': 'Mensal'}
+pvp_freq = st.sidebar.radio(
+    "Frequência do P/VP",
+    list(PVP_FREQ_LABELS),
+    index=2,
+    format_func=PVP_FREQ_LABELS.get,
+    horizontal=True,
+)
+
+# Pontos somados de todas as séries do gráfico de comparação (WebGL continua fluido nessa faixa)
+COMPARISON_POINTS = 20000
+
+if modo == "Comparação":
+    st.header("🔀 Comparação entre Ativos")
+    if not comparison_tickers:
+        st.info("Selecione ao menos um ativo na barra lateral.")
+        st.stop()
+
+    # Uma chamada em lote para todos os ativos (P/VP, DY 12M e preço alinhados por data)
+    df_comp = calc.get_comparison_panel(sorted(comparison_tickers), freq=pvp_freq)
+    if df_comp.empty:
+        st.warning("Sem cotações para os ativos selecionados.")
+        st.stop()
+
+    METRICAS = {'P_VP': 'P/VP', 'DY_12M': 'DY 12M (%)', 'Close': 'Preço (base 100)'}
+    metrica = st.radio("Indicador", list(METRICAS), format_func=METRICAS.get, horizontal=True)
+
+    wide = df_comp.pivot(index='Date', columns='Ticker', values=metrica)
+    if metrica == 'Close':
+        # Preços normalizados no primeiro valor de cada ativo para ficarem na mesma escala
+        wide = wide / wide.bfill().iloc[0] * 100
+
+    pontos_por_serie = max(250, COMPARISON_POINTS // wide.shape[1])
+    fig_comp = go.Figure()
+    for ticker in wide.columns:
+        serie = downsample(wide[ticker].rename('valor').reset_index(), 'Date', 'valor', pontos_por_serie)
+        fig_comp.add_trace(go.Scattergl(x=serie['Date'], y=serie['valor'], mode='lines', name=ticker))
+    if metrica == 'P_VP':
+        fig_comp.add_hline(y=1.0, line_dash="dash", line_color="red")
+    fig_comp.update_layout(
+        title=f"{METRICAS[metrica]} - {PVP_FREQ_LABELS[pvp_freq]}",
+        hovermode='x unified',
+        legend=dict(orientation='h', y=1.1),
+        height=500,
+    )
+    st.plotly_chart(fig_comp, use_container_width=True)
+
+    col_corr, col_resumo = st.columns([3, 2])
+    with col_corr:
+        st.subheader("Matriz de Correlação")
+        # Correlação das variações (não dos níveis, que andam juntos só por tendência)
+        variacao = wide.pct_change(fill_method=None) if metrica == 'Close' else wide.diff()
+        corr = variacao.corr(min_periods=12)
+        fig_corr = px.imshow(corr, text_auto='.2f', zmin=-1, zmax=1, color_continuous_scale='RdBu', aspect='auto')
+        st.plotly_chart(fig_corr, use_container_width=True)
+        st.caption(f"Correlação das variações por período de {METRICAS[metrica]} (mínimo de 12 períodos em comum).")
+
+    with col_resumo:
+        st.subheader("Último Valor")
+        resumo = df_comp.groupby('Ticker').last()[['Date', 'Close', 'P_VP', 'DY_12M']]
+        st.dataframe(
+            resumo.sort_values('P_VP'),
+            column_config={
+                'Close': st.column_config.NumberColumn('Preço', format='R$ %.2f'),
+                'P_VP': st.column_config.NumberColumn('P/VP', format='%.2f'),
+                'DY_12M': st.column_config.NumberColumn('DY 12M', format='%.2f%%'),
+            },
+            use_container_width=True,
+        )
+    st.stop()
 
 if selected_ticker:
     st.header(f"Análise do Ativo: {selected_ticker}")
@@ -75,12 +181,14 @@ if selected_ticker:
             st.plotly_chart(fig_dy, use_container_width=True)
             
             # Tabela Resumo
+            # Formatação via column_config (no navegador) em vez de Styler, que é refeito a cada rerun
             st.dataframe(
-                df_dy.sort_values('Date', ascending=False).head(12).style.format({
-                    'Dividend': 'R$ {:.2f}',
-                    'Price_at_Database': 'R$ {:.2f}',
-                    'DY_Monthly': '{:.2f}%'
-                }),
+                df_dy.sort_values('Date', ascending=False).head(12),
+                column_config={
+                    'Dividend': st.column_config.NumberColumn(format='R$ %.2f'),
+                    'Price_at_Database': st.column_config.NumberColumn(format='R$ %.2f'),
+                    'DY_Monthly': st.column_config.NumberColumn(format='%.2f%%'),
+                },
                 use_container_width=True
             )
         else:
@@ -88,39 +196,49 @@ if selected_ticker:
 
     # 2. Histórico de P/VP (Mensal)
     with col2:
-        st.subheader("📉 Histórico de P/VP (Mensal)")
-        # Alteração: Usar histórico Mensal
-        df_pvp = calc.get_pvp_history_monthly(selected_ticker)
+        st.subheader(f"📉 Histórico de P/VP ({PVP_FREQ_LABELS[pvp_freq]})")
+        df_pvp = calc.get_pvp_history(selected_ticker, freq=pvp_freq)
         
         if not df_pvp.empty:
-            # Verifica se o VP varia ao longo do tempo (mais que 1 valor único)
-            unique_vps = df_pvp['VP_Used'].nunique()
-            is_historical_vp = unique_vps > 1
+            # Fonte do VP informada pelo próprio cálculo (yahoo_hist, oceans14, current...)
+            vp_source = df_pvp['VP_Source'].iloc[-1]
+            is_historical_vp = vp_source != 'current'
             
             last_vp = df_pvp['VP_Used'].iloc[-1]
             last_pvp = df_pvp['P_VP'].iloc[-1]
             last_price = df_pvp['Close'].iloc[-1]
             
-            st.metric("P/VP Atual (Fechamento Mês)", f"{last_pvp:.2f}", f"Preço: R$ {last_price:.2f}")
+            st.metric("P/VP Atual (Último Fechamento)", f"{last_pvp:.2f}", f"Preço: R$ {last_price:.2f}")
             
             if is_historical_vp:
-                st.success(f"✅ Utilizando histórico de VP (Yahoo/Oceans14).")
-                title_chart = f'{selected_ticker} - P/VP Histórico Mensal'
+                st.success(f"✅ Utilizando histórico de VP ({VP_SOURCE_LABELS.get(vp_source, vp_source)}).")
+                title_chart = f'{selected_ticker} - P/VP Histórico {PVP_FREQ_LABELS[pvp_freq]}'
             else:
                 st.info(f"ℹ️ Utilizando **VP Fixo (R$ {last_vp:.2f})** projetado para todo o período.")
-                title_chart = f'{selected_ticker} - P/VP Histórico Mensal (VP Fixo)'
+                title_chart = f'{selected_ticker} - P/VP Histórico {PVP_FREQ_LABELS[pvp_freq]} (VP Fixo)'
+
+            # Período exibido: reduzir a janela traz de volta a resolução completa dentro dela
+            data_min, data_max = df_pvp['Date'].min().date(), df_pvp['Date'].max().date()
+            if data_min < data_max:
+                periodo = st.slider("Período", min_value=data_min, max_value=data_max, value=(data_min, data_max),
+                                    format="DD/MM/YYYY", key='pvp_periodo')
+                df_pvp_plot = df_pvp[df_pvp['Date'].between(pd.Timestamp(periodo[0]), pd.Timestamp(periodo[1]) + pd.Timedelta(days=1), inclusive='left')]
+            else:
+                df_pvp_plot = df_pvp
+            df_pvp_plot = downsample(df_pvp_plot, 'Date', 'P_VP', DEFAULT_POINTS)
             
             fig_pvp = px.line(
-                df_pvp, 
+                df_pvp_plot, 
                 x='Date', 
                 y='P_VP', 
                 title=title_chart,
-                markers=True, # Adicionar marcadores já que é mensal
-                labels={'P_VP': 'P/VP', 'Date': 'Mês', 'VP_Used': 'Valor Patrimonial'}
+                markers=pvp_freq == 'M', # Marcadores só no mensal; no diário poluem o gráfico
+                labels={'P_VP': 'P/VP', 'Date': 'Data', 'VP_Used': 'Valor Patrimonial'},
+                render_mode='webgl',
             )
             
             # Adicionar trace do VP para comparação (opcional, em eixo secundário seria melhor, mas tooltips já ajudam)
-            fig_pvp.add_scatter(x=df_pvp['Date'], y=df_pvp['VP_Used'], mode='lines', name='Valor Patrimonial (R$)', visible='legendonly')
+            fig_pvp.add_scatter(x=df_pvp_plot['Date'], y=df_pvp_plot['VP_Used'], mode='lines', name='Valor Patrimonial (R$)', visible='legendonly')
 
             # Linha de referência P/VP = 1
             fig_pvp.add_hline(y=1.0, line_dash="dash", line_color="red", annotation_text="Preço Justo (1.0)")
@@ -130,11 +248,12 @@ if selected_ticker:
             
              # Tabela Resumo P/VP
             st.dataframe(
-                df_pvp.sort_values('Date', ascending=False).head(12).style.format({
-                    'Close': 'R$ {:.2f}',
-                    'VP_Used': 'R$ {:.2f}',
-                    'P_VP': '{:.2f}'
-                }),
+                df_pvp.sort_values('Date', ascending=False).head(12),
+                column_config={
+                    'Close': st.column_config.NumberColumn(format='R$ %.2f'),
+                    'VP_Used': st.column_config.NumberColumn(format='R$ %.2f'),
+                    'P_VP': st.column_config.NumberColumn(format='%.2f'),
+                },
                 use_container_width=True
             )
         else:
@@ -145,16 +264,18 @@ if selected_ticker:
     st.subheader("🔄 Comparativo: Dividend Yield vs P/VP")
     
     if not df_dy.empty and not df_pvp.empty:
-        # Merge dataframes
-        df_merged = pd.merge(
-            df_dy[['Date', 'DY_Monthly']], 
-            df_pvp[['Date', 'P_VP']], 
-            on='Date', 
-            how='outer'
-        ).sort_values('Date')
-        
-        # Filtro de data para não ficar muito extenso se um histórico for muito maior que o outro
-        df_merged = df_merged.dropna(subset=['DY_Monthly', 'P_VP'], how='all')
+        def merge_comparativo():
+            df_merged = pd.merge(
+                df_dy[['Date', 'DY_Monthly']], 
+                downsample(df_pvp, 'Date', 'P_VP', DEFAULT_POINTS)[['Date', 'P_VP']], 
+                on='Date', 
+                how='outer'
+            ).sort_values('Date')
+            # Filtro de data para não ficar muito extenso se um histórico for muito maior que o outro
+            return df_merged.dropna(subset=['DY_Monthly', 'P_VP'], how='all')
+
+        # Merge dataframes (memorizado por ticker/frequência junto com os demais resultados da calculadora)
+        df_merged = calc.result_cache.get_or_compute(('comparativo', selected_ticker, pvp_freq), merge_comparativo)
 
         fig_comp = go.Figure()
         
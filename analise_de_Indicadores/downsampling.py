@@ -0,0 +1,86 @@
+import numpy as np
+
+# Pontos por série enviados ao Plotly: ~2 por pixel de um gráfico largo já é visualmente idêntico à série completa
+DEFAULT_POINTS = 2000
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return values.astype(float)
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: escolhe n_out pontos que preservam o formato visual da série.
+    x/y sem NaN e com x crescente. Retorna os índices posicionais selecionados.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = _as_float(y)
+    # n_out - 2 buckets entre o primeiro e o último ponto: bucket i = [edges[i], edges[i + 1])
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(int) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Média do próximo bucket (depois do último bucket vem o ponto final)
+        if i + 2 < len(edges):
+            next_start, next_end = end, edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(y, n_out):
+    """
+    Mantém o mínimo e o máximo de cada bucket (n_out / 2 buckets de tamanho igual), preservando picos.
+    Mais rápido que LTTB (totalmente vetorizado); indicado para séries intradiárias muito longas.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = n_out // 2
+    size = int(np.ceil(n / n_buckets))
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = _as_float(y)
+    buckets = padded.reshape(n_buckets, size)
+
+    valid = ~np.all(np.isnan(buckets), axis=1)
+    offsets = np.arange(n_buckets)[valid] * size
+    mins = offsets + np.nanargmin(buckets[valid], axis=1)
+    maxs = offsets + np.nanargmax(buckets[valid], axis=1)
+
+    selected = np.unique(np.concatenate([[0, n - 1], mins, maxs]))
+    return selected[selected < n]
+
+def downsample(df, x, y, n_out=DEFAULT_POINTS, method='lttb'):
+    """
+    Reduz df a no máximo ~n_out linhas escolhidas pela série y (as demais colunas acompanham).
+    Linhas com x/y nulos são descartadas; df deve estar ordenado por x.
+    method: 'lttb' (padrão) ou 'minmax'.
+    """
+    df = df.dropna(subset=[x, y])
+    if len(df) <= n_out:
+        return df
+
+    if method == 'lttb':
+        idx = lttb_indices(df[x].to_numpy(), df[y].to_numpy(), n_out)
+    elif method == 'minmax':
+        idx = minmax_indices(df[y].to_numpy(), n_out)
+    else:
+        raise ValueError(f"Método de downsampling desconhecido: {method}")
+    return df.iloc[idx]
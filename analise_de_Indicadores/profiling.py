@@ -0,0 +1,145 @@
+import os
+import io
+import time
+import atexit
+import cProfile
+import pstats
+import threading
+import functools
+from datetime import datetime
+
+# PROFILE_HOT_PATHS=1 liga o profiling dos caminhos quentes em qualquer processo (ETL, dashboards);
+# PROFILE_DIR define onde ficam os artefatos (padrão: ./profiles)
+PROFILE_ENV = 'PROFILE_HOT_PATHS'
+PROFILE_DIR_ENV = 'PROFILE_DIR'
+DEFAULT_TOP_N = 25
+
+class HotPathProfiler:
+    """
+    Profiling por caminho quente (ex.: _get_soup, insert_dataframe, get_pvp_history) com cProfile.
+    Desligado, o wrapper só chama a função. Ligado, cada caminho acumula um cProfile.Profile por thread;
+    chamadas aninhadas (um caminho quente dentro de outro) entram no profile do mais externo.
+    No Python 3.12+ só um cProfile pode estar ativo por vez: chamadas concorrentes de outras threads
+    rodam sem profile e aparecem como 'sem_profile' no resumo.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.run_dir = None
+        self._profiles = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._atexit = False
+
+    def enable(self, output_dir=None):
+        """Liga o profiling; os artefatos vão para output_dir/<timestamp>_<pid>/."""
+        if self.enabled:
+            return self.run_dir
+        output_dir = output_dir or os.getenv(PROFILE_DIR_ENV) or os.path.join(os.getcwd(), 'profiles')
+        self.run_dir = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+        self.enabled = True
+        if not self._atexit:
+            atexit.register(self._dump_at_exit)
+            self._atexit = True
+        return self.run_dir
+
+    def wrap(self, name=None):
+        """Decorador: @profiled('get_pvp_history') (ou sem nome, usa o __qualname__ da função)."""
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or getattr(self._local, 'active', False):
+                    return func(*args, **kwargs)
+                return self._call(label, func, args, kwargs)
+            return wrapper
+        return decorator
+
+    def _call(self, label, func, args, kwargs):
+        key = (label, threading.get_ident())
+        with self._lock:
+            profile = self._profiles.setdefault(key, cProfile.Profile())
+            stats = self._calls.setdefault(label, {'calls': 0, 'total_s': 0.0, 'sem_profile': 0})
+
+        start = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            # Outro profiler ativo (outra thread no Python 3.12+): mede só o tempo
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    stats['calls'] += 1
+                    stats['sem_profile'] += 1
+                    stats['total_s'] += time.perf_counter() - start
+
+        self._local.active = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._local.active = False
+            with self._lock:
+                stats['calls'] += 1
+                stats['total_s'] += time.perf_counter() - start
+
+    def dump(self, top_n=DEFAULT_TOP_N):
+        """
+        Grava um .prof por caminho quente (abrir com snakeviz/pstats) e summary.txt com chamadas,
+        tempo total e as top_n funções por tempo acumulado. Retorna o caminho do resumo (ou None).
+        """
+        with self._lock:
+            profiles = dict(self._profiles)
+            calls = {label: dict(stats) for label, stats in self._calls.items()}
+        if not self.enabled or not calls:
+            return None
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        linhas = [f"Profiling de caminhos quentes - {datetime.now().isoformat()}", ""]
+        linhas.append(f"{'caminho':<40} {'chamadas':>9} {'total_s':>10} {'media_ms':>10} {'sem_profile':>12}")
+        for label, stats in sorted(calls.items(), key=lambda item: -item[1]['total_s']):
+            media = stats['total_s'] / stats['calls'] * 1000 if stats['calls'] else 0
+            linhas.append(f"{label:<40} {stats['calls']:>9} {stats['total_s']:>10.2f} {media:>10.1f} {stats['sem_profile']:>12}")
+
+        for label in sorted(calls):
+            label_profiles = [p for (l, _), p in profiles.items() if l == label]
+            merged = None
+            for profile in label_profiles:
+                try:
+                    if merged is None:
+                        merged = pstats.Stats(profile)
+                    else:
+                        merged.add(profile)
+                except TypeError:
+                    # Profile que nunca chegou a ser ativado (todas as chamadas sem profile)
+                    continue
+            if merged is None:
+                continue
+            merged.dump_stats(os.path.join(self.run_dir, f"{label}.prof"))
+            buffer = io.StringIO()
+            merged.stream = buffer
+            merged.sort_stats('cumulative').print_stats(top_n)
+            linhas += ["", f"===== {label} (top {top_n} por tempo acumulado) =====", buffer.getvalue().strip()]
+
+        summary_path = os.path.join(self.run_dir, 'summary.txt')
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(linhas) + "\n")
+        return summary_path
+
+    def _dump_at_exit(self):
+        try:
+            path = self.dump()
+            if path:
+                print(f"Profiling salvo em: {path}")
+        except Exception as e:
+            print(f"Falha ao salvar profiling: {e}")
+
+# Instância única por processo
+profiler = HotPathProfiler()
+profiled = profiler.wrap
+
+if os.getenv(PROFILE_ENV, '').lower() in ('1', 'true', 'yes', 'sim'):
+    profiler.enable()
@@ -0,0 +1,88 @@
+import os
+import hashlib
+import threading
+import functools
+import inspect
+from collections import OrderedDict
+
+def data_fingerprint(*data_dirs):
+    """
+    Impressão digital barata dos dados de entrada: (nome, tamanho, mtime) de todos os CSVs dos diretórios.
+    Muda sempre que o ETL regrava algum arquivo; serve de chave para descartar calculadoras e caches antigos.
+    """
+    parts = []
+    for data_dir in data_dirs:
+        if not data_dir or not os.path.isdir(data_dir):
+            continue
+        for entry in sorted(os.scandir(data_dir), key=lambda e: e.name):
+            if entry.is_file() and entry.name.endswith('.csv'):
+                stat = entry.stat()
+                parts.append(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+class ResultCache:
+    """
+    Cache LRU de resultados (DataFrames) com tamanho máximo. Sempre devolve cópias,
+    para que quem chamou possa alterar o DataFrame sem corromper a entrada guardada.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(self._entries[key])
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return _copy(result)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+def _copy(value):
+    return value.copy() if hasattr(value, 'copy') else value
+
+def _hashable(value):
+    """Listas de tickers viram tuplas para compor a chave do cache."""
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+def cached_method(method):
+    """
+    Memoriza um método do IndicadoresCalculator em self.result_cache.
+    A chave é o nome do método + argumentos já com os defaults aplicados
+    (get_pvp_history('X') e get_pvp_history('X', freq='D') caem na mesma entrada).
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__, *((name, _hashable(value)) for name, value in list(bound.arguments.items())[1:]))
+        return self.result_cache.get_or_compute(key, lambda: method(self, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,155 @@
+import time
+import pandas as pd
+import numpy as np
+
+class FIIScreener:
+    """
+    Screener do universo de FIIs sobre o painel mensal (mês x ticker) do IndicadoresCalculator.
+    Médias, medianas, z-scores, percentis e drawdowns são calculados para todos os tickers de uma vez,
+    sobre matrizes largas, em vez de chamar get_pvp_history_monthly ticker a ticker.
+    """
+
+    def __init__(self, calc, window_months=60, min_periods=12, max_stale_months=3):
+        self.calc = calc
+        # Janela das estatísticas móveis (60 meses = 5 anos)
+        self.window_months = window_months
+        self.min_periods = min_periods
+        # Meses que o último valor de um ticker pode ser carregado adiante (defasagem de dados)
+        self.max_stale_months = max_stale_months
+        self._panel = None
+        self._stats = {}
+
+    @property
+    def panel(self):
+        """Matrizes mês x ticker de P_VP, Close e DY_12M (construídas uma única vez)."""
+        if self._panel is None:
+            self._panel = self._build_panel()
+        return self._panel
+
+    def _build_panel(self):
+        df_pvp = self.calc.get_pvp_panel('M')
+        df_dy = self.calc.get_dy_panel()
+
+        panel = {}
+        if not df_pvp.empty:
+            panel['P_VP'] = df_pvp.pivot(index='Date', columns='Ticker', values='P_VP')
+            panel['Close'] = df_pvp.pivot(index='Date', columns='Ticker', values='Close')
+        if not df_dy.empty:
+            panel['DY_12M'] = df_dy.pivot(index='Date', columns='Ticker', values='DY_12M')
+
+        if not panel:
+            return {}
+
+        # Calendário comum a todos os indicadores
+        meses = pd.DatetimeIndex(sorted(set().union(*(df.index for df in panel.values()))), name='Date')
+        return {name: df.reindex(meses).ffill(limit=self.max_stale_months) for name, df in panel.items()}
+
+    def rolling_stats(self, metric='P_VP'):
+        """
+        Estatísticas móveis (mês x ticker) do indicador na janela configurada.
+        Retorna dict com os DataFrames 'media', 'mediana', 'desvio', 'zscore' e 'percentil'.
+        """
+        if metric not in self._stats:
+            wide = self.panel[metric]
+            roll = wide.rolling(self.window_months, min_periods=self.min_periods)
+            media = roll.mean()
+            desvio = roll.std()
+            self._stats[metric] = {
+                'media': media,
+                'mediana': roll.median(),
+                'desvio': desvio,
+                'zscore': (wide - media) / desvio.replace(0, np.nan),
+                # Posição do valor atual dentro da própria janela histórica (0-1)
+                'percentil': roll.rank(pct=True),
+            }
+        return self._stats[metric]
+
+    def drawdown(self):
+        """Queda do preço em relação à máxima da janela móvel (mês x ticker, valores <= 0)."""
+        if 'drawdown' not in self._stats:
+            close = self.panel['Close']
+            pico = close.rolling(self.window_months, min_periods=1).max()
+            self._stats['drawdown'] = close / pico - 1
+        return self._stats['drawdown']
+
+    def _snapshot(self):
+        """Última linha de todas as estatísticas: uma linha por ticker."""
+        if 'snapshot' in self._stats:
+            return self._stats['snapshot']
+
+        if not self.panel:
+            return pd.DataFrame()
+
+        colunas = {}
+        for metric, prefix in [('P_VP', 'pvp'), ('DY_12M', 'dy_12m')]:
+            if metric not in self.panel:
+                continue
+            stats = self.rolling_stats(metric)
+            colunas[f'{prefix}_atual'] = self.panel[metric].iloc[-1]
+            colunas[f'{prefix}_media'] = stats['media'].iloc[-1]
+            colunas[f'{prefix}_mediana'] = stats['mediana'].iloc[-1]
+            colunas[f'{prefix}_zscore'] = stats['zscore'].iloc[-1]
+            colunas[f'{prefix}_percentil'] = stats['percentil'].iloc[-1]
+            colunas[f'{prefix}_n_meses'] = self.panel[metric].iloc[-self.window_months:].count()
+
+        if 'Close' in self.panel:
+            drawdown = self.drawdown()
+            colunas['drawdown_atual'] = drawdown.iloc[-1]
+            colunas['drawdown_max'] = drawdown.iloc[-self.window_months:].min()
+
+        df = pd.DataFrame(colunas)
+        df.index.name = 'Ticker'
+        if 'pvp_atual' in df.columns:
+            df['pvp_vs_mediana'] = df['pvp_atual'] / df['pvp_mediana'] - 1
+
+        # Categoria/Tipo do Funds Explorer para os filtros
+        if not self.calc.df_ativos.empty:
+            ativos = self.calc.df_ativos.drop_duplicates('Ticker').set_index('Ticker')
+            for col in ['Categoria', 'Tipo']:
+                if col in ativos.columns:
+                    df[col] = ativos[col].reindex(df.index)
+
+        self._stats['snapshot'] = df
+        return df
+
+    def screen(self, categorias=None, tipos=None, min_meses=None, sort_by='pvp_vs_mediana', ascending=True, top=None):
+        """
+        Ranqueia o universo pelo indicador escolhido (ex.: 'pvp_vs_mediana', 'dy_12m_percentil_universo').
+        categorias/tipos filtram pelas colunas Categoria/Tipo de funds_ativos.
+        min_meses exige um mínimo de meses de P/VP na janela (padrão: min_periods).
+        Retorna DataFrame com uma linha por ticker.
+        """
+        df = self._snapshot()
+        if df.empty:
+            return df
+
+        if categorias is not None and 'Categoria' in df.columns:
+            df = df[df['Categoria'].isin(categorias)]
+        if tipos is not None and 'Tipo' in df.columns:
+            df = df[df['Tipo'].isin(tipos)]
+
+        min_meses = self.min_periods if min_meses is None else min_meses
+        if 'pvp_n_meses' in df.columns:
+            df = df[df['pvp_atual'].notna() & (df['pvp_n_meses'] >= min_meses)]
+
+        df = df.copy()
+        # Percentil do DY 12M entre os fundos selecionados
+        if 'dy_12m_atual' in df.columns:
+            df['dy_12m_percentil_universo'] = df['dy_12m_atual'].rank(pct=True)
+
+        df = df.sort_values(sort_by, ascending=ascending, na_position='last')
+        return df.head(top) if top else df
+
+if __name__ == "__main__":
+    from calculo_indicadores import IndicadoresCalculator
+    calc = IndicadoresCalculator()
+    screener = FIIScreener(calc)
+
+    start = time.perf_counter()
+    screener.panel
+    print(f"Painel construído em {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    df = screener.screen(categorias=['FII'], top=20)
+    print(f"Screen do universo em {time.perf_counter() - start:.2f}s")
+    print(df[['pvp_atual', 'pvp_mediana', 'pvp_vs_mediana', 'dy_12m_atual', 'drawdown_atual']])
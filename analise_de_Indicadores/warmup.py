@@ -0,0 +1,86 @@
+import threading
+import time
+import pandas as pd
+
+class Warmup:
+    """
+    Executa em uma thread de fundo uma lista de tarefas de aquecimento (label, função) logo após o deploy,
+    para que os primeiros usuários encontrem CSVs carregados, conexões abertas e caches preenchidos.
+    `ready` é sinalizado ao final, mesmo que alguma tarefa falhe (falhas são apenas registradas).
+    tasks pode ser um gerador: ele só é consumido na thread, então descobrir os tickers (consulta ao banco,
+    leitura de CSV) também não bloqueia a inicialização.
+    """
+
+    def __init__(self, tasks, name="warmup"):
+        self.tasks = tasks
+        self.total = len(tasks) if hasattr(tasks, '__len__') else None
+        self.name = name
+        self.ready = threading.Event()
+        self.done = 0
+        self.errors = 0
+        self.started_at = None
+        self.elapsed = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self):
+        start = time.perf_counter()
+        print(f"[{self.name}] Aquecimento iniciado.")
+        try:
+            for label, task in self.tasks:
+                try:
+                    task()
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[{self.name}] Falha ao aquecer {label}: {e}")
+                self.done += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[{self.name}] Falha ao montar as tarefas de aquecimento: {e}")
+        self.elapsed = time.perf_counter() - start
+        print(f"[{self.name}] Aquecimento concluído em {self.elapsed:.1f}s ({self.done} tarefas, {self.errors} falhas).")
+        self.ready.set()
+
+    def wait(self, timeout=None):
+        return self.ready.wait(timeout)
+
+    def status(self):
+        elapsed = self.elapsed
+        if elapsed is None and self.started_at is not None:
+            elapsed = time.perf_counter() - self.started_at
+        return {
+            'ready': self.ready.is_set(),
+            'done': self.done,
+            'total': self.total,
+            'errors': self.errors,
+            'elapsed_s': round(elapsed, 2) if elapsed is not None else None,
+        }
+
+def top_liquidity_tickers(calc, n=30):
+    """Tickers com maior liquidez média diária no último snapshot do Funds Explorer."""
+    latest = calc._latest_indicadores()
+    if latest.empty or 'liquidez_media_diaria' not in latest.columns:
+        return []
+    liquidez = pd.to_numeric(latest['liquidez_media_diaria'], errors='coerce').dropna()
+    return liquidez.nlargest(n).index.tolist()
+
+def calculator_warmup(calc, tickers=None, n=30, freqs=('M',)):
+    """
+    Aquecimento do IndicadoresCalculator: calcula (e deixa no result_cache) o DY e o P/VP dos tickers
+    mais líquidos, com os mesmos argumentos usados pelo dashboard para que as chaves do cache coincidam.
+    """
+    if tickers is None:
+        tickers = top_liquidity_tickers(calc, n)
+
+    tasks = []
+    for ticker in tickers:
+        tasks.append((f"DY {ticker}", lambda t=ticker: calc.get_dy_history(t)))
+        for freq in freqs:
+            tasks.append((f"P/VP {ticker} ({freq})", lambda t=ticker, f=freq: calc.get_pvp_history(t, freq=f)))
+    return Warmup(tasks, name="warmup-calculadora")
@@ -1,15 +1,70 @@
+import os
+import sys
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, DiskcacheManager
 import pandas as pd
-from utils.db_conn import get_db_engine
-from components.graphs import plot_category_count, plot_dividend_chart
+from utils import queries
+from components.graphs import (plot_category_totals, plot_dividend_chart, plot_price_history,
+                               plot_overlay, plot_correlation_matrix)
 
-app = dash.Dash(__name__)
+# O downsampling é compartilhado com o dashboard Streamlit (analise_de_Indicadores)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from analise_de_Indicadores.downsampling import downsample, DEFAULT_POINTS
+from analise_de_Indicadores.warmup import Warmup
+
+def _background_callback_manager():
+    """
+    Callbacks demorados (cotações com zoom, comparação) rodam em processos do DiskcacheManager, fora da
+    thread da requisição. O resultado fica no diskcache, compartilhado entre os workers do gunicorn,
+    chaveado pelos inputs + versão dos dados do ETL (uma nova carga invalida tudo).
+    """
+    try:
+        import diskcache
+    except ImportError:
+        print("diskcache não instalado: callbacks demorados vão rodar na thread da requisição.")
+        return None
+    cache = diskcache.Cache(os.getenv('DASH_DISKCACHE_DIR', os.path.join(current_dir, '.dash_cache')))
+    return DiskcacheManager(
+        cache,
+        cache_by=[lambda: str(queries.query_cache.current_version())],
+        expire=int(os.getenv('DASH_CACHE_TTL', 300)),
+    )
+
+background_callback_manager = _background_callback_manager()
+BACKGROUND = background_callback_manager is not None
+
+app = dash.Dash(__name__, background_callback_manager=background_callback_manager)
+# Entrada WSGI (ver wsgi.py / gunicorn.conf.py)
 server = app.server
 
-def get_data(query):
-    engine = get_db_engine()
-    return pd.read_sql(query, engine)
+def _warmup_tasks(n=30):
+    """Abre o pool e preenche o cache de consultas com as telas iniciais e os tickers mais líquidos."""
+    yield "engine", lambda: queries.get_db_engine().connect().close()
+    yield "tickers", queries.list_tickers
+    yield "setores", queries.count_by_category
+    for ticker in queries.top_liquidity_tickers(n):
+        yield f"dividendos {ticker}", lambda t=ticker: queries.get_dy_monthly(t)
+        yield f"p/vp {ticker}", lambda t=ticker: queries.get_pvp_monthly(t)
+        yield f"snapshot {ticker}", lambda t=ticker: queries.get_snapshot(t)
+        yield f"cotações {ticker}", lambda t=ticker: queries.get_price_history(
+            t, queries.pick_interval(queries.price_intervals(t)))
+
+# DASH_WARMUP=0 desliga o aquecimento (ex.: benchmarks e testes locais)
+if os.getenv('DASH_WARMUP', '1') != '0':
+    warmup = Warmup(_warmup_tasks(), name="warmup-dash").start()
+else:
+    warmup = Warmup([], name="warmup-dash")
+    warmup.ready.set()
+
+@server.route('/ready')
+def ready():
+    """Readiness probe: 200 quando o aquecimento terminou, 503 enquanto ainda está rodando."""
+    status = warmup.status()
+    return status, 200 if status['ready'] else 503
 
 # Layout
 app.layout = html.Div([
@@ -26,7 +81,28 @@ app.layout = html.Div([
             html.Div([
                 html.Label("Selecione o Ticker:"),
                 dcc.Dropdown(id='ticker-dropdown', options=[], placeholder="Carregando..."),
-                dcc.Graph(id='graph-dividend-history')
+                html.Div(id='ticker-snapshot'),
+                dcc.Graph(id='graph-dividend-history'),
+                dcc.Graph(id='graph-pvp-history'),
+                dcc.Graph(id='graph-price-history')
+            ])
+        ]),
+        dcc.Tab(label='Comparação', children=[
+            html.Div([
+                html.Label("Selecione os Tickers:"),
+                dcc.Dropdown(id='compare-dropdown', options=[], multi=True, placeholder="Carregando..."),
+                dcc.RadioItems(
+                    id='compare-metric',
+                    options=[
+                        {'label': 'P/VP', 'value': 'p_vp'},
+                        {'label': 'DY 12M (%)', 'value': 'dy_12m'},
+                        {'label': 'Preço (base 100)', 'value': 'close'},
+                    ],
+                    value='p_vp',
+                    inline=True,
+                ),
+                dcc.Graph(id='graph-compare-overlay'),
+                dcc.Graph(id='graph-compare-corr')
             ])
         ])
     ])
@@ -39,15 +115,12 @@ app.layout = html.Div([
 )
 def update_sector_graph(_):
     try:
-        df = get_data("SELECT * FROM funds_ativos")
-        # Assumindo que exista uma coluna 'segmento' ou 'setor'. 
-        # Ajuste conforme o nome real da coluna no DB (que foi limpo por clean_column_name)
-        # Ex: 'segmento'
-        if 'segmento' in df.columns:
-            return plot_category_count(df, 'segmento', title="FIIs por Segmento")
-        elif 'tipo' in df.columns:
-             return plot_category_count(df, 'tipo', title="FIIs por Tipo")
-        return {}
+        # Contagem agregada no banco: o payload tem uma linha por categoria, não por fundo
+        column, df = queries.count_by_category()
+        if column is None or df.empty:
+            return {}
+        titulo = {'segmento': "FIIs por Segmento", 'tipo': "FIIs por Tipo"}.get(column, f"FIIs por {column.title()}")
+        return plot_category_totals(df, 'categoria', 'total', title=titulo)
     except Exception as e:
         print(f"Erro ao carregar gráfico de setores: {e}")
         return {}
@@ -59,8 +132,7 @@ def update_sector_graph(_):
 )
 def update_dropdown(_):
     try:
-        df = get_data("SELECT DISTINCT ticker FROM funds_ativos ORDER BY ticker")
-        options = [{'label': t, 'value': t} for t in df['ticker']]
+        options = [{'label': t, 'value': t} for t in queries.list_tickers()]
         return options, options[0]['value'] if options else None
     except:
         return [], None
@@ -73,28 +145,158 @@ def update_dividend_graph(ticker):
     if not ticker:
         return {}
     try:
-        # Exemplo de query para rendimentos
-        # Ajuste os nomes das colunas conforme o schema real
-        query = f"SELECT * FROM funds_rendimentos WHERE ticker = '{ticker}'"
-        df = get_data(query)
-        
+        # DY mensal já materializado pelo ETL (gold_dy_mensal); proventos brutos só para tickers fora do gold
+        df = queries.get_dy_monthly(ticker)
+        title = "Dividendos e Dividend Yield (mensal)"
+        if df.empty:
+            df = queries.get_dividend_history(ticker)
+            title = "Dividendos e Dividend Yield"
         if df.empty:
             return {}
-            
-        # Converter datas e valores se necessário
-        # Assumindo colunas 'data_pagamento', 'valor_rendimento', 'dividend_yield'
-        # Ajuste conforme colunas reais
-        col_date = 'data_base' if 'data_base' in df.columns else 'data_com'
-        col_val = 'rendimento'
-        col_dy = 'dividend_yield'
-        
-        if col_date in df.columns and col_val in df.columns:
-             return plot_dividend_chart(df, col_date, col_val, col_dy if col_dy in df.columns else col_val)
-        return {}
+        return plot_dividend_chart(df, 'data', 'rendimento', 'dividend_yield', title=title)
     except Exception as e:
         print(f"Erro ao carregar gráfico de dividendos: {e}")
         return {}
 
+@app.callback(
+    Output('graph-pvp-history', 'figure'),
+    Input('ticker-dropdown', 'value')
+)
+def update_pvp_graph(ticker):
+    if not ticker:
+        return {}
+    try:
+        df = queries.get_pvp_monthly(ticker)
+        if df.empty:
+            return {}
+        wide = df.set_index('date')[['p_vp']].rename(columns={'p_vp': ticker})
+        return plot_overlay(wide, title=f"{ticker} - P/VP Mensal", yaxis_title="P/VP", reference_line=1.0)
+    except Exception as e:
+        print(f"Erro ao carregar gráfico de P/VP: {e}")
+        return {}
+
+def _format_snapshot(snapshot):
+    """Linha de resumo com o último P/VP e DY do ticker (gold_snapshot)."""
+    partes = []
+    if pd.notna(snapshot.get('p_vp')):
+        partes.append(f"P/VP: {snapshot['p_vp']:.2f}")
+    if pd.notna(snapshot.get('close')):
+        partes.append(f"Preço: R$ {snapshot['close']:.2f}")
+    if pd.notna(snapshot.get('dy_monthly')):
+        partes.append(f"DY mensal: {snapshot['dy_monthly']:.2f}%")
+    if pd.notna(snapshot.get('dy_12m')):
+        partes.append(f"DY 12M: {snapshot['dy_12m']:.2f}%")
+    if pd.notna(snapshot.get('date')):
+        partes.append(f"Referência: {pd.Timestamp(snapshot['date']):%d/%m/%Y}")
+    return " | ".join(partes)
+
+@app.callback(
+    Output('ticker-snapshot', 'children'),
+    Input('ticker-dropdown', 'value')
+)
+def update_snapshot(ticker):
+    if not ticker:
+        return ""
+    try:
+        snapshot = queries.get_snapshot(ticker)
+        return _format_snapshot(snapshot) if snapshot else ""
+    except Exception as e:
+        print(f"Erro ao carregar snapshot: {e}")
+        return ""
+
+@app.callback(
+    [Output('compare-dropdown', 'options'),
+     Output('compare-dropdown', 'value')],
+    Input('compare-dropdown', 'id')  # Dummy input to trigger on load
+)
+def update_compare_dropdown(_):
+    try:
+        tickers = queries.list_tickers()
+        # Começa com os mais líquidos (já aquecidos no cache)
+        default = [t for t in queries.top_liquidity_tickers(5) if t in tickers] or tickers[:5]
+        return [{'label': t, 'value': t} for t in tickers], default
+    except Exception as e:
+        print(f"Erro ao carregar tickers da comparação: {e}")
+        return [], []
+
+@app.callback(
+    [Output('graph-compare-overlay', 'figure'),
+     Output('graph-compare-corr', 'figure')],
+    [Input('compare-dropdown', 'value'),
+     Input('compare-metric', 'value')],
+    background=BACKGROUND,
+    running=[(Output('graph-compare-overlay', 'style'), {'opacity': 0.5}, {'opacity': 1})],
+)
+def update_compare_graphs(tickers, metric):
+    if not tickers:
+        return {}, {}
+    try:
+        # Uma consulta (WHERE ticker IN ...) para todos os ativos selecionados
+        wide = queries.get_comparison_series(tickers, metric)
+        if wide.empty:
+            return {}, {}
+
+        labels = {'p_vp': 'P/VP', 'dy_12m': 'DY 12M (%)', 'close': 'Preço (base 100)'}
+        if metric == 'close':
+            wide = wide / wide.bfill().iloc[0] * 100
+        fig_overlay = plot_overlay(wide, title=f"{labels[metric]} - Mensal", yaxis_title=labels[metric],
+                                   reference_line=1.0 if metric == 'p_vp' else None)
+
+        # Correlação das variações mensais (níveis andam juntos só por tendência)
+        variacao = wide.pct_change(fill_method=None) if metric == 'close' else wide.diff()
+        fig_corr = plot_correlation_matrix(variacao.corr(min_periods=12),
+                                           title=f"Correlação das variações mensais de {labels[metric]}")
+        return fig_overlay, fig_corr
+    except Exception as e:
+        print(f"Erro ao carregar comparação: {e}")
+        return {}, {}
+
+def _visible_range(relayout_data):
+    """Janela do eixo x após zoom/pan (None, None quando o gráfico está no autorange)."""
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout_data:
+        inicio, fim = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        inicio, fim = relayout_data['xaxis.range']
+    else:
+        return None, None
+    return pd.Timestamp(inicio), pd.Timestamp(fim)
+
+@app.callback(
+    Output('graph-price-history', 'figure'),
+    [Input('ticker-dropdown', 'value'),
+     Input('graph-price-history', 'relayoutData')],
+    background=BACKGROUND,
+    running=[(Output('graph-price-history', 'style'), {'opacity': 0.5}, {'opacity': 1})],
+)
+def update_price_graph(ticker, relayout_data):
+    if not ticker:
+        return {}
+    try:
+        # Zoom não vem do ticker anterior: ao trocar de ativo o gráfico volta ao histórico completo
+        if dash.callback_context.triggered_id == 'ticker-dropdown':
+            relayout_data = None
+        start, end = _visible_range(relayout_data)
+
+        # Resolução conforme a janela visível: diário no histórico completo, intradiário no zoom
+        intervalo = queries.pick_interval(queries.price_intervals(ticker), start, end)
+        if intervalo is None:
+            return {}
+        df = queries.get_price_history(ticker, intervalo, start, end)
+        if df.empty:
+            return {}
+
+        total = len(df)
+        df = downsample(df, 'data', 'close', DEFAULT_POINTS)
+        title = f"{ticker} - Cotação ({intervalo}, {len(df)} de {total} pontos)"
+        return plot_price_history(df, 'data', 'close', title=title, x_range=(start, end) if start else None,
+                                  uirevision=ticker)
+    except Exception as e:
+        print(f"Erro ao carregar gráfico de cotações: {e}")
+        return {}
+
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use: gunicorn -c gunicorn.conf.py wsgi:server
     app.run(debug=True)
 
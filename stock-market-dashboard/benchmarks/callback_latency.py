@@ -0,0 +1,137 @@
+"""
+Mede a latência e o tamanho do payload dos callbacks do Dash contra um SQLite local
+que imita o schema carregado pelo ETL (colunas já passadas por clean_column_name).
+
+Compara três cenários para cada callback:
+- sem_pool: engine nova a cada consulta, sem cache
+- pool: engine única com pool, cache desligado
+- pool_cache: engine única com pool e cache de resultados (chamadas repetidas)
+
+Com vários --tickers é possível verificar que latência e payload ficam estáveis com o crescimento das tabelas.
+
+Uso (a partir de stock-market-dashboard/):
+    python benchmarks/callback_latency.py --tickers 700 5000 --repeat 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+dashboard_root = os.path.dirname(current_dir)
+if dashboard_root not in sys.path:
+    sys.path.append(dashboard_root)
+
+def build_database(path, n_tickers, months=60, seed=42):
+    """Cria funds_ativos e funds_rendimentos sintéticos (com o índice em ticker do loader) no SQLite em path."""
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:04d}11" for i in range(n_tickers)]
+
+    df_ativos = pd.DataFrame({
+        'categoria': rng.choice(['FII', 'FIAGRO', 'FI-INFRA'], n_tickers),
+        'tipo': rng.choice(['Logística', 'Shoppings', 'Lajes Corporativas', 'Papel', 'Híbrido', 'Agro'], n_tickers),
+        'ticker': tickers,
+        'descricao': [f"Fundo {t}" for t in tickers],
+    })
+
+    datas = pd.date_range('2020-01-01', periods=months, freq='MS').strftime('%d/%m/%Y')
+    n = n_tickers * months
+    df_rend = pd.DataFrame({
+        'ticker': np.repeat(tickers, months),
+        'data_base': np.tile(datas, n_tickers),
+        'data_de_pagamento': np.tile(datas, n_tickers),
+        'valor_por_cota_r': pd.Series(rng.uniform(0.05, 1.5, n).round(2)).map(lambda v: f"{v:.2f}".replace('.', ',')),
+        'fechamento_r': pd.Series(rng.uniform(8, 120, n).round(2)).map(lambda v: f"{v:.2f}".replace('.', ',')),
+        'yield_1m': pd.Series(rng.uniform(0.3, 1.4, n).round(2)).map(lambda v: f"{v:.2f}".replace('.', ',')),
+    })
+
+    engine = create_engine(f"sqlite:///{path}")
+    df_ativos.to_sql('funds_ativos', engine, index=False, if_exists='replace')
+    df_rend.to_sql('funds_rendimentos', engine, index=False, if_exists='replace')
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_funds_ativos_ticker ON funds_ativos (ticker)"))
+        conn.execute(text("CREATE INDEX ix_funds_rendimentos_ticker ON funds_rendimentos (ticker)"))
+    pd.DataFrame({'version': [pd.Timestamp.now()], 'source': ['benchmark']}).to_sql(
+        'etl_data_version', engine, index=False, if_exists='replace')
+    engine.dispose()
+    return tickers
+
+def _timed(fn, repeat):
+    tempos = []
+    payload = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = fn()
+        tempos.append((time.perf_counter() - start) * 1000)
+        payload = len(fig.to_json()) if hasattr(fig, 'to_json') else 0
+    tempos.sort()
+    return {
+        'p50_ms': statistics.median(tempos),
+        'p95_ms': tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+        'payload_kb': payload / 1024,
+    }
+
+def run(n_tickers, repeat):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='dash_bench_'), 'bench.db')
+    tickers = build_database(db_path, n_tickers)
+    os.environ['DATABASE_URI'] = f"sqlite:///{db_path}"
+    # Sem aquecimento: os cenários medem o custo a frio de cada callback
+    os.environ['DASH_WARMUP'] = '0'
+
+    import app
+    from utils import db_conn, queries
+
+    rng = np.random.default_rng(0)
+    sample = list(rng.choice(tickers, 10))
+    contador = iter(range(10 ** 9))
+
+    callbacks = {
+        'update_sector_graph': lambda: app.update_sector_graph(None),
+        'update_dropdown': lambda: app.update_dropdown(None),
+        'update_dividend_graph': lambda: app.update_dividend_graph(sample[next(contador) % len(sample)]),
+    }
+
+    # Engine nova por consulta, sem cache (comportamento anterior ao pool)
+    original_get_data = queries.get_data
+    def get_data_sem_pool(query, params=None):
+        engine = create_engine(os.environ['DATABASE_URI'])
+        with engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
+
+    resultados = []
+    for cenario in ['sem_pool', 'pool', 'pool_cache']:
+        queries.get_data = get_data_sem_pool if cenario == 'sem_pool' else original_get_data
+        queries.query_cache.ttl = 300 if cenario == 'pool_cache' else 0
+        queries.query_cache.clear()
+        db_conn.dispose_engine()
+
+        for nome, fn in callbacks.items():
+            stats = _timed(fn, repeat)
+            resultados.append({'tickers': n_tickers, 'cenario': cenario, 'callback': nome, **stats})
+
+    queries.get_data = original_get_data
+    queries.query_cache.ttl = 300
+    queries.query_cache.clear()
+    db_conn.dispose_engine()
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de latência dos callbacks do Dash (SQLite local).")
+    parser.add_argument('--tickers', type=int, nargs='+', default=[700])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    resultados = []
+    for n in args.tickers:
+        resultados.extend(run(n, args.repeat))
+    df = pd.DataFrame(resultados)
+
+    print(f"\nLatência p50 (ms), {args.repeat} chamadas por callback")
+    print(df.pivot_table(index=['tickers', 'callback'], columns='cenario', values='p50_ms')[['sem_pool', 'pool', 'pool_cache']].round(2))
+    print("\nPayload da figura (KB)")
+    print(df[df['cenario'] == 'pool_cache'].pivot_table(index='callback', columns='tickers', values='payload_kb').round(1))
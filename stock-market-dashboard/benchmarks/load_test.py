@@ -0,0 +1,181 @@
+"""
+Teste de carga local do dashboard: dispara requisições concorrentes aos callbacks pelo mesmo endpoint
+que o navegador usa (/_dash-update-component) e mede vazão e latência.
+
+Por padrão sobe o próprio servidor contra um SQLite sintético (ver callback_latency.build_database):
+- dev: servidor do Flask em uma única thread (equivalente a app.run sem threads)
+- gunicorn: gunicorn.conf.py (workers x threads); callbacks em background via DiskcacheManager
+
+Uso (a partir de stock-market-dashboard/):
+    python benchmarks/load_test.py --server dev gunicorn --concurrency 16 --requests 400
+    python benchmarks/load_test.py --url http://localhost:8050   # servidor já rodando
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+dashboard_root = os.path.dirname(current_dir)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from callback_latency import build_database
+
+def build_prices(path, tickers, start='2015-01-01', end='2024-12-31', seed=7):
+    """Adiciona cotacoes_historico diário (formato do loader) ao SQLite."""
+    rng = np.random.default_rng(seed)
+    datas = pd.bdate_range(start, end).strftime('%Y-%m-%d')
+    n = len(datas)
+    df = pd.DataFrame({
+        'date': np.tile(datas, len(tickers)),
+        'ticker': np.repeat(tickers, n),
+        'close': (10 + np.cumsum(rng.normal(0, 0.05, (len(tickers), n)), axis=1)).ravel(),
+        'intervalo': '1d',
+    })
+    engine = create_engine(f"sqlite:///{path}")
+    df.to_sql('cotacoes_historico', engine, index=False, if_exists='replace', chunksize=50_000)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE INDEX ix_cotacoes_historico_ticker_intervalo ON cotacoes_historico (ticker, intervalo)")
+    engine.dispose()
+
+def _payload(output_id, output_prop, inputs):
+    return {
+        'output': f"{output_id}.{output_prop}",
+        'outputs': {'id': output_id, 'property': output_prop},
+        'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in inputs],
+        'changedPropIds': [f"{inputs[0][0]}.{inputs[0][1]}"],
+        'state': [],
+    }
+
+def _post(url, body, timeout=60):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def call_callback(base_url, body, poll_interval=0.05, timeout=60):
+    """Executa um callback; callbacks em background devolvem um job que é consultado até ter resposta."""
+    endpoint = f"{base_url}/_dash-update-component"
+    status, content = _post(endpoint, body, timeout)
+    data = json.loads(content) if content else {}
+    if 'job' not in data:
+        return status
+
+    deadline = time.monotonic() + timeout
+    query = f"?cacheKey={data['cacheKey']}&job={data['job']}"
+    while time.monotonic() < deadline:
+        status, content = _post(endpoint + query, body, timeout)
+        if status != 200 or b'"response"' in content:
+            return status
+        time.sleep(poll_interval)
+    return 504
+
+def run_load(base_url, tickers, concurrency, n_requests, seed=0):
+    rng = random.Random(seed)
+    cenarios = {
+        'update_sector_graph': lambda t: _payload('graph-sector-count', 'figure', [('graph-sector-count', 'id', 'graph-sector-count')]),
+        'update_dividend_graph': lambda t: _payload('graph-dividend-history', 'figure', [('ticker-dropdown', 'value', t)]),
+        'update_price_graph': lambda t: _payload('graph-price-history', 'figure',
+                                                 [('ticker-dropdown', 'value', t), ('graph-price-history', 'relayoutData', None)]),
+    }
+    jobs = [(nome, fn(rng.choice(tickers))) for nome, fn in
+            (rng.choice(list(cenarios.items())) for _ in range(n_requests))]
+
+    def executar(job):
+        nome, body = job
+        start = time.perf_counter()
+        status = call_callback(base_url, body)
+        return nome, status, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        resultados = list(executor.map(executar, jobs))
+    total = time.perf_counter() - start
+
+    df = pd.DataFrame(resultados, columns=['callback', 'status', 'ms'])
+    resumo = df.groupby('callback')['ms'].agg(
+        p50='median', p95=lambda s: s.quantile(0.95), n='count').round(1)
+    erros = int((df['status'] != 200).sum())
+    return {'throughput_rps': round(n_requests / total, 1), 'erros': erros, 'total_s': round(total, 1)}, resumo
+
+def _wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=2) as resp:
+                if resp.status == 200:
+                    return True
+        except Exception:
+            time.sleep(0.5)
+    return False
+
+def start_server(kind, port, env, workers):
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server',
+               '-b', f'127.0.0.1:{port}', '-w', str(workers), '--log-level', 'warning', '--access-logfile', '/dev/null']
+    else:
+        cmd = [sys.executable, '-c',
+               f"from app import app; app.run(host='127.0.0.1', port={port}, debug=False, threaded=False)"]
+    return subprocess.Popen(cmd, cwd=dashboard_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga dos callbacks do Dash.")
+    parser.add_argument('--url', help="Servidor já em execução (não sobe um novo)")
+    parser.add_argument('--server', nargs='+', choices=['dev', 'gunicorn'], default=['dev', 'gunicorn'])
+    parser.add_argument('--workers', type=int, default=None, help="Workers do gunicorn (padrão: gunicorn.conf.py)")
+    parser.add_argument('--tickers', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    args = parser.parse_args()
+
+    if args.url:
+        # Tickers do próprio servidor não são conhecidos aqui: usa o padrão do banco sintético
+        tickers = [f"T{i:04d}11" for i in range(args.tickers)]
+        stats, resumo = run_load(args.url.rstrip('/'), tickers, args.concurrency, args.requests)
+        print(stats)
+        print(resumo)
+        sys.exit(0)
+
+    tmp_dir = tempfile.mkdtemp(prefix='dash_load_')
+    db_path = os.path.join(tmp_dir, 'load.db')
+    tickers = build_database(db_path, args.tickers)
+    build_prices(db_path, tickers)
+
+    env = {**os.environ, 'DATABASE_URI': f"sqlite:///{db_path}", 'DASH_WARMUP': '0'}
+    if args.workers:
+        env['DASH_WORKERS'] = str(args.workers)
+
+    for i, kind in enumerate(args.server):
+        port = 8150 + i
+        env['DASH_DISKCACHE_DIR'] = os.path.join(tmp_dir, f'diskcache_{kind}')
+        proc = start_server(kind, port, env, args.workers or int(os.getenv('DASH_WORKERS', 4)))
+        try:
+            if not _wait_ready(f"http://127.0.0.1:{port}"):
+                print(f"Servidor {kind} não respondeu.")
+                continue
+            stats, resumo = run_load(f"http://127.0.0.1:{port}", tickers, args.concurrency, args.requests)
+            print(f"\n=== {kind} ({args.concurrency} clientes, {args.requests} requisições) ===")
+            print(stats)
+            print(resumo)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -12,6 +12,17 @@ def plot_category_count(df, column_name, title="Category Count", xaxis_title="Ca
     )
     return fig
 
+def plot_category_totals(df, column_name, count_column, title="Category Count", xaxis_title="Category", yaxis_title="Count"):
+    """Igual a plot_category_count, mas para contagens já agregadas (ex.: GROUP BY no banco)."""
+    # go.Bar direto: px.bar custa ~50ms por figura só em validação, mais que a própria consulta
+    fig = go.Figure(go.Bar(x=df[column_name], y=df[count_column]))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title
+    )
+    return fig
+
 def plot_horizontal_bar(df, x_column, y_column, title="Horizontal Bar Chart", xaxis_title="Value", yaxis_title="Category", orientation='h'):
     df_sorted = df.sort_values(by=x_column, ascending=True)
     
@@ -63,3 +74,54 @@ def plot_dividend_chart(df, date_column, value_column, yield_column, title="Divi
     )
     return fig
 
+def plot_price_history(df, date_column, price_column, title="Cotação", x_range=None, uirevision=None):
+    """Linha de preço em WebGL (Scattergl); df já deve vir reduzido pelo downsampling."""
+    fig = go.Figure(go.Scattergl(
+        x=df[date_column],
+        y=df[price_column],
+        mode='lines',
+        name='Fechamento (R$)',
+        line=dict(color='rgba(131, 175, 210, 1)'),
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Data",
+        yaxis_title="Preço (R$)",
+        hovermode="x unified",
+        # Mantém o zoom do usuário quando a figura é refeita com dados mais finos
+        uirevision=uirevision,
+    )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+def plot_overlay(df_wide, title="Comparação", yaxis_title="Valor", reference_line=None):
+    """Uma linha por coluna de df_wide (índice = data), para comparar vários ativos no mesmo eixo."""
+    fig = go.Figure()
+    for column in df_wide.columns:
+        serie = df_wide[column].dropna()
+        fig.add_trace(go.Scattergl(x=serie.index, y=serie.values, mode='lines', name=str(column)))
+    if reference_line is not None:
+        fig.add_hline(y=reference_line, line_dash="dash", line_color="red")
+    fig.update_layout(
+        title=title,
+        xaxis_title="Data",
+        yaxis_title=yaxis_title,
+        hovermode="x unified",
+        legend=dict(orientation="h", y=1.1),
+    )
+    return fig
+
+def plot_correlation_matrix(corr, title="Matriz de Correlação"):
+    fig = go.Figure(go.Heatmap(
+        z=corr.values,
+        x=list(corr.columns),
+        y=list(corr.index),
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        text=corr.round(2).values,
+        texttemplate="%{text}",
+    ))
+    fig.update_layout(title=title, yaxis=dict(autorange='reversed'))
+    return fig
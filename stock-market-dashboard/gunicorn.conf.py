@@ -0,0 +1,26 @@
+# Configuração do gunicorn para o dashboard (gunicorn -c gunicorn.conf.py wsgi:server)
+import os
+import multiprocessing
+
+bind = os.getenv('DASH_BIND', '0.0.0.0:8050')
+
+# Vários processos, cada um com seu pool de conexões e cache de consultas, para que uma consulta lenta
+# não bloqueie as demais requisições. Os jobs dos callbacks em background são criados com fork a partir
+# do worker; fork de um processo com várias threads pode deixar o job travado em um lock herdado,
+# por isso o padrão é uma thread por worker (escale com DASH_WORKERS). Com DASH_THREADS > 1 o gunicorn
+# usa o worker gthread.
+workers = int(os.getenv('DASH_WORKERS', min(4, multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('DASH_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Callbacks em background respondem rápido (o job roda em outro processo); o timeout cobre os síncronos
+timeout = int(os.getenv('DASH_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Sem preload: o aquecimento (thread) e o pool de conexões são criados em cada worker
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('DASH_LOG_LEVEL', 'info')
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class QueryCache:
+    """
+    Cache em memória dos resultados de consultas (DataFrames), com expiração por tempo (TTL).
+    A chave é a query parametrizada + os parâmetros, então a mesma consulta com outro ticker é outra entrada.
+
+    version_fn (opcional) devolve a versão atual dos dados (ex.: etl_data_version). Ela é consultada
+    no máximo a cada version_check_interval segundos e, quando muda, o cache inteiro é descartado.
+    """
+
+    def __init__(self, ttl=300, max_entries=256, version_fn=None, version_check_interval=10):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.version_check_interval = version_check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = None
+        # Incrementada a cada limpeza; consultas que começaram antes dela não gravam o resultado
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        # Um fork com o lock em uso (ex.: pela thread de aquecimento) deixaria o filho travado
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query, params=None):
+        if not params:
+            return (query, ())
+        # Listas (ex.: IN :tickers) viram tuplas para a chave ser hashable
+        return (query, tuple(sorted(
+            (k, tuple(v) if isinstance(v, (list, set)) else v) for k, v in params.items()
+        )))
+
+    def _check_version(self):
+        """
+        Consulta version_fn quando o intervalo venceu e limpa o cache se a versão mudou. A consulta ao banco
+        roda fora do lock: só a thread que reserva a verificação (_version_checked_at) faz a chamada.
+        """
+        if self.version_fn is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at is not None and now - self._version_checked_at < self.version_check_interval:
+                return
+            self._version_checked_at = now
+        try:
+            version = self.version_fn()
+        except Exception as e:
+            print(f"Erro ao verificar versão dos dados: {e}")
+            return
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    print(f"Dados atualizados pelo ETL ({version}). Limpando cache de consultas.")
+                self._version = version
+                self._clear()
+
+    def current_version(self):
+        """Versão dos dados vista pelo cache (verificada no máximo a cada version_check_interval)."""
+        self._check_version()
+        with self._lock:
+            return self._version
+
+    def get_or_load(self, query, params, loader):
+        """Retorna o resultado em cache ou executa loader() e guarda o resultado."""
+        key = self.make_key(query, params)
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1].copy()
+            self.misses += 1
+            generation = self._generation
+
+        # A consulta roda fora do lock para não serializar callbacks que buscam chaves diferentes
+        result = loader()
+
+        with self._lock:
+            # Cache limpo durante a consulta (nova carga do ETL): o resultado pode ser da versão antiga
+            if self._generation == generation:
+                self._entries[key] = (time.monotonic(), result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result.copy()
+
+    def _clear(self):
+        # Chamado com o lock; resultados de consultas iniciadas antes não são mais gravados
+        self._entries.clear()
+        self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,256 @@
+import os
+import pandas as pd
+from sqlalchemy import text, inspect, bindparam
+from utils.db_conn import get_db_engine
+from utils.cache import QueryCache
+
+# Consultas usadas pelos callbacks do Dash. Todas são parametrizadas (:ticker), trazem só as colunas
+# necessárias e agregam no banco; nomes de coluna/tabela só entram na SQL depois de validados contra o schema.
+
+def _data_version():
+    """Versão gravada pelo ETL ao fim de cada carga (None se a tabela ainda não existe)."""
+    try:
+        with get_db_engine().connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM etl_data_version")).scalar()
+    except Exception:
+        return None
+
+query_cache = QueryCache(
+    ttl=int(os.getenv('DASH_CACHE_TTL', 300)),
+    version_fn=_data_version,
+)
+
+def get_data(query, params=None):
+    """
+    Executa a query (com parâmetros nomeados, ex.: :ticker) usando o pool e o cache de resultados.
+    Parâmetros do tipo lista viram IN expandido (ex.: "WHERE ticker IN :tickers").
+    """
+    def load():
+        stmt = text(query)
+        expanding = [name for name, value in (params or {}).items() if isinstance(value, (list, tuple))]
+        if expanding:
+            stmt = stmt.bindparams(*(bindparam(name, expanding=True) for name in expanding))
+        with get_db_engine().connect() as conn:
+            return pd.read_sql(stmt, conn, params=params)
+    return query_cache.get_or_load(query, params, load)
+
+def table_columns(table):
+    """Colunas da tabela (lista vazia se ela não existe). Também fica no cache até a próxima carga."""
+    def load():
+        inspector = inspect(get_db_engine())
+        if not inspector.has_table(table):
+            return []
+        return [col['name'] for col in inspector.get_columns(table)]
+    return query_cache.get_or_load(f"__columns__:{table}", None, load)
+
+def _first_column(table, candidates):
+    columns = set(table_columns(table))
+    return next((col for col in candidates if col in columns), None)
+
+def _to_number(series):
+    """Converte valores no formato brasileiro ("1.234,56", "0,85%") quando vierem como texto."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    cleaned = (series.astype(str).str.replace('%', '', regex=False).str.replace('R$', '', regex=False)
+               .str.strip().str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(cleaned, errors='coerce')
+
+def list_tickers():
+    return get_data("SELECT DISTINCT ticker FROM funds_ativos ORDER BY ticker")['ticker'].tolist()
+
+def count_by_category(candidates=('segmento', 'tipo', 'categoria')):
+    """
+    Quantidade de fundos por categoria, agregada no banco (GROUP BY).
+    Usa a primeira coluna de candidates que existir em funds_ativos.
+    Retorna (coluna, DataFrame[categoria, total]) ou (None, DataFrame vazio).
+    """
+    column = _first_column('funds_ativos', candidates)
+    if column is None:
+        return None, pd.DataFrame(columns=['categoria', 'total'])
+    df = get_data(
+        f"SELECT {column} AS categoria, COUNT(*) AS total FROM funds_ativos "
+        f"GROUP BY {column} ORDER BY total DESC"
+    )
+    return column, df
+
+def get_dividend_history(ticker):
+    """
+    Histórico de proventos de um ticker (lookup pelo índice em funds_rendimentos.ticker).
+    Retorna DataFrame[data, rendimento, dividend_yield] ordenado por data.
+    """
+    table = 'funds_rendimentos'
+    col_date = _first_column(table, ['data_base', 'data_com'])
+    col_val = _first_column(table, ['rendimento', 'valor_por_cota_r'])
+    col_dy = _first_column(table, ['dividend_yield', 'yield_1m'])
+    if col_date is None or col_val is None:
+        return pd.DataFrame(columns=['data', 'rendimento', 'dividend_yield'])
+
+    select = [f"{col_date} AS data", f"{col_val} AS rendimento"]
+    if col_dy:
+        select.append(f"{col_dy} AS dividend_yield")
+    df = get_data(f"SELECT {', '.join(select)} FROM {table} WHERE ticker = :ticker", {'ticker': ticker})
+    if df.empty:
+        return df
+
+    df['data'] = pd.to_datetime(df['data'], dayfirst=True, errors='coerce')
+    df['rendimento'] = _to_number(df['rendimento'])
+    df['dividend_yield'] = _to_number(df['dividend_yield']) if col_dy else df['rendimento']
+    return df.dropna(subset=['data']).sort_values('data').reset_index(drop=True)
+
+def get_dy_monthly(ticker):
+    """
+    DY mensal de um ticker já materializado em gold_dy_mensal (lookup pelo índice (ticker, date)).
+    Retorna DataFrame[data, rendimento, dividend_yield] como get_dividend_history; vazio quando o ticker
+    ainda não está nas tabelas gold.
+    """
+    table = 'gold_dy_mensal'
+    if not {'dividend', 'dy_monthly'} <= set(table_columns(table)):
+        return pd.DataFrame(columns=['data', 'rendimento', 'dividend_yield'])
+    df = get_data(
+        f"SELECT date AS data, dividend AS rendimento, dy_monthly AS dividend_yield FROM {table} "
+        "WHERE ticker = :ticker ORDER BY date",
+        {'ticker': ticker},
+    )
+    df['data'] = pd.to_datetime(df['data'])
+    return df
+
+def get_pvp_monthly(ticker):
+    """P/VP mensal de um ticker (gold_pvp_mensal). Retorna DataFrame[date, close, vp_used, p_vp, vp_source]."""
+    table = 'gold_pvp_mensal'
+    if 'p_vp' not in table_columns(table):
+        return pd.DataFrame(columns=['date', 'close', 'vp_used', 'p_vp', 'vp_source'])
+    df = get_data(
+        f"SELECT date, close, vp_used, p_vp, vp_source FROM {table} WHERE ticker = :ticker ORDER BY date",
+        {'ticker': ticker},
+    )
+    df['date'] = pd.to_datetime(df['date'])
+    df['p_vp'] = pd.to_numeric(df['p_vp'], errors='coerce')
+    return df
+
+def get_snapshot(ticker):
+    """Último valor conhecido de P/VP e DY do ticker (gold_snapshot) como dict; None se não houver."""
+    wanted = ['date', 'close', 'p_vp', 'vp_source', 'dividend_date', 'dy_monthly', 'dy_12m']
+    columns = [col for col in wanted if col in set(table_columns('gold_snapshot'))]
+    if not columns:
+        return None
+    df = get_data(f"SELECT {', '.join(columns)} FROM gold_snapshot WHERE ticker = :ticker", {'ticker': ticker})
+    return None if df.empty else df.iloc[-1].to_dict()
+
+def top_liquidity_tickers(n=30):
+    """Tickers com maior liquidez média diária no último snapshot de funds_indicadores_diarios."""
+    columns = set(table_columns('funds_indicadores_diarios'))
+    if not {'ticker', 'timestamp', 'liquidez_media_diaria'} <= columns:
+        return []
+    df = get_data(
+        "SELECT f.ticker, f.liquidez_media_diaria FROM funds_indicadores_diarios f "
+        "JOIN (SELECT ticker, MAX(timestamp) AS ts FROM funds_indicadores_diarios GROUP BY ticker) u "
+        "ON f.ticker = u.ticker AND f.timestamp = u.ts"
+    )
+    # A coluna pode vir como texto (valores não convertidos pelo scraper)
+    df['liquidez'] = pd.to_numeric(df['liquidez_media_diaria'], errors='coerce')
+    return df.dropna(subset=['liquidez']).drop_duplicates('ticker').nlargest(n, 'liquidez')['ticker'].tolist()
+
+# Indicador -> (tabela gold, coluna) usado na comparação entre ativos
+COMPARISON_METRICS = {
+    'p_vp': ('gold_pvp_mensal', 'p_vp'),
+    'dy_12m': ('gold_dy_12m', 'dy_12m'),
+    'close': ('gold_pvp_mensal', 'close'),
+}
+
+def get_comparison_series(tickers, metric='p_vp'):
+    """
+    Série mensal do indicador para vários tickers em uma única consulta (IN) nas tabelas gold,
+    já pivotada: DataFrame com índice date e uma coluna por ticker.
+    """
+    table, column = COMPARISON_METRICS[metric]
+    if not tickers or column not in table_columns(table):
+        return pd.DataFrame()
+    df = get_data(
+        f"SELECT ticker, date, {column} AS valor FROM {table} WHERE ticker IN :tickers",
+        {'tickers': sorted(tickers)},
+    )
+    if df.empty:
+        return pd.DataFrame()
+    df['date'] = pd.to_datetime(df['date'])
+    df['valor'] = pd.to_numeric(df['valor'], errors='coerce')
+    return df.pivot_table(index='date', columns='ticker', values='valor').sort_index()
+
+# Intervalos do Yahoo (yahoo_finance.py), do mais fino ao mais grosso, com a duração aproximada de cada barra
+PRICE_INTERVALS = {
+    '1m': pd.Timedelta(minutes=1), '2m': pd.Timedelta(minutes=2), '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15), '30m': pd.Timedelta(minutes=30), '60m': pd.Timedelta(hours=1),
+    '90m': pd.Timedelta(minutes=90), '1d': pd.Timedelta(days=1), '5d': pd.Timedelta(days=5),
+    '1wk': pd.Timedelta(weeks=1), '1mo': pd.Timedelta(days=30), '3mo': pd.Timedelta(days=91),
+}
+
+def _parse_local_datetime(series):
+    """Datas do Yahoo no horário local do pregão: descarta o offset ("-03:00") em vez de converter para UTC."""
+    return pd.to_datetime(series.astype(str).str[:19], format='ISO8601', errors='coerce')
+
+def _price_date_expr():
+    """Cotações diárias vêm em 'date' e intradiárias em 'datetime' (mesma tabela cotacoes_historico)."""
+    columns = set(table_columns('cotacoes_historico'))
+    exprs = [col for col in ['date', 'datetime'] if col in columns]
+    if not exprs:
+        return None
+    return exprs[0] if len(exprs) == 1 else f"COALESCE({', '.join(exprs)})"
+
+def price_intervals(ticker):
+    """Cobertura de cada intervalo do ticker: DataFrame[intervalo, n, inicio, fim]."""
+    date_expr = _price_date_expr()
+    if date_expr is None or 'intervalo' not in table_columns('cotacoes_historico'):
+        return pd.DataFrame(columns=['intervalo', 'n', 'inicio', 'fim'])
+    df = get_data(
+        f"SELECT intervalo, COUNT(*) AS n, MIN({date_expr}) AS inicio, MAX({date_expr}) AS fim "
+        f"FROM cotacoes_historico WHERE ticker = :ticker GROUP BY intervalo",
+        {'ticker': ticker},
+    )
+    df['inicio'] = _parse_local_datetime(df['inicio'])
+    df['fim'] = _parse_local_datetime(df['fim'])
+    return df[df['intervalo'].isin(PRICE_INTERVALS)]
+
+def pick_interval(intervals, start=None, end=None, max_rows=200_000):
+    """
+    Escolhe o intervalo mais fino que cobre a janela visível [start, end] sem passar de max_rows linhas.
+    Sem janela (gráfico inteiro) prefere o diário; intradiários só entram quando o usuário dá zoom.
+    """
+    if intervals.empty:
+        return None
+    disponiveis = intervals.set_index('intervalo')
+    ordem = [i for i in PRICE_INTERVALS if i in disponiveis.index]
+    if start is None or end is None:
+        return '1d' if '1d' in disponiveis.index else ordem[-1]
+
+    # Janela antes do início de todos os históricos conta a partir do primeiro dado disponível
+    limite = max(start, disponiveis['inicio'].min())
+    for intervalo in ordem:
+        info = disponiveis.loc[intervalo]
+        if pd.isna(info['inicio']) or info['inicio'] > limite:
+            continue  # histórico do intervalo não cobre o início da janela (ex.: 1m só tem os últimos dias)
+        estimado = (end - start) / PRICE_INTERVALS[intervalo]
+        if estimado <= max_rows:
+            return intervalo
+    return ordem[-1]
+
+def get_price_history(ticker, intervalo, start=None, end=None):
+    """Fechamentos do ticker no intervalo, opcionalmente restritos à janela [start, end]. DataFrame[data, close]."""
+    date_expr = _price_date_expr()
+    if date_expr is None:
+        return pd.DataFrame(columns=['data', 'close'])
+
+    sql = (f"SELECT {date_expr} AS data, close FROM cotacoes_historico "
+           f"WHERE ticker = :ticker AND intervalo = :intervalo")
+    params = {'ticker': ticker, 'intervalo': intervalo}
+    # As datas ficam como texto ISO no banco ("2024-01-02" ou "2024-01-02 10:00:00-03:00"),
+    # então o filtro compara strings por dia: [início do dia de start, fim do dia de end]
+    if start is not None:
+        sql += f" AND {date_expr} >= :start"
+        params['start'] = start.strftime('%Y-%m-%d')
+    if end is not None:
+        sql += f" AND {date_expr} < :end"
+        params['end'] = (end + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    df = get_data(sql + " ORDER BY data", params)
+
+    df['data'] = _parse_local_datetime(df['data'])
+    df['close'] = pd.to_numeric(df['close'], errors='coerce')
+    return df.dropna(subset=['data'])
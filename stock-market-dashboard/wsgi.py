@@ -0,0 +1,7 @@
+"""
+Ponto de entrada WSGI do dashboard para produção:
+    cd stock-market-dashboard && gunicorn -c gunicorn.conf.py wsgi:server
+"""
+from app import app, server
+
+application = server
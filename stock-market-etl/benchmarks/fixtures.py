@@ -0,0 +1,189 @@
+"""
+Geradores de dados sintéticos com o formato das fontes reais, para os benchmarks do pipeline:
+- páginas HTML de fundos do Funds Explorer (mesmas classes CSS lidas pelos extratores de funds_explorer.py)
+- cotações OHLCV no formato do yahoo_cotacoes.csv
+- rendimentos no formato do funds_rendimentos.csv (números e datas em pt-BR)
+- indicadores trimestrais no formato do Indicadores.csv da Oceans14
+
+Tudo é determinístico a partir de `seed`, para que execuções diferentes sejam comparáveis.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+UNIVERSE_SIZES = (700, 5000, 50000)
+
+def make_tickers(n):
+    """Tickers fictícios no padrão de FII (4 letras + 11), únicos para até 26^4 ativos."""
+    letras = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    idx = np.arange(n)
+    partes = [letras[(idx // 26 ** p) % 26] for p in (3, 2, 1, 0)]
+    return [''.join(chars) + '11' for chars in zip(*partes)]
+
+def _br(values, decimals=2):
+    """Formata números no padrão pt-BR (milhar com ponto, decimal com vírgula)."""
+    return [f"{v:,.{decimals}f}".replace(',', '_').replace('.', ',').replace('_', '.') for v in values]
+
+def _base_prices(n, seed):
+    # Preço de referência por ticker, comum a todos os geradores (P/VP e DY ficam em faixas realistas)
+    return np.random.default_rng(seed + 1).uniform(8, 150, n)
+
+def make_ativos(tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(tickers)
+    return pd.DataFrame({
+        'Categoria': rng.choice(['FII', 'FIAGRO', 'FIINFRA'], n, p=[0.8, 0.12, 0.08]),
+        'Tipo': rng.choice(['Tijolo', 'Papel', 'Híbrido', 'Fundo de Fundos'], n),
+        'Ticker': tickers,
+        'Descrição': [f"Fundo Imobiliário {t}" for t in tickers],
+        'DY (%)': _br(rng.uniform(6, 16, n)),
+        'PL (R$)': _br(rng.uniform(5e7, 5e9, n)),
+    })
+
+def make_rendimentos(tickers, months=60, end='2024-12-01', seed=0):
+    """Um provento por mês e ticker, com as colunas/formatos da tabela do Funds Explorer."""
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range(end=end, periods=months, freq='MS')
+    n = len(tickers) * months
+    precos = np.repeat(_base_prices(len(tickers), seed), months) * rng.uniform(0.9, 1.1, n)
+    valores = precos * rng.uniform(0.005, 0.012, n)
+    return pd.DataFrame({
+        'Ticker': np.repeat(tickers, months),
+        'Data Base': np.tile(datas.strftime('%d/%m/%Y'), len(tickers)),
+        'Data de Pagamento': np.tile((datas + pd.Timedelta(days=14)).strftime('%d/%m/%Y'), len(tickers)),
+        'Fechamento (R$)': _br(precos),
+        'Valor por Cota (R$)': _br(valores),
+        'Yield 1M': _br(valores / precos * 100),
+    })
+
+def make_ohlcv(tickers, days=750, end='2024-12-31', seed=0):
+    """Cotações diárias (intervalo 1d) no formato gravado por YahooFinanceScraper.scrape_all."""
+    rng = np.random.default_rng(seed)
+    datas = pd.bdate_range(end=end, periods=days)
+    n = len(datas)
+    close = (_base_prices(len(tickers), seed)[:, None] *
+             np.exp(np.cumsum(rng.normal(0, 0.01, (len(tickers), n)), axis=1))).ravel()
+    spread = np.abs(rng.normal(0, 0.005, close.size)) * close
+    return pd.DataFrame({
+        'Date': np.tile(datas.strftime('%Y-%m-%d 00:00:00-03:00'), len(tickers)),
+        'Ticker': np.repeat(tickers, n),
+        'Ticker_Yahoo': np.repeat([f"{t}.SA" for t in tickers], n),
+        'Open': close - spread / 2,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 100_000, close.size),
+        'Intervalo': '1d',
+    })
+
+def make_indicadores_diarios(tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(tickers)
+    vp = _base_prices(n, seed) * rng.uniform(0.85, 1.15, n)
+    return pd.DataFrame({
+        'Ticker': tickers,
+        'timestamp': pd.Timestamp('2024-12-31 18:00'),
+        'preco_atual': vp * rng.uniform(0.7, 1.2, n),
+        'liquidez_media_diaria': rng.uniform(1e4, 5e6, n),
+        'valor_patrimonial_cota': vp,
+        'patrimonio_liquido': vp * rng.integers(100_000, 10_000_000, n),
+        'p_vp': rng.uniform(0.7, 1.2, n),
+    })
+
+def make_oceans_indicadores(tickers, years=8, end_year=2024, seed=0):
+    """Histórico trimestral (Trimestre no formato 1T2023) com P/VP e VP por cota em texto pt-BR."""
+    rng = np.random.default_rng(seed)
+    trimestres = [f"{q}T{y}" for y in range(end_year - years + 1, end_year + 1) for q in range(1, 5)]
+    n = len(tickers) * len(trimestres)
+    return pd.DataFrame({
+        'Ticker': np.repeat(tickers, len(trimestres)),
+        'Trimestre': np.tile(trimestres, len(tickers)),
+        'P/VP': _br(rng.uniform(0.7, 1.2, n)),
+        'VP por cota': _br(np.repeat(_base_prices(len(tickers), seed), len(trimestres)) * rng.uniform(0.85, 1.15, n)),
+    })
+
+def make_fund_page(ticker, n_dividends=24, n_locations=3, seed=0):
+    """HTML de uma página de fundo com todas as seções lidas pelos extratores do FundsExplorerScraper."""
+    rng = np.random.default_rng(seed)
+    preco = rng.uniform(8, 150)
+    indicadores = [
+        ('Liquidez Média Diária', f"{rng.uniform(0.1, 9):.2f} M".replace('.', ',')),
+        ('Último Rendimento', f"R$ {preco * 0.009:.2f}".replace('.', ',')),
+        ('Dividend Yield', f"{rng.uniform(6, 16):.2f}%".replace('.', ',')),
+        ('Patrimônio Líquido', f"R$ {rng.uniform(0.1, 5):.2f} B".replace('.', ',')),
+        ('Valor Patrimonial', f"R$ {preco * rng.uniform(0.8, 1.2):.2f}".replace('.', ',')),
+        ('Rentab. No Mês', f"{rng.uniform(-3, 3):.2f}%".replace('.', ',')),
+        ('P/VP', f"{rng.uniform(0.7, 1.2):.2f}".replace('.', ',')),
+    ]
+    boxes = ''.join(f'<div class="indicators__box"><p>{t}</p><b>{v}</b></div>' for t, v in indicadores)
+
+    datas = pd.date_range(end='2024-12-01', periods=n_dividends, freq='MS')
+    linhas = ''.join(
+        f"<tr><td>Rendimento</td><td>{d:%d/%m/%Y}</td><td>{(d + pd.Timedelta(days=14)):%d/%m/%Y}</td>"
+        f"<td>{preco:.2f}</td><td>{0.9:.2f}%</td><td>{preco * 0.009:.2f}</td></tr>".replace('.', ',')
+        for d in datas
+    )
+    info = ''.join(
+        f'<div class="basicInformation__grid__box"><p>{label}</p><p>{valor}</p></div>'
+        for label, valor in [('Razão Social', f'Fundo {ticker}'), ('CNPJ', '00.000.000/0001-00'),
+                             ('Público-alvo', 'Geral'), ('Mandato', 'Renda'), ('Segmento', 'Logística'),
+                             ('Prazo', 'Indeterminado'), ('Tipo de gestão', 'Ativa'),
+                             ('Taxa de administração', '1,00% a.a.'), ('Cotas emitidas', '10.000.000')]
+    )
+    simulacao = ''.join(
+        f'<div class="simulation__box"><p>{p}</p><b>R$ {v}</b></div>'
+        for p, v in [('Investindo', '1.000,00'), ('Cotas', '10'), ('Rendimento mensal', '9,00')]
+    )
+    slides = ''.join(
+        f'<div class="swiper-slide"><div class="locationGrid__title">Imóvel {i}</div><ul>'
+        f'<li><b>Endereço:</b> Rua {i}, 100</li><li><b>Bairro:</b> Centro</li>'
+        f'<li><b>Cidade:</b> São Paulo</li><li><b>Área Bruta Locável:</b> {10_000 + i} m²</li></ul></div>'
+        for i in range(n_locations)
+    )
+    # Texto de preenchimento para aproximar o tamanho real da página (scripts, menus, notícias)
+    filler = '<div class="news">' + ('<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>' * 400) + '</div>'
+
+    return f"""<!DOCTYPE html><html lang="pt-BR"><head><title>{ticker}</title></head><body>
+<div class="headerTicker"><div class="headerTicker__content__price"><p>R$ {preco:.2f}</p></div></div>
+<div class="indicators">{boxes}</div>
+<section id="carbon_fields_fiis_basic_informations-2"><div class="basicInformation__grid">{info}</div></section>
+<section id="carbon_fields_fiis_description-3"><div class="newsContent"><p>Fundo {ticker}.</p><p>Descrição.</p></div></section>
+<div class="administration"><p class="informations__adm__name">Administradora S.A.</p>
+<span class="informations__adm__doc">11.111.111/0001-11</span>
+<div class="informations__contact__tel"><p>(11) 4000-0000</p></div>
+<div class="informations__contact__email"><p>ri@adm.com.br</p></div>
+<div class="informations__contact__site"><p>www.adm.com.br</p></div></div>
+<div class="simulation">{simulacao}</div>
+<table><thead><tr><th>Tipo</th><th>Data com</th><th>Pagamento</th><th>Cotação base</th><th>Dividend Yield</th><th>Valor</th></tr></thead>
+<tbody>{linhas}</tbody></table>
+<div class="swiper">{slides}</div>
+{filler}
+</body></html>"""
+
+def make_listing_page(tickers, tipo='Tijolo'):
+    """Página de listagem (/funds) com um tickerBox por ativo."""
+    caixas = ''.join(
+        f'<div class="tickerBox link-tickers-container"><span class="tickerBox__type">{tipo}</span>'
+        f'<div class="tickerBox__title">{t}</div><div class="tickerBox__desc">Fundo {t}</div>'
+        f'<div class="tickerBox__info__box">10,5%</div><div class="tickerBox__info__box">R$ 1,2 B</div></div>'
+        for t in tickers
+    )
+    return f"<html><body><div class='tickers'>{caixas}</div></body></html>"
+
+def write_bronze(output_dir, n_tickers, months=60, days=750, seed=0):
+    """
+    Grava um bronze sintético completo (CSVs lidos pelo loader e pelo IndicadoresCalculator) em
+    output_dir/bronze e o Indicadores.csv da Oceans14 em output_dir/oceans. Retorna (bronze, oceans, tickers).
+    """
+    bronze_dir = os.path.join(output_dir, 'bronze')
+    oceans_dir = os.path.join(output_dir, 'oceans')
+    os.makedirs(bronze_dir, exist_ok=True)
+    os.makedirs(oceans_dir, exist_ok=True)
+
+    tickers = make_tickers(n_tickers)
+    make_ativos(tickers, seed).to_csv(os.path.join(bronze_dir, 'funds_ativos.csv'), index=False)
+    make_rendimentos(tickers, months, seed=seed).to_csv(os.path.join(bronze_dir, 'funds_rendimentos.csv'), index=False)
+    make_indicadores_diarios(tickers, seed).to_csv(os.path.join(bronze_dir, 'funds_indicadores_diarios.csv'), index=False)
+    make_ohlcv(tickers, days, seed=seed).to_csv(os.path.join(bronze_dir, 'yahoo_cotacoes.csv'), index=False)
+    make_oceans_indicadores(tickers, seed=seed).to_csv(os.path.join(oceans_dir, 'Indicadores.csv'), index=False)
+    return bronze_dir, oceans_dir, tickers
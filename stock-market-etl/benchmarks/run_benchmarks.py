@@ -0,0 +1,208 @@
+"""
+Benchmarks do pipeline com dados sintéticos (ver fixtures.py), por tamanho de universo:
+- parsers do FundsExplorerScraper (BeautifulSoup + cada extrator) sobre páginas HTML geradas
+- insert_dataframe (rendimentos e cotações) contra um SQLite local
+- IndicadoresCalculator: carga dos CSVs, DY/P-VP por ticker e os painéis em lote
+
+Os resultados vão para um JSON (um registro por benchmark e tamanho), e --compare compara duas execuções.
+
+Uso (a partir de stock-market-etl/):
+    python benchmarks/run_benchmarks.py --sizes 700 5000 --output benchmarks/results/atual.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/base.json benchmarks/results/atual.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+etl_root = os.path.dirname(current_dir)
+project_root = os.path.dirname(etl_root)
+for path in (current_dir, etl_root, project_root):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import fixtures
+
+def _stats(tempos, rows=None):
+    arr = np.asarray(tempos) * 1000
+    result = {
+        'repeat': int(arr.size),
+        'p50_ms': round(float(np.percentile(arr, 50)), 3),
+        'p95_ms': round(float(np.percentile(arr, 95)), 3),
+        'total_s': round(float(arr.sum()) / 1000, 3),
+    }
+    if rows is not None:
+        result['rows'] = int(rows)
+        result['rows_per_sec'] = round(rows * arr.size / (arr.sum() / 1000), 1) if arr.sum() > 0 else None
+    return result
+
+def _timed(fn, repeat):
+    tempos = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        tempos.append(time.perf_counter() - start)
+    return tempos
+
+def bench_parsers(tickers, pages, seed=0):
+    from bs4 import BeautifulSoup
+    from src.extract.funds_explorer import FundsExplorerScraper
+
+    class OfflineScraper(FundsExplorerScraper):
+        # Só os extratores: sem Chrome e sem sessão HTTP
+        def __init__(self):
+            self.base_url = 'https://www.fundsexplorer.com.br'
+            self.driver = None
+
+    scraper = OfflineScraper()
+    amostra = tickers[:pages]
+    htmls = [fixtures.make_fund_page(t, seed=seed + i) for i, t in enumerate(amostra)]
+    soups = []
+
+    resultados = {'page_parse': _stats(_timed(lambda i: soups.append(BeautifulSoup(htmls[i], 'html.parser')), len(htmls)))}
+    resultados['page_parse']['page_kb'] = round(np.mean([len(h) for h in htmls]) / 1024, 1)
+
+    extratores = {
+        'extract_header': scraper.get_header_indicators,
+        'extract_info_completa': scraper.get_info_completa,
+        'extract_simulacao': scraper.get_simulacao,
+        'extract_localizacao': scraper.get_localizacao,
+        'extract_rendimentos': scraper.get_dividend_history_full,
+    }
+    for nome, extrator in extratores.items():
+        resultados[nome] = _stats(_timed(lambda i: extrator(soups[i], amostra[i]), len(soups)))
+
+    # Sanidade: os extratores precisam encontrar as seções geradas
+    header = scraper.get_header_indicators(soups[0], amostra[0])
+    rend = scraper.get_dividend_history_full(soups[0], amostra[0])
+    if header.empty or 'p_vp' not in header.columns or rend.empty:
+        raise RuntimeError("As páginas sintéticas não batem mais com os seletores de funds_explorer.py.")
+    return resultados
+
+def bench_insert(tickers, work_dir, months, days, repeat, seed=0):
+    from src.utils.db import insert_dataframe
+
+    engine = create_engine(f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+    frames = {
+        'funds_rendimentos': fixtures.make_rendimentos(tickers, months, seed=seed),
+        'cotacoes_historico': fixtures.make_ohlcv(tickers, days, seed=seed),
+    }
+    resultados = {}
+    for table, df in frames.items():
+        resultados[f'insert_{table}'] = _stats(_timed(lambda i: insert_dataframe(df, table, engine), repeat), rows=len(df))
+    engine.dispose()
+    return resultados
+
+def bench_calculator(work_dir, tickers, months, days, repeat, seed=0):
+    from analise_de_Indicadores.calculo_indicadores import IndicadoresCalculator
+
+    bronze_dir, oceans_dir, _ = fixtures.write_bronze(work_dir, len(tickers), months=months, days=days, seed=seed)
+    resultados = {}
+
+    calcs = []
+    resultados['calc_load'] = _stats(_timed(lambda i: calcs.append(IndicadoresCalculator(bronze_dir, oceans_dir)), 1))
+    calc = calcs[0]
+
+    # Tickers diferentes a cada repetição: mede o cálculo, não o result_cache
+    rng = np.random.default_rng(seed)
+    amostra = list(rng.choice(tickers, min(repeat, len(tickers)), replace=False))
+    por_ticker = {
+        'calc_dy_history': lambda t: calc.get_dy_history(t, allow_fallback=False),
+        'calc_pvp_history_d': lambda t: calc.get_pvp_history(t, freq='D'),
+        'calc_pvp_history_m': lambda t: calc.get_pvp_history(t, freq='M'),
+    }
+    for nome, fn in por_ticker.items():
+        calc.result_cache.clear()
+        resultados[nome] = _stats(_timed(lambda i: fn(amostra[i]), len(amostra)))
+
+    resultados['calc_pvp_panel_m'] = _stats(_timed(lambda i: calc.get_pvp_panel('M'), 1))
+    resultados['calc_dy_panel'] = _stats(_timed(lambda i: calc.get_dy_panel(), 1))
+    calc.result_cache.clear()
+    resultados['calc_comparison_panel'] = _stats(_timed(
+        lambda i: calc.get_comparison_panel(tuple(amostra[:5]), freq='M'), 1))
+    return resultados
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=etl_root,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def run(sizes, suites, pages, months, days, repeat):
+    results = []
+    for size in sizes:
+        tickers = fixtures.make_tickers(size)
+        work_dir = tempfile.mkdtemp(prefix=f'etl_bench_{size}_')
+        try:
+            for suite in suites:
+                print(f"[{size} tickers] {suite}...")
+                if suite == 'parsers':
+                    out = bench_parsers(tickers, pages)
+                elif suite == 'insert':
+                    out = bench_insert(tickers, work_dir, months, days, repeat=3)
+                else:
+                    out = bench_calculator(work_dir, tickers, months, days, repeat)
+                results.extend({'benchmark': nome, 'suite': suite, 'tickers': size, **stats} for nome, stats in out.items())
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'meta': {
+            'generated_at': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'params': {'sizes': sizes, 'suites': suites, 'pages': pages, 'months': months, 'days': days, 'repeat': repeat},
+        },
+        'results': results,
+    }
+
+def compare(base_path, new_path, threshold=0.10):
+    """Compara p50 de duas execuções; marca regressões acima de threshold."""
+    with open(base_path, encoding='utf-8') as f:
+        base = pd.DataFrame(json.load(f)['results'])
+    with open(new_path, encoding='utf-8') as f:
+        new = pd.DataFrame(json.load(f)['results'])
+    df = base.merge(new, on=['benchmark', 'tickers'], suffixes=('_base', '_novo'))[
+        ['benchmark', 'tickers', 'p50_ms_base', 'p50_ms_novo']]
+    df['razao'] = (df['p50_ms_novo'] / df['p50_ms_base']).round(2)
+    df['status'] = np.select([df['razao'] > 1 + threshold, df['razao'] < 1 - threshold], ['REGRESSÃO', 'melhora'], '')
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline com dados sintéticos.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[700], help=f"Tamanhos de universo (ex.: {fixtures.UNIVERSE_SIZES})")
+    parser.add_argument('--suites', nargs='+', choices=['parsers', 'insert', 'calculator'], default=['parsers', 'insert', 'calculator'])
+    parser.add_argument('--pages', type=int, default=100, help="Páginas HTML parseadas por tamanho")
+    parser.add_argument('--months', type=int, default=60, help="Meses de rendimentos por ticker")
+    parser.add_argument('--days', type=int, default=250, help="Pregões de cotação por ticker")
+    parser.add_argument('--repeat', type=int, default=20, help="Tickers amostrados nos benchmarks por ticker")
+    parser.add_argument('--output', help="Arquivo JSON de saída (padrão: benchmarks/results/bench_<timestamp>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NOVO'), help="Compara dois JSONs de resultado")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare(*args.compare).to_string(index=False))
+        sys.exit(0)
+
+    report = run(args.sizes, args.suites, args.pages, args.months, args.days, args.repeat)
+    output = args.output or os.path.join(current_dir, 'results', f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    df = pd.DataFrame(report['results'])
+    print(df.pivot_table(index='benchmark', columns='tickers', values='p50_ms').round(2))
+    print(f"\nResultados salvos em: {output}")
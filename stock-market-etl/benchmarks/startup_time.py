@@ -0,0 +1,87 @@
+"""
+Mede o tempo de inicialização (importação) dos pontos de entrada do ETL e da calculadora, cada um em um
+processo Python novo, e lista quais dependências pesadas (selenium, yfinance, bs4...) cada um carrega.
+
+Uso (a partir de stock-market-etl/):
+    python benchmarks/startup_time.py --repeat 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+etl_root = os.path.dirname(current_dir)
+project_root = os.path.dirname(etl_root)
+
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'cloudscraper', 'bs4', 'yfinance',
+                 'sqlalchemy', 'pandas', 'plotly', 'dash', 'streamlit']
+
+def _run_main(*argv):
+    return (f"import sys; sys.argv=['main.py', {', '.join(repr(a) for a in argv)}]\ntry:\n"
+            "    import runpy; runpy.run_path('src/main.py', run_name='__main__')\nexcept SystemExit:\n    pass")
+
+# Ponto de entrada -> código executado no processo novo
+ENTRY_POINTS = {
+    'main.py --help': _run_main('--help'),
+    'main.py fetch-yahoo --help': _run_main('fetch-yahoo', '--help'),
+    'main.py load --help': _run_main('load', '--help'),
+    'main.py fetch-yahoo --dry-run': _run_main('fetch-yahoo', '--tickers', 'XPML11', '--dry-run'),
+    'import src.main': "import src.main",
+    'import src.transform.loader': "import src.transform.loader",
+    'import src.transform.gold': "import src.transform.gold",
+    'import src.extract.funds_explorer': "import src.extract.funds_explorer",
+    'import src.extract.yahoo_finance': "import src.extract.yahoo_finance",
+    'import calculo_indicadores': "import analise_de_Indicadores.calculo_indicadores",
+}
+
+_PROBE = """
+import sys, time, json, io, contextlib
+sys.path[:0] = [{etl_root!r}, {project_root!r}]
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed_ms': elapsed * 1000,
+                  'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(code, repeat):
+    indented = "\n".join("    " + line for line in code.splitlines())
+    probe = _PROBE.format(etl_root=etl_root, project_root=project_root, code=indented, heavy=HEAVY_MODULES)
+    tempos, heavy, erro = [], [], None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', probe], cwd=etl_root, capture_output=True, text=True)
+        if proc.returncode != 0:
+            erro = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"código {proc.returncode}"
+            break
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        tempos.append(result['elapsed_ms'])
+        heavy = result['heavy']
+    return {
+        'p50_ms': round(statistics.median(tempos), 1) if tempos else None,
+        'min_ms': round(min(tempos), 1) if tempos else None,
+        'heavy_modules': heavy,
+        'error': erro,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo de inicialização dos pontos de entrada do ETL.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help="Salva os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nome, code in ENTRY_POINTS.items():
+        resultados[nome] = measure(code, args.repeat)
+        r = resultados[nome]
+        if r['error']:
+            print(f"{nome:<38} ERRO: {r['error']}")
+        else:
+            print(f"{nome:<38} p50 {r['p50_ms']:>8.1f} ms   min {r['min_ms']:>8.1f} ms   {', '.join(r['heavy_modules'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,295 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+
+try:
+    import psutil
+except ImportError:  # Sem psutil a reciclagem por memória fica desligada (erros e páginas continuam valendo)
+    psutil = None
+
+logger = get_logger(__name__)
+
+# Limites de reciclagem (variáveis de ambiente sobrescrevem os padrões)
+MAX_RSS_MB = float(os.getenv('BROWSER_MAX_RSS_MB', 1500))
+MAX_ERROR_RATE = float(os.getenv('BROWSER_MAX_ERROR_RATE', 0.5))
+ERROR_WINDOW = int(os.getenv('BROWSER_ERROR_WINDOW', 10))
+MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', 0)) or None
+RSS_CHECK_EVERY = int(os.getenv('BROWSER_RSS_CHECK_EVERY', 5))
+
+# Caminho do chromedriver: CHROMEDRIVER_PATH fixa um binário; sem ele, o caminho resolvido pelo
+# webdriver_manager fica em cache no processo e em disco por CHROMEDRIVER_CACHE_DAYS
+DRIVER_PATH_CACHE = os.getenv('CHROMEDRIVER_PATH_CACHE',
+                              os.path.join(os.path.expanduser('~'), '.cache', 'stock-market-etl', 'chromedriver.json'))
+DRIVER_CACHE_DAYS = float(os.getenv('CHROMEDRIVER_CACHE_DAYS', 7))
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+# Perfil enxuto do crawl: o extrator só lê o HTML, então imagens, fontes, mídia e scripts de terceiros
+# (anúncios, analytics, pixels) são bloqueados. CSS e os scripts do próprio site/Cloudflare continuam liberados.
+LEAN_CRAWL = os.getenv('FUNDS_LEAN_CRAWL', '1').lower() not in ('0', 'false', 'no', 'nao', 'não')
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+]
+BLOCKED_THIRD_PARTY_DOMAINS = [
+    'googletagmanager.com', 'google-analytics.com', 'analytics.google.com', 'doubleclick.net',
+    'googlesyndication.com', 'googleadservices.com', 'adservice.google.com', 'fundingchoicesmessages.google.com',
+    'connect.facebook.net', 'facebook.com/tr', 'hotjar.com', 'clarity.ms', 'amazon-adsystem.com',
+    'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com', 'tiktok.com', 'onesignal.com',
+    'fonts.googleapis.com', 'fonts.gstatic.com', 'youtube.com', 'ytimg.com',
+]
+
+def lean_chrome_options(chrome_options):
+    """Desliga imagens no próprio Chrome (vale também para imagens inline/CSS que o bloqueio por URL não pega)."""
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    return chrome_options
+
+def block_resources(driver):
+    """Bloqueia, via CDP, os tipos de recurso e domínios de terceiros que o extrator não usa."""
+    patterns = BLOCKED_RESOURCE_PATTERNS + [f'*{domain}*' for domain in BLOCKED_THIRD_PARTY_DOMAINS]
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        logger.warning(f"Não foi possível bloquear recursos via CDP: {e}")
+
+_NAVIGATION_TIMING = """
+const nav = performance.getEntriesByType('navigation')[0];
+return nav ? {load: nav.loadEventEnd - nav.startTime, dom: nav.domContentLoadedEventEnd - nav.startTime} : null;
+"""
+
+def page_network_stats(driver):
+    """
+    Bytes transferidos e requisições desde a última chamada (log de performance do Chrome: soma do
+    encodedDataLength de Network.loadingFinished) e os tempos de navegação da página atual, em ms.
+    O log é drenado a cada chamada, então chame uma vez por página.
+    """
+    stats = {'bytes': 0, 'requests': 0, 'blocked': 0, 'load_ms': None, 'dom_ms': None}
+    try:
+        for entry in driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            if message['method'] == 'Network.loadingFinished':
+                stats['bytes'] += int(message['params'].get('encodedDataLength', 0))
+                stats['requests'] += 1
+            elif message['method'] == 'Network.loadingFailed' and message['params'].get('blockedReason'):
+                stats['blocked'] += 1
+    except Exception as e:
+        logger.debug(f"Log de performance indisponível: {e}")
+        stats['bytes'] = stats['requests'] = None
+    try:
+        timing = driver.execute_script(_NAVIGATION_TIMING)
+        if timing and timing['load'] > 0:
+            stats['load_ms'], stats['dom_ms'] = round(timing['load'], 1), round(timing['dom'], 1)
+    except Exception:
+        pass
+    return stats
+
+def _read_cached_path():
+    try:
+        with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        resolved_at = datetime.fromisoformat(cache['resolved_at'])
+    except (OSError, ValueError, KeyError):
+        return None
+    if datetime.now() - resolved_at > timedelta(days=DRIVER_CACHE_DAYS) or not os.path.isfile(cache.get('path', '')):
+        return None
+    return cache['path']
+
+def _write_cached_path(path):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+        tmp = f"{DRIVER_PATH_CACHE}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': datetime.now().isoformat()}, f)
+        os.replace(tmp, DRIVER_PATH_CACHE)
+    except OSError as e:
+        logger.debug(f"Não foi possível gravar o cache do chromedriver: {e}")
+
+def resolve_chromedriver_path(refresh=False):
+    """
+    Caminho do chromedriver, resolvido uma vez por processo (e reaproveitado entre execuções pelo cache
+    em disco). refresh=True ignora os caches, ex.: quando o Chrome foi atualizado e o driver não serve mais.
+    """
+    global _driver_path
+    env_path = os.getenv('CHROMEDRIVER_PATH')
+    if env_path:
+        return env_path
+
+    with _driver_path_lock:
+        if _driver_path and not refresh and os.path.isfile(_driver_path):
+            return _driver_path
+        path = None if refresh else _read_cached_path()
+        if path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            with metrics.timer('chromedriver_resolve_seconds'):
+                path = ChromeDriverManager().install()
+            _write_cached_path(path)
+            logger.info(f"Chromedriver resolvido: {path}")
+        _driver_path = path
+        return path
+
+class PooledDriver:
+    """Um Chrome do pool com o que é preciso para decidir quando reciclá-lo: páginas, erros recentes e RSS."""
+
+    def __init__(self, driver, service=None, error_window=ERROR_WINDOW):
+        self.driver = driver
+        self.service = service
+        self.pages = 0
+        self.errors = 0
+        self.recent = deque(maxlen=error_window)
+        self.rss_mb = None
+        self.started_at = time.monotonic()
+
+    def record(self, ok):
+        self.pages += 1
+        self.errors += 0 if ok else 1
+        self.recent.append(not ok)
+
+    @property
+    def error_rate(self):
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def measure_rss(self):
+        """RSS (MB) do chromedriver e de todos os processos do Chrome abaixo dele."""
+        process = getattr(getattr(self.service, 'process', None), 'pid', None)
+        if psutil is None or process is None:
+            return None
+        try:
+            root = psutil.Process(process)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        self.rss_mb = total / (1024 * 1024)
+        metrics.observe('browser_rss_mb', self.rss_mb)
+        return self.rss_mb
+
+    def responsive(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+class BrowserPool:
+    """
+    Pool de navegadores: cria Chromes sob demanda (até max_size) e só os recicla quando a medição pede —
+    RSS acima de max_rss_mb, taxa de erro nas últimas páginas acima de max_error_rate, driver sem resposta
+    ou, se configurado, max_pages páginas. Substitui o reinício fixo a cada 50 tickers.
+    factory() deve devolver (driver, service).
+    """
+
+    def __init__(self, factory, max_size=1, max_rss_mb=MAX_RSS_MB, max_error_rate=MAX_ERROR_RATE,
+                 error_window=ERROR_WINDOW, max_pages=MAX_PAGES, rss_check_every=RSS_CHECK_EVERY):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_rss_mb = max_rss_mb
+        self.max_error_rate = max_error_rate
+        self.error_window = error_window
+        self.max_pages = max_pages
+        self.rss_check_every = max(rss_check_every, 1)
+        self._idle = queue.Queue()
+        self._all = set()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.recycled = {}
+
+    def _start(self):
+        with metrics.timer('browser_start_seconds'):
+            driver, service = self.factory()
+        pooled = PooledDriver(driver, service, self.error_window)
+        with self._lock:
+            self._all.add(pooled)
+            self.started += 1
+        metrics.inc('browser_starts')
+        logger.debug(f"Navegador iniciado ({len(self._all)}/{self.max_size} no pool).")
+        return pooled
+
+    def acquire(self, timeout=None):
+        """Um navegador livre; cria um novo se o pool ainda não estiver cheio, senão espera um ser devolvido."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            pode_criar = len(self._all) < self.max_size
+        if pode_criar:
+            return self._start()
+        return self._idle.get(timeout=timeout)
+
+    def release(self, pooled):
+        """Devolve o navegador ao pool (reciclando-o antes, se o health check pedir)."""
+        if pooled is not None:
+            self._idle.put(self.checkpoint(pooled))
+
+    def unhealthy_reason(self, pooled, ping=False):
+        """Motivo para reciclar o navegador, ou None se ele pode continuar."""
+        if ping and not pooled.responsive():
+            return 'sem_resposta'
+        if len(pooled.recent) >= min(4, self.error_window) and pooled.error_rate > self.max_error_rate:
+            return 'taxa_de_erro'
+        if self.max_pages and pooled.pages >= self.max_pages:
+            return 'paginas'
+        if self.max_rss_mb and pooled.pages and pooled.pages % self.rss_check_every == 0:
+            rss = pooled.measure_rss()
+            if rss is not None and rss > self.max_rss_mb:
+                return 'memoria'
+        return None
+
+    def checkpoint(self, pooled, ping=False):
+        """Health check entre páginas: devolve o mesmo navegador ou um novo no lugar dele."""
+        reason = self.unhealthy_reason(pooled, ping=ping)
+        if reason is None:
+            return pooled
+        return self.recycle(pooled, reason)
+
+    def recycle(self, pooled, reason):
+        logger.info(f"Reciclando navegador ({reason}): {pooled.pages} páginas, {pooled.errors} erros, "
+                    f"taxa de erro recente {pooled.error_rate:.0%}, RSS {pooled.rss_mb or 0:.0f} MB.")
+        metrics.inc('browser_recycles', reason=reason)
+        self.recycled[reason] = self.recycled.get(reason, 0) + 1
+        self.discard(pooled)
+        return self._start()
+
+    def discard(self, pooled):
+        pooled.quit()
+        with self._lock:
+            self._all.discard(pooled)
+
+    def close(self):
+        """Encerra todos os navegadores do pool."""
+        with self._lock:
+            todos = list(self._all)
+            self._all.clear()
+        while not self._idle.empty():
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for pooled in todos:
+            pooled.quit()
+
+    def stats(self):
+        return {'ativos': len(self._all), 'iniciados': self.started, 'reciclados': dict(self.recycled)}
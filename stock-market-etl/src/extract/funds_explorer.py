@@ -1,36 +1,93 @@
-import cloudscraper
-from bs4 import BeautifulSoup
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from time import sleep
 import os
 import re
+import time
 from datetime import datetime
 from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+from src.utils.profiling import profiled
+from src.utils.bronze import write_bronze_csv
+from src.utils.page_archive import PageArchive
+from src.utils.snapshot_store import SnapshotStore, SNAPSHOT_STORE_DIR
+from src.extract.browser_pool import (BrowserPool, PooledDriver, resolve_chromedriver_path, LEAN_CRAWL,
+                                      lean_chrome_options, block_resources, page_network_stats)
 
 logger = get_logger(__name__)
 
+def _parse_html(html):
+    # bs4 só é importado quando há HTML para ler (subcomandos como `load` não pagam a importação)
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser')
+
+# Sufixos de escala nos indicadores do cabeçalho ("R$ 1,2 M", "850 mil", "2,1 Bi")
+_ESCALAS = {'k': 1e3, 'mil': 1e3, 'm': 1e6, 'mi': 1e6, 'milhão': 1e6, 'milhões': 1e6,
+            'b': 1e9, 'bi': 1e9, 'bilhão': 1e9, 'bilhões': 1e9}
+_NUMERO_COM_ESCALA = re.compile(r'^(-?[\d.]*\d(?:,\d+)?)\s*([a-zà-ú]*)$')
+
+def _parse_indicator_value(text):
+    """
+    Valor numérico de um indicador do cabeçalho: "R$ 10,52" -> 10.52, "0,95" -> 0.95, "8,5%" -> 8.5,
+    "R$ 1,2 M" -> 1200000.0. Devolve None quando o texto não é um número (ex.: "-", "N/A").
+    """
+    texto = text.replace('R$', '').replace('%', '').strip().lower()
+    match = _NUMERO_COM_ESCALA.match(texto)
+    if not match or match.group(2) not in ('', *_ESCALAS):
+        return None
+    valor = float(match.group(1).replace('.', '').replace(',', '.'))
+    return valor * _ESCALAS.get(match.group(2), 1)
+
 class FundsExplorerScraper:
-    def __init__(self, headless=True, user_data_dir=None):
+    def __init__(self, headless=True, user_data_dir=None, lean=None):
         self.headless = headless
         self.user_data_dir = user_data_dir
-        self.scraper = cloudscraper.create_scraper()
-        self.driver = None
-        self._init_driver()
+        # Perfil enxuto (padrão): sem imagens, fontes e scripts de terceiros. FUNDS_LEAN_CRAWL=0 desliga
+        self.lean = LEAN_CRAWL if lean is None else lean
+        self.last_page_stats = {}
+        # Chrome e a sessão do cloudscraper só são criados no primeiro uso; o pool decide quando reciclar o Chrome
+        self.pool = BrowserPool(self._create_driver)
+        self._browser = None
+        self._scraper = None
+        self._page_archive = None
         self.base_url = 'https://www.fundsexplorer.com.br'
-        logger.info(f"FundsExplorerScraper inicializado (Headless: {headless})")
+        logger.info(f"FundsExplorerScraper inicializado (Headless: {headless}, perfil enxuto: {self.lean})")
+
+    @property
+    def driver(self):
+        if self._browser is None:
+            self._browser = self.pool.acquire()
+        return self._browser.driver
+
+    @driver.setter
+    def driver(self, value):
+        self._browser = None if value is None else PooledDriver(value)
+
+    @property
+    def scraper(self):
+        if self._scraper is None:
+            import cloudscraper
+            self._scraper = cloudscraper.create_scraper()
+        return self._scraper
+
+    def close(self):
+        """Encerra o Chrome, se tiver sido iniciado."""
+        if self._browser is not None:
+            logger.info(f"Navegadores: {self.pool.stats()}")
+        self.pool.close()
+        self._browser = None
+
+    def _checkpoint(self, ping=False):
+        """Health check do Chrome atual (memória, taxa de erro, resposta); troca por um novo só se preciso."""
+        if self._browser is not None:
+            self._browser = self.pool.checkpoint(self._browser, ping=ping)
+
+    def _create_driver(self):
+        """Cria um Chrome para o pool. Retorna (driver, service)."""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from selenium.common.exceptions import SessionNotCreatedException
 
-    def _init_driver(self):
-        """Inicializa ou reinicializa o driver do Chrome."""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
-        
         chrome_options = Options()
         if self.headless:
             chrome_options.add_argument("--headless")
@@ -47,13 +104,30 @@ class FundsExplorerScraper:
         
         if self.user_data_dir:
             chrome_options.add_argument(f"user-data-dir={self.user_data_dir}")
+        if self.lean:
+            lean_chrome_options(chrome_options)
+        # Log de performance do Chrome: bytes transferidos e requisições por página
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
-        self.driver_service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=self.driver_service, options=chrome_options)
-        self.driver.set_page_load_timeout(30)
+        service = Service(resolve_chromedriver_path())
+        try:
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        except SessionNotCreatedException:
+            # Chrome atualizado desde que o caminho foi guardado: resolve o driver de novo
+            logger.warning("Chromedriver em cache incompatível com o Chrome; resolvendo novamente...")
+            service = Service(resolve_chromedriver_path(refresh=True))
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.set_page_load_timeout(30)
+        if self.lean:
+            block_resources(driver)
         logger.debug("WebDriver inicializado.")
+        return driver, service
 
-    def get_ativos_imobiliarios(self):
+    def get_ativos_imobiliarios(self, on_found=None):
+        """
+        Lista FIIs, Fiagros e Fiinfras. on_found (opcional) recebe os tickers de cada listagem assim que
+        ela é lida, para que etapas seguintes (ex.: Yahoo) comecem sem esperar as três páginas.
+        """
         urls = [
             f'{self.base_url}/funds',
             f'{self.base_url}/fiagros',
@@ -78,7 +152,7 @@ class FundsExplorerScraper:
                     last_height = new_height
                 
                 page_source = self.driver.page_source
-                soup = BeautifulSoup(page_source, 'html.parser')
+                soup = _parse_html(page_source)
 
                 tickers_found = soup.find_all('div', class_='tickerBox link-tickers-container')
                 logger.info(f"Encontrados {len(tickers_found)} ativos em {url}.")
@@ -98,6 +172,9 @@ class FundsExplorerScraper:
                         categoria = 'FIINFRA'
                     
                     all_data.append([categoria, tipo, ticker, descricao, primeira_info, segunda_info])
+
+                if on_found is not None:
+                    on_found([linha[2] for linha in all_data if linha[0] == categoria and linha[2] != '-'])
             except Exception as e:
                 logger.error(f"Erro ao buscar ativos em {url}: {e}", exc_info=True)
 
@@ -107,53 +184,99 @@ class FundsExplorerScraper:
         logger.info(f"Total de ativos únicos encontrados: {len(df)}")
         return df
 
+    def _archive(self, output_dir):
+        archive_dir = os.path.join(output_dir, "raw_pages", "archive")
+        if self._page_archive is None or self._page_archive.root != archive_dir:
+            if self._page_archive is not None:
+                self._page_archive.close()
+            self._page_archive = PageArchive(archive_dir)
+        return self._page_archive
+
     def _save_raw_page(self, *, output_dir: str, endpoint: str, ticker: str) -> tuple[str, str]:
         """
-        Salva o HTML bruto da página do ativo.
-        Retorna (url, filepath).
+        Guarda o HTML bruto da página do ativo no arquivo comprimido (raw_pages/archive), que grava
+        cada conteúdo distinto uma única vez. Retorna (url, content_hash).
         """
         url = f"{self.base_url}/{endpoint}/{ticker.lower()}"
-        raw_dir = os.path.join(output_dir, "raw_pages", endpoint)
-        os.makedirs(raw_dir, exist_ok=True)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = os.path.join(raw_dir, f"{ticker.lower()}_{ts}.html")
         try:
             html = self.driver.page_source
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(html)
-            return url, filepath
+            with metrics.timer('raw_page_write_seconds', endpoint=endpoint):
+                content_hash = self._archive(output_dir).put(html, ticker=ticker, endpoint=endpoint, url=url)
+            return url, content_hash
         except Exception as e:
             logger.warning(f"Falha ao salvar HTML bruto para {ticker} ({endpoint}): {e}")
             return url, ""
 
+    @staticmethod
+    def _endpoint_label(url):
+        # Label de baixa cardinalidade para as métricas: o primeiro segmento do caminho (funds, fiagros, ...)
+        path = url.split('://', 1)[-1].split('/', 1)[-1]
+        return path.split('/', 1)[0].split('?', 1)[0] or 'home'
+
+    def _drain_network_log(self):
+        # Descarta o que sobrou do log de performance, para que a próxima página conte só os próprios bytes
+        try:
+            self.driver.get_log('performance')
+        except Exception:
+            pass
+
+    def _record_network_stats(self, endpoint, perfil):
+        """Bytes transferidos, requisições (feitas/bloqueadas) e tempo de carga da página atual."""
+        stats = page_network_stats(self.driver)
+        self.last_page_stats = stats
+        if stats['bytes'] is not None:
+            metrics.observe('page_transfer_bytes', stats['bytes'], endpoint=endpoint, perfil=perfil)
+            metrics.inc('page_transfer_bytes_total', stats['bytes'], endpoint=endpoint, perfil=perfil)
+            metrics.inc('page_requests', stats['requests'], endpoint=endpoint, perfil=perfil)
+            metrics.inc('page_blocked_requests', stats['blocked'], endpoint=endpoint, perfil=perfil)
+        if stats['load_ms'] is not None:
+            metrics.observe('page_navigation_seconds', stats['load_ms'] / 1000, endpoint=endpoint, perfil=perfil)
+        return stats
+
+    @profiled('funds_explorer._get_soup')
     def _get_soup(self, url, retry_count=0):
+        endpoint = self._endpoint_label(url)
+        perfil = 'enxuto' if self.lean else 'completo'
         try:
-            self.driver.get(url)
-            self.driver.implicitly_wait(5)
-            sleep(2) 
-            page_source = self.driver.page_source
-            return BeautifulSoup(page_source, 'html.parser')
+            self._drain_network_log()
+            with metrics.timer('page_load_seconds', endpoint=endpoint):
+                self.driver.get(url)
+                self.driver.implicitly_wait(5)
+                sleep(2) 
+                page_source = self.driver.page_source
+            self._browser.record(ok=True)
+            metrics.inc('pages_fetched', endpoint=endpoint)
+            metrics.inc('page_bytes', len(page_source), endpoint=endpoint)
+            self._record_network_stats(endpoint, perfil)
+            with metrics.timer('page_parse_seconds', endpoint=endpoint):
+                return _parse_html(page_source)
         except Exception as e:
+            metrics.inc('page_errors', endpoint=endpoint)
+            if self._browser is not None:
+                self._browser.record(ok=False)
             if retry_count < 2:
-                logger.warning(f"Erro ao carregar {url} (tentativa {retry_count+1}): {e}. Reiniciando driver...")
-                self._init_driver()
+                logger.warning(f"Erro ao carregar {url} (tentativa {retry_count+1}): {e}.")
+                # Só troca o Chrome se ele não responder ou se a taxa de erro recente passar do limite
+                self._checkpoint(ping=True)
                 return self._get_soup(url, retry_count + 1)
             else:
                 logger.error(f"Falha ao carregar {url} após tentativas.")
                 raise e
 
-    def get_header_indicators(self, soup, ticker):
+    @profiled('funds_explorer.get_header_indicators')
+    def get_header_indicators(self, soup, ticker, timestamp=None):
         """
         Extrai os indicadores do topo da página (Preço, Liquidez, DY, P/VP, etc.)
+        timestamp: momento da captura da página (padrão: agora).
         """
-        indicators = {"Ticker": ticker, "timestamp": datetime.now()}
+        indicators = {"Ticker": ticker, "timestamp": timestamp or datetime.now()}
         
         try:
             # 1. Preço e Variação (Header principal)
             price_div = soup.find('div', class_='headerTicker__content__price')
             if price_div:
                 price_p = price_div.find('p')
-                indicators['preco_atual'] = price_p.text.strip().replace('R$', '').replace('.', '').replace(',', '.').strip() if price_p else None
+                indicators['preco_atual'] = _parse_indicator_value(price_p.text) if price_p else None
             
             # 2. Caixas de Indicadores (Carrossel ou Grid)
             # A classe pode variar, procurando padrão geral de caixas
@@ -165,21 +288,7 @@ class FundsExplorerScraper:
                 
                 if title_elem and value_elem:
                     title = title_elem.text.strip().lower()
-                    value = value_elem.text.strip()
-                    
-                    # Limpeza básica de valores
-                    clean_value = value.replace('R$', '').replace('%', '').replace('.', '').replace(',', '.').strip()
-                    
-                    # Tratar abreviações (K, M, B)
-                    try:
-                        if 'k' in clean_value.lower():
-                            clean_value = float(clean_value.lower().replace('k', '')) * 1000
-                        elif 'm' in clean_value.lower():
-                            clean_value = float(clean_value.lower().replace('m', '')) * 1000000
-                        elif 'b' in clean_value.lower():
-                            clean_value = float(clean_value.lower().replace('b', '')) * 1000000000
-                    except:
-                        pass # Mantém o valor como string se falhar conversão
+                    clean_value = _parse_indicator_value(value_elem.text)
                     
                     # Mapeamento para nomes de colunas
                     if 'liquidez' in title:
@@ -202,6 +311,7 @@ class FundsExplorerScraper:
             logger.warning(f"Erro ao extrair indicadores de cabeçalho para {ticker}: {e}")
             return pd.DataFrame()
 
+    @profiled('funds_explorer.get_dividend_history_full')
     def get_dividend_history_full(self, soup, ticker):
         """
         Extrai a tabela completa de histórico de dividendos.
@@ -242,6 +352,7 @@ class FundsExplorerScraper:
             logger.warning(f"Erro ao extrair histórico de dividendos para {ticker}: {e}")
             return pd.DataFrame()
 
+    @profiled('funds_explorer.get_info_completa')
     def get_info_completa(self, soup, ticker):
         info_basicas = {"Ticker": ticker}
 
@@ -290,6 +401,7 @@ class FundsExplorerScraper:
         except Exception:
             return pd.DataFrame()
 
+    @profiled('funds_explorer.get_simulacao')
     def get_simulacao(self, soup, ticker):
         try:
             simulation_data = []
@@ -308,6 +420,7 @@ class FundsExplorerScraper:
         except Exception:
             return pd.DataFrame()
 
+    @profiled('funds_explorer.get_localizacao')
     def get_localizacao(self, soup, ticker):
         try:
             locations_data = []
@@ -358,14 +471,60 @@ class FundsExplorerScraper:
             return pd.DataFrame()
         except: return pd.DataFrame()
 
-    def scrape_all(self, output_dir):
+    def discover(self, output_dir, on_found=None):
+        """Descobre os ativos e salva funds_ativos.csv. Retorna o DataFrame da lista."""
         os.makedirs(output_dir, exist_ok=True)
-        
+
         logger.info("Coletando lista de ativos (FIIs, Fiagros, Fiinfras)...")
-        df_ativos = self.get_ativos_imobiliarios()
+        df_ativos = self.get_ativos_imobiliarios(on_found=on_found)
         df_ativos.to_csv(os.path.join(output_dir, 'funds_ativos.csv'), index=False)
         logger.info(f"Lista de ativos salva em: {os.path.join(output_dir, 'funds_ativos.csv')}")
-        
+        return df_ativos
+
+    def scrape_all(self, output_dir):
+        df_ativos = self.discover(output_dir)
+        self.crawl(df_ativos, output_dir)
+
+    # Extratores aplicados a cada página de fundo: tabela do bronze -> método
+    PAGE_EXTRACTORS = {
+        "funds_indicadores_diarios": ('header', 'get_header_indicators'),
+        "funds_info_completa": ('info_completa', 'get_info_completa'),
+        "funds_simulacao": ('simulacao', 'get_simulacao'),
+        "funds_localizacao": ('localizacao', 'get_localizacao'),
+        "funds_rendimentos": ('rendimentos', 'get_dividend_history_full'),
+    }
+
+    def extract_tables(self, soup, ticker, timestamp=None):
+        """
+        Roda todos os extratores sobre uma página já lida (ao vivo ou do arquivo de páginas) e devolve
+        {tabela: DataFrame} só com as tabelas não vazias. timestamp data os indicadores diários
+        (padrão: agora); na re-extração é o momento em que a página foi capturada.
+        """
+        tables = {}
+        for name, (label, method) in self.PAGE_EXTRACTORS.items():
+            with metrics.timer('extract_seconds', extractor=label):
+                if name == "funds_indicadores_diarios":
+                    df = self.get_header_indicators(soup, ticker, timestamp=timestamp)
+                else:
+                    df = getattr(self, method)(soup, ticker)
+            if not df.empty:
+                tables[name] = df
+        return tables
+
+    @staticmethod
+    def _append_result(dict_dfs, name, df):
+        # pd.concat a cada ticker copia a tabela acumulada inteira: o tempo gasto aqui entra nas métricas
+        with metrics.timer('concat_seconds', table=name):
+            dict_dfs[name] = pd.concat([dict_dfs[name], df], ignore_index=True)
+
+    def crawl(self, df_ativos, output_dir, merge=False):
+        """
+        Visita a página de cada ativo de df_ativos e salva as tabelas funds_* no bronze.
+        Com merge=True (subconjunto de tickers), só as linhas desses tickers são trocadas nos CSVs.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        df_ativos = df_ativos.reset_index(drop=True)
+
         dict_dfs = {
             "funds_rendimentos": pd.DataFrame(),
             "funds_info_completa": pd.DataFrame(),
@@ -376,16 +535,14 @@ class FundsExplorerScraper:
         }
 
         total = len(df_ativos)
-        restart_frequency = 50 
 
         for idx, row in df_ativos.iterrows():
             ticker = row['Ticker']
             categoria = row.get('Categoria', 'FII')
             logger.info(f"[{idx+1}/{total}] Processando {ticker} ({categoria})...")
-            
-            if (idx + 1) % restart_frequency == 0:
-                logger.info("Reiniciando driver para limpar memória...")
-                self._init_driver()
+            metrics.inc('tickers_crawled', categoria=categoria)
+            # Recicla o Chrome entre tickers apenas se memória/erros medidos pedirem
+            self._checkpoint()
 
             try:
                 endpoint = 'funds'
@@ -399,54 +556,61 @@ class FundsExplorerScraper:
                 
                 if soup:
                     # Salvar HTML bruto da página para auditoria/histórico
-                    page_url, html_path = self._save_raw_page(output_dir=output_dir, endpoint=endpoint, ticker=ticker)
+                    page_url, content_hash = self._save_raw_page(output_dir=output_dir, endpoint=endpoint, ticker=ticker)
                     snap_row = pd.DataFrame([{
                         "Ticker": ticker,
                         "Categoria": categoria,
                         "endpoint": endpoint,
                         "url": page_url,
-                        "html_path": html_path,
+                        "content_hash": content_hash,
                         "fetched_at": datetime.now(),
+                        # Custo da página no perfil usado (enxuto/completo), para medir a economia do bloqueio
+                        "perfil": 'enxuto' if self.lean else 'completo',
+                        "bytes_transferidos": self.last_page_stats.get('bytes'),
+                        "requisicoes": self.last_page_stats.get('requests'),
+                        "requisicoes_bloqueadas": self.last_page_stats.get('blocked'),
+                        "load_ms": self.last_page_stats.get('load_ms'),
                     }])
-                    dict_dfs["funds_page_snapshots"] = pd.concat([dict_dfs["funds_page_snapshots"], snap_row], ignore_index=True)
-
-                    # Header Indicators (Novo)
-                    df_header = self.get_header_indicators(soup, ticker)
-                    if not df_header.empty:
-                        dict_dfs["funds_indicadores_diarios"] = pd.concat([dict_dfs["funds_indicadores_diarios"], df_header], ignore_index=True)
-
-                    # Info Completa
-                    df_info = self.get_info_completa(soup, ticker)
-                    if not df_info.empty:
-                        dict_dfs["funds_info_completa"] = pd.concat([dict_dfs["funds_info_completa"], df_info], ignore_index=True)
-
-                    # Simulação
-                    df_sim = self.get_simulacao(soup, ticker)
-                    if not df_sim.empty:
-                        dict_dfs["funds_simulacao"] = pd.concat([dict_dfs["funds_simulacao"], df_sim], ignore_index=True)
-
-                    # Localização
-                    df_loc = self.get_localizacao(soup, ticker)
-                    if not df_loc.empty:
-                        dict_dfs["funds_localizacao"] = pd.concat([dict_dfs["funds_localizacao"], df_loc], ignore_index=True)
-
-                    # Rendimentos (Agora tenta pegar da própria página ou variantes)
-                    df_rend = self.get_dividend_history_full(soup, ticker)
-                    if df_rend.empty:
+                    self._append_result(dict_dfs, "funds_page_snapshots", snap_row)
+
+                    tables = self.extract_tables(soup, ticker)
+                    # Rendimentos: se a tabela não estiver na página do fundo, tenta a página antiga
+                    if "funds_rendimentos" not in tables:
                         df_rend = self.get_rendimentos_old(ticker)
-                    
-                    if not df_rend.empty:
-                        dict_dfs["funds_rendimentos"] = pd.concat([dict_dfs["funds_rendimentos"], df_rend], ignore_index=True)
+                        if not df_rend.empty:
+                            tables["funds_rendimentos"] = df_rend
+                    for name, df in tables.items():
+                        self._append_result(dict_dfs, name, df)
 
             except Exception as e:
+                metrics.inc('ticker_errors', categoria=categoria)
                 logger.error(f"Erro ao capturar dados para {ticker}: {e}")
 
+        snapshots = dict_dfs["funds_page_snapshots"]
+        if not snapshots.empty and snapshots['bytes_transferidos'].notna().any():
+            logger.info(f"Páginas de fundos (perfil {snapshots['perfil'].iloc[0]}): "
+                        f"{snapshots['bytes_transferidos'].sum() / 1024 / 1024:.1f} MB transferidos em {len(snapshots)} páginas, "
+                        f"{snapshots['requisicoes_bloqueadas'].sum():.0f} requisições bloqueadas, "
+                        f"carga mediana {snapshots['load_ms'].median():.0f} ms.")
+
         for name, df in dict_dfs.items():
             filepath = os.path.join(output_dir, f"{name}.csv")
-            df.to_csv(filepath, index=False)
+            start = time.perf_counter()
+            write_bronze_csv(df, filepath, tickers=df_ativos['Ticker'].tolist() if merge else None)
+            metrics.rows('csv_write', len(df), time.perf_counter() - start, table=name)
             logger.info(f"Salvo: {filepath} ({len(df)} registros)")
 
-        self.driver.quit()
+        # O CSV guarda só a última coleta; o histórico tipado e compactado dos indicadores fica no store
+        try:
+            SnapshotStore(os.path.join(output_dir, SNAPSHOT_STORE_DIR)).append(dict_dfs["funds_indicadores_diarios"])
+        except Exception as e:
+            logger.error(f"Erro ao gravar o histórico de indicadores: {e}", exc_info=True)
+
+        if self._page_archive is not None:
+            logger.info(f"Arquivo de páginas: {self._page_archive.stats()}")
+            self._page_archive.close()
+            self._page_archive = None
+        self.close()
 
 if __name__ == "__main__":
     from src.config.logging_config import setup_logging
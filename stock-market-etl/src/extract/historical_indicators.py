@@ -1,7 +1,11 @@
-import yfinance as yf
 import pandas as pd
 import os
 import sys
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 # Adiciona diretório raiz ao path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,95 +30,203 @@ except ImportError:
             logging.basicConfig(level=logging.INFO)
             return logging.getLogger(name)
 
+from src.utils.metrics import metrics
+from src.utils.bronze import write_bronze_csv
+
 logger = get_logger(__name__)
 
+# Chaves do balanço do Yahoo para o Patrimônio Líquido e o número de cotas, em ordem de preferência
+EQUITY_KEYS = ['Total Stockholder Equity', 'Stockholders Equity', 'Total Equity Gross Minority Interest']
+SHARES_KEYS = ['Share Issued', 'Ordinary Shares Number']
+
+# Um ticker só é consultado de novo quando o último balanço tem mais de um trimestre e a última
+# consulta tem mais de RECHECK_DAYS (balanços saem semanas depois do fim do trimestre)
+STALE_AFTER_DAYS = 92
+RECHECK_DAYS = 7
+
+def _default_ticker_factory(symbol):
+    # yfinance só é importado quando algum ticker precisa ser consultado
+    import yfinance as yf
+    return yf.Ticker(symbol)
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if pd.isna(value) else value
+
 class HistoricalIndicatorsExtractor:
-    def __init__(self, output_dir):
+    """
+    Histórico de Patrimônio Líquido e VP por cota (balanços do Yahoo Finance), como etapa do ETL.
+    - Busca concorrente e limitada: até max_workers tickers em paralelo (yfinance passa o tempo em I/O).
+    - Cache persistente por ticker (cache_path, JSON) com os balanços indexados pela data do relatório;
+      balanços de consultas anteriores são mantidos, então o histórico cresce além do que o Yahoo devolve.
+    - Incremental: só consulta tickers sem cache ou cujo último relatório tem mais de um trimestre.
+    ticker_factory(symbol) cria o objeto com quarterly_balance_sheet/balance_sheet/info (padrão: yf.Ticker),
+    o que permite testar com um stub.
+    """
+
+    def __init__(self, output_dir, *, cache_path=None, ticker_factory=None, max_workers=4,
+                 stale_after_days=STALE_AFTER_DAYS, recheck_days=RECHECK_DAYS):
         self.output_dir = output_dir
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.cache_path = cache_path or os.path.join(output_dir, 'yahoo_balancos_cache.json')
+        self.ticker_factory = ticker_factory or _default_ticker_factory
+        self.max_workers = max(int(max_workers), 1)
+        self.stale_after = timedelta(days=stale_after_days)
+        self.recheck = timedelta(days=recheck_days)
+        self._lock = threading.Lock()
+        self.cache = self._load_cache()
 
-    def get_historical_vp(self, ticker):
+    # --- cache -------------------------------------------------------------------------------------------
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('tickers', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de balanços ilegível ({self.cache_path}): {e}. Começando do zero.")
+            return {}
+
+    def save_cache(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with self._lock:
+            payload = {'saved_at': datetime.now().isoformat(timespec='seconds'), 'tickers': self.cache}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def needs_refresh(self, ticker, now=None):
+        """True se o ticker não está no cache ou se o último relatório tem mais de um trimestre."""
+        now = now or datetime.now()
+        entry = self.cache.get(ticker)
+        if not entry:
+            return True
+        if now - datetime.fromisoformat(entry['fetched_at']) < self.recheck:
+            return False
+        reports = entry.get('reports') or {}
+        if not reports:
+            return True
+        return now - datetime.fromisoformat(max(reports)) > self.stale_after
+
+    # --- consulta ----------------------------------------------------------------------------------------
+
+    def fetch_reports(self, ticker):
         """
-        Tenta obter o histórico de Patrimônio Líquido e VP por cota via Yahoo Finance.
+        Consulta o Yahoo e devolve {data_do_relatorio: {Patrimonio_Liquido, Cotas, VP_Cota}}.
         Nota: Para FIIs brasileiros, o Yahoo muitas vezes tem dados limitados de balanço.
         """
-        try:
-            # Tentar sufixo .SA se não tiver
-            ticker_sa = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
-            stock = yf.Ticker(ticker_sa)
-            
-            # Balanço Anual e Trimestral
+        ticker_sa = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+        stock = self.ticker_factory(ticker_sa)
+
+        # Balanço trimestral; o anual só quando não há trimestral
+        with metrics.timer('fundamentals_request_seconds', kind='quarterly_balance_sheet'):
             balance_sheet = stock.quarterly_balance_sheet
-            if balance_sheet.empty:
+        if balance_sheet is None or balance_sheet.empty:
+            with metrics.timer('fundamentals_request_seconds', kind='balance_sheet'):
                 balance_sheet = stock.balance_sheet
-            
-            if balance_sheet.empty:
-                logger.warning(f"Sem dados de balanço (VP) para {ticker} no Yahoo Finance.")
-                return pd.DataFrame()
-
-            # Transpor para ter datas nas linhas
-            df_bs = balance_sheet.T
-            
-            # Buscar chaves comuns para Patrimônio Líquido
-            # Keys possíveis: 'Total Stockholder Equity', 'Stockholders Equity', 'Total Assets' (menos passivo)
-            equity_col = None
-            possible_keys = ['Total Stockholder Equity', 'Stockholders Equity', 'Total Equity Gross Minority Interest']
-            
-            for key in possible_keys:
-                if key in df_bs.columns:
-                    equity_col = key
-                    break
-            
-            if not equity_col:
-                logger.warning(f"Coluna de Patrimônio Líquido não encontrada para {ticker}.")
-                return pd.DataFrame()
-
-            # Preparar DataFrame
-            df_hist = df_bs[[equity_col]].copy()
-            df_hist.columns = ['Patrimonio_Liquido']
-            df_hist['Ticker'] = ticker
-            df_hist = df_hist.reset_index().rename(columns={'index': 'Date'})
-            
-            # Tentar obter número de cotas para calcular VP por cota
-            # O Yahoo nem sempre tem o histórico de "Share Issued" preciso trimestralmente na API pública
-            # Vamos tentar usar o dado atual de 'sharesOutstanding' do info como aproximação ou buscar 'Share Issued' no balanço
-            shares_col = None
-            if 'Share Issued' in df_bs.columns:
-                shares_col = 'Share Issued'
-            elif 'Ordinary Shares Number' in df_bs.columns:
-                shares_col = 'Ordinary Shares Number'
-                
-            if shares_col:
-                df_hist['Cotas'] = df_bs[shares_col]
-                df_hist['VP_Cota'] = df_hist['Patrimonio_Liquido'] / df_hist['Cotas']
-            else:
-                # Fallback: Usar cotas atuais (impreciso para passado distante, mas melhor que nada)
-                info = stock.info
-                current_shares = info.get('sharesOutstanding')
-                if current_shares:
-                    df_hist['Cotas'] = current_shares
-                    df_hist['VP_Cota'] = df_hist['Patrimonio_Liquido'] / current_shares
-                else:
-                    df_hist['VP_Cota'] = None
-
-            return df_hist
+        if balance_sheet is None or balance_sheet.empty:
+            logger.warning(f"Sem dados de balanço (VP) para {ticker} no Yahoo Finance.")
+            return {}
+
+        # Transpor para ter datas nas linhas
+        df_bs = balance_sheet.T
+        equity_col = next((key for key in EQUITY_KEYS if key in df_bs.columns), None)
+        if not equity_col:
+            logger.warning(f"Coluna de Patrimônio Líquido não encontrada para {ticker}.")
+            return {}
+
+        shares_col = next((key for key in SHARES_KEYS if key in df_bs.columns), None)
+        if shares_col:
+            cotas = df_bs[shares_col]
+        else:
+            # Fallback: cotas atuais (impreciso para passado distante, mas melhor que nada)
+            with metrics.timer('fundamentals_request_seconds', kind='info'):
+                current_shares = (stock.info or {}).get('sharesOutstanding')
+            cotas = pd.Series(current_shares, index=df_bs.index)
+
+        reports = {}
+        for date, pl in df_bs[equity_col].items():
+            pl, n_cotas = _to_float(pl), _to_float(cotas.get(date))
+            if pl is None:
+                continue
+            reports[pd.Timestamp(date).date().isoformat()] = {
+                'Patrimonio_Liquido': pl,
+                'Cotas': n_cotas,
+                'VP_Cota': pl / n_cotas if n_cotas else None,
+            }
+        return reports
+
+    def refresh_ticker(self, ticker):
+        """Consulta um ticker e funde os relatórios no cache. Retorna quantos relatórios novos vieram."""
+        try:
+            reports = self.fetch_reports(ticker)
         except Exception as e:
+            metrics.inc('fundamentals_errors')
             logger.error(f"Erro ao extrair histórico de VP para {ticker}: {e}")
+            return 0
+        metrics.inc('fundamentals_fetched')
+        with self._lock:
+            entry = self.cache.setdefault(ticker, {'reports': {}})
+            novos = len(set(reports) - set(entry['reports']))
+            entry['reports'].update(reports)
+            entry['fetched_at'] = datetime.now().isoformat(timespec='seconds')
+        return novos
+
+    def get_historical_vp(self, ticker):
+        """Histórico de PL e VP por cota do ticker (do cache), no formato de yahoo_historical_indicators.csv."""
+        reports = (self.cache.get(ticker) or {}).get('reports') or {}
+        if not reports:
             return pd.DataFrame()
+        df_hist = pd.DataFrame.from_dict(reports, orient='index')
+        df_hist.index = pd.to_datetime(df_hist.index)
+        df_hist = df_hist.sort_index().rename_axis('Date').reset_index()
+        df_hist['Ticker'] = ticker
+        return df_hist[['Date', 'Patrimonio_Liquido', 'Ticker', 'Cotas', 'VP_Cota']]
 
-    def process_tickers(self, tickers):
-        all_data = []
-        for ticker in tickers:
-            logger.info(f"Processando histórico fundamentalista para {ticker}...")
-            df = self.get_historical_vp(ticker)
-            if not df.empty:
-                all_data.append(df)
-        
+    def process_tickers(self, tickers, merge=False, force=False):
+        """
+        Atualiza o cache dos tickers vencidos (todos, com force=True) em paralelo e grava
+        yahoo_historical_indicators.csv com o histórico de todos os tickers recebidos.
+        tickers pode ser um iterável sem tamanho (ex.: TickerStream): as consultas começam conforme eles chegam.
+        Com merge=True só as linhas desses tickers são trocadas no CSV.
+        """
+        processados, consultados = [], 0
+        # No máximo 2x max_workers consultas pendentes: um stream grande não vira uma fila enorme de futures
+        vagas = threading.BoundedSemaphore(self.max_workers * 2)
+        futures = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for ticker in tickers:
+                processados.append(ticker)
+                if not force and not self.needs_refresh(ticker):
+                    metrics.inc('fundamentals_cache_hits')
+                    continue
+                consultados += 1
+                vagas.acquire()
+                future = pool.submit(self.refresh_ticker, ticker)
+                future.add_done_callback(lambda _: vagas.release())
+                futures.append(future)
+        novos = sum(f.result() for f in futures)
+        metrics.rows('fundamentals_refresh', consultados, time.perf_counter() - start)
+        logger.info(f"Fundamentos: {consultados} de {len(processados)} tickers consultados "
+                    f"({len(processados) - consultados} em cache), {novos} relatórios novos.")
+        if consultados:
+            self.save_cache()
+
+        all_data = [df for df in (self.get_historical_vp(t) for t in processados) if not df.empty]
         if all_data:
             final_df = pd.concat(all_data, ignore_index=True)
+            os.makedirs(self.output_dir, exist_ok=True)
             output_path = os.path.join(self.output_dir, 'yahoo_historical_indicators.csv')
-            final_df.to_csv(output_path, index=False)
-            logger.info(f"Dados históricos salvos em: {output_path}")
+            if merge:
+                write_bronze_csv(final_df, output_path, tickers=processados)
+            else:
+                final_df.to_csv(output_path, index=False)
+            logger.info(f"Dados históricos salvos em: {output_path} ({len(final_df)} registros)")
         else:
             logger.warning("Nenhum dado histórico fundamentalista encontrado.")
 
@@ -133,5 +245,6 @@ class HistoricalIndicatorsExtractor:
 
 if __name__ == "__main__":
     # Teste
-    extractor = HistoricalIndicatorsExtractor(output_dir="stock-market-etl/data/bronze")
+    extractor = HistoricalIndicatorsExtractor(output_dir="stock-market-etl/data/bronze",
+                                              cache_path="stock-market-etl/data/state/yahoo_balancos_cache.json")
     extractor.process_tickers(["MXRF11", "KNRI11"]) # Exemplos
@@ -0,0 +1,154 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+from src.utils.bronze import write_bronze_csv
+from src.utils.page_archive import PageArchive
+from src.utils.snapshot_store import SnapshotStore, SNAPSHOT_STORE_DIR
+
+logger = get_logger(__name__)
+
+# Tabelas de "estado atual": vêm da captura mais recente de cada ticker. funds_indicadores_diarios é
+# histórica: uma linha por captura (por padrão, a última de cada ticker em cada dia).
+CURRENT_TABLES = ["funds_info_completa", "funds_simulacao", "funds_localizacao", "funds_rendimentos"]
+HISTORY_TABLE = "funds_indicadores_diarios"
+
+# Estado de cada processo do pool: um scraper sem navegador e o arquivo de páginas aberto para leitura
+_worker = {}
+
+def _init_worker(archive_root):
+    from src.extract.funds_explorer import FundsExplorerScraper
+    _worker['scraper'] = FundsExplorerScraper(headless=True)
+    _worker['archive'] = PageArchive(archive_root)
+
+def _extract_content(task):
+    """
+    Extrai um conteúdo do arquivo. task = (content_hash, ticker, [fetched_at...], inclui_estado_atual):
+    páginas idênticas capturadas em dias diferentes são lidas e parseadas uma única vez.
+    """
+    from src.extract.funds_explorer import _parse_html
+
+    content_hash, ticker, capturas, estado_atual = task
+    scraper = _worker['scraper']
+    try:
+        soup = _parse_html(_worker['archive'].get(content_hash))
+        tables = scraper.extract_tables(soup, ticker, timestamp=capturas[0])
+    except Exception as e:
+        return ticker, {}, f"{content_hash[:12]}: {e}"
+
+    result = {}
+    header = tables.get(HISTORY_TABLE)
+    if header is not None:
+        result[HISTORY_TABLE] = pd.concat([header.assign(timestamp=ts) for ts in capturas], ignore_index=True)
+    if estado_atual:
+        result.update({name: tables[name] for name in CURRENT_TABLES if name in tables})
+    return ticker, result, None
+
+def _tasks(snapshots, ultimas):
+    """ultimas: id da captura mais recente de cada ticker no arquivo inteiro (só ela gera as tabelas de estado atual)."""
+    latest = snapshots['id'].isin(set(ultimas))
+    tasks = []
+    for (ticker, content_hash), grupo in snapshots.groupby(['ticker', 'content_hash'], sort=False):
+        tasks.append((content_hash, ticker, [ts.to_pydatetime() for ts in grupo['fetched_at']],
+                      bool(latest[grupo.index].any())))
+    return tasks
+
+def _history_outside_window(filepath, tickers, since, until):
+    """
+    Linhas já existentes do histórico desses tickers fora de [since, until], que a re-extração preserva.
+    since é uma data ou uma Series Ticker -> início (a primeira captura arquivada de cada ticker).
+    """
+    if (since is None and not until) or not os.path.exists(filepath):
+        return pd.DataFrame()
+    existing = pd.read_csv(filepath)
+    existing = existing[existing['Ticker'].isin(set(tickers))]
+    ts = pd.to_datetime(existing['timestamp'], format='mixed', errors='coerce')
+    fora = pd.Series(False, index=existing.index)
+    if isinstance(since, pd.Series):
+        fora |= ts < existing['Ticker'].map(since)
+    elif since:
+        fora |= ts < pd.Timestamp(since)
+    if until:
+        fora |= ts >= pd.Timestamp(until).normalize() + pd.Timedelta(days=1)
+    return existing[fora]
+
+def _replace_store_history(bronze_dir, df, tickers, since, until):
+    """Regrava no store de snapshots o histórico re-extraído dos tickers (só quando a janela vai até hoje)."""
+    if until:
+        # Capturas depois de --until continuam compactadas contra os valores antigos: o store não é trocado
+        logger.warning("Re-extração com --until: o store de indicadores diários não foi atualizado "
+                       "(rode sem --until para regravá-lo).")
+        return
+    try:
+        SnapshotStore(os.path.join(bronze_dir, SNAPSHOT_STORE_DIR)).replace(df, tickers, since=since)
+    except Exception as e:
+        logger.error(f"Erro ao regravar o histórico de indicadores: {e}", exc_info=True)
+
+def reextract(bronze_dir, *, tickers=None, since=None, until=None, workers=None, all_snapshots=False):
+    """
+    Regenera as tabelas funds_* do bronze a partir do arquivo de páginas (raw_pages/archive), sem acesso
+    à rede: os extratores rodam em paralelo num ProcessPool (um processo por núcleo por padrão).
+    Os CSVs têm só as linhas dos tickers re-extraídos trocadas. Retorna {tabela: registros}.
+    """
+    archive_root = os.path.join(bronze_dir, 'raw_pages', 'archive')
+    if not os.path.exists(os.path.join(archive_root, 'index.sqlite')):
+        logger.error(f"Arquivo de páginas não encontrado em {archive_root}.")
+        return {}
+
+    archive = PageArchive(archive_root)
+    snapshots = archive.snapshots(tickers=tickers, since=since, until=until, latest_per_day=not all_snapshots)
+    # Estado atual só da captura mais recente do arquivo inteiro: com --until, a última página antes da data
+    # é antiga e não pode sobrescrever funds_info_completa, funds_rendimentos etc.
+    todas = archive.snapshots(tickers=tickers) if until else snapshots
+    ultimas = todas.groupby('ticker')['id'].max()
+    archive.close()
+    if snapshots.empty:
+        logger.warning("Nenhuma captura no arquivo para os filtros informados.")
+        return {}
+    if until and not snapshots['id'].isin(set(ultimas)).any():
+        logger.info(f"Capturas até {until} não são as mais recentes: só {HISTORY_TABLE} será re-extraída.")
+
+    tasks = _tasks(snapshots, ultimas)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Re-extraindo {len(snapshots)} capturas ({len(tasks)} conteúdos distintos, "
+                f"{snapshots['ticker'].nunique()} tickers) com {workers} processos...")
+
+    partes = {name: [] for name in CURRENT_TABLES + [HISTORY_TABLE]}
+    erros = 0
+    start = time.perf_counter()
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(archive_root,)) as pool:
+        for ticker, tables, erro in pool.map(_extract_content, tasks, chunksize=chunksize):
+            if erro:
+                erros += 1
+                metrics.inc('reextract_errors')
+                logger.error(f"Erro ao re-extrair {ticker} ({erro})")
+                continue
+            for name, df in tables.items():
+                partes[name].append(df)
+    elapsed = time.perf_counter() - start
+    metrics.rows('reextract_pages', len(tasks), elapsed)
+    logger.info(f"Extração concluída em {elapsed:.1f}s ({len(tasks) / elapsed if elapsed else 0:.0f} páginas/s, {erros} erros).")
+
+    # Sem --since, cada ticker é trocado a partir da sua primeira captura arquivada: o histórico anterior ao
+    # arquivo (ex.: importado com `snapshot_store.py import --csv`) continua no CSV e no store
+    inicio = since or snapshots.groupby('ticker')['fetched_at'].min()
+    totais = {}
+    for name, dfs in partes.items():
+        if not dfs:
+            continue
+        df = pd.concat(dfs, ignore_index=True)
+        # Só os tickers cuja página gerou linhas desta tabela: os rendimentos do crawl podem ter vindo da página
+        # antiga de rendimentos (get_rendimentos_old), que não é arquivada, e não podem ser apagados
+        reextraidos = df['Ticker'].unique().tolist()
+        filepath = os.path.join(bronze_dir, f"{name}.csv")
+        if name == HISTORY_TABLE:
+            _replace_store_history(bronze_dir, df, reextraidos, inicio, until)
+            df = pd.concat([_history_outside_window(filepath, reextraidos, inicio, until), df], ignore_index=True)
+            df = df.sort_values(['Ticker', 'timestamp'], key=lambda col: col.astype(str), kind='stable')
+        write_bronze_csv(df, filepath, tickers=reextraidos)
+        totais[name] = len(df)
+        logger.info(f"Salvo: {filepath} ({len(df)} registros re-extraídos)")
+    return totais
@@ -1,8 +1,10 @@
-import yfinance as yf
 import pandas as pd
 import re
 import os
+import time
 from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+from src.utils.bronze import write_bronze_csv
 
 # Configurar logger da biblioteca yfinance para WARNING para reduzir ruído
 import logging
@@ -10,9 +12,12 @@ logging.getLogger('yfinance').setLevel(logging.WARNING)
 
 logger = get_logger(__name__)
 
+INTERVALOS = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1d', '5d', '1wk', '1mo', '3mo']
+
 class YahooFinanceScraper:
-    def __init__(self):
-        self.intervalos = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1d', '5d', '1wk', '1mo', '3mo']
+    def __init__(self, intervalos=None):
+        self.intervalos = list(intervalos) if intervalos else list(INTERVALOS)
+        self.tickers_processados = []
         logger.info(f"YahooFinanceScraper inicializado. Intervalos: {self.intervalos}")
 
     def buscar_cotacao_por_intervalo_variantes(self, ticker_original, intervalo):
@@ -24,14 +29,20 @@ class YahooFinanceScraper:
             re.sub(r'[A-Za-z]+$', '', ticker_original) + '.SA'  # Exemplo: ANCR11.SA
         ]
         
+        # yfinance só é importado quando há algo a buscar
+        import yfinance as yf
+
         # Iterar sobre as variantes e tentar buscar os dados
         for ticker_modificado in variantes:
             try:
                 ativo = yf.Ticker(ticker_modificado)
                 # Usa 'max' para pegar histórico completo
-                historico = ativo.history(period="max", interval=intervalo)
+                with metrics.timer('yahoo_request_seconds', intervalo=intervalo):
+                    historico = ativo.history(period="max", interval=intervalo)
+                metrics.inc('yahoo_requests', intervalo=intervalo)
                 
                 if not historico.empty:
+                    metrics.inc('yahoo_rows', len(historico), intervalo=intervalo)
                     logger.debug(f"Dados capturados para {ticker_modificado} no intervalo {intervalo} ({len(historico)} registros)")
                     historico['Ticker'] = ticker_original  
                     historico['Ticker_Yahoo'] = ticker_modificado 
@@ -40,16 +51,19 @@ class YahooFinanceScraper:
                     historico = historico.reset_index()
                     return historico[['Date', 'Ticker', 'Ticker_Yahoo', 'Open', 'High', 'Low', 'Close', 'Volume', 'Intervalo']] if 'Date' in historico.columns else historico[['Datetime', 'Ticker', 'Ticker_Yahoo', 'Open', 'High', 'Low', 'Close', 'Volume', 'Intervalo']]
             except Exception as e:
+                metrics.inc('yahoo_errors', intervalo=intervalo)
                 # Log debug se falhar, mas continua tentando variantes
                 # logger.debug(f"Falha ao buscar {ticker_modificado}: {e}")
                 pass
         return None
 
     def obter_historicos_ativos(self, lista_tickers):
+        # lista_tickers pode ser um iterável sem tamanho (ex.: TickerStream alimentado pela descoberta)
         todos_historicos = []
-        total = len(lista_tickers)
+        total = len(lista_tickers) if isinstance(lista_tickers, (list, tuple)) else '?'
         
         for idx, ticker_original in enumerate(lista_tickers):
+            self.tickers_processados.append(ticker_original)
             # Log apenas a cada 10 ativos ou o primeiro para reduzir ruído no log principal
             if idx == 0 or (idx + 1) % 10 == 0:
                 logger.info(f"[{idx+1}/{total}] Processando... (Atual: {ticker_original})")
@@ -60,14 +74,18 @@ class YahooFinanceScraper:
                 
                 if historico is not None:
                     todos_historicos.append(historico)
+                else:
+                    metrics.inc('yahoo_sem_dados', intervalo=intervalo)
         
         if todos_historicos:
-            historico_df = pd.concat(todos_historicos, ignore_index=True)
+            with metrics.timer('concat_seconds', table='yahoo_cotacoes'):
+                historico_df = pd.concat(todos_historicos, ignore_index=True)
             return historico_df
         else:
             return pd.DataFrame()
 
-    def scrape_all(self, lista_tickers, output_dir):
+    def scrape_all(self, lista_tickers, output_dir, merge=False):
+        """Busca o histórico dos tickers e grava yahoo_cotacoes.csv (com merge=True, só troca esses tickers/intervalos)."""
         os.makedirs(output_dir, exist_ok=True)
         
         logger.info("Iniciando coleta do Yahoo Finance...")
@@ -80,7 +98,11 @@ class YahooFinanceScraper:
             historicos_df_clean = historicos_df_clean.drop_duplicates()
             
             output_path = os.path.join(output_dir, 'yahoo_cotacoes.csv')
-            historicos_df_clean.to_csv(output_path, index=False)
+            start = time.perf_counter()
+            write_bronze_csv(historicos_df_clean, output_path,
+                             tickers=self.tickers_processados if merge else None,
+                             replace_where={'Intervalo': self.intervalos})
+            metrics.rows('csv_write', len(historicos_df_clean), time.perf_counter() - start, table='yahoo_cotacoes')
             logger.info(f"Histórico Yahoo salvo em: {output_path} ({len(historicos_df_clean)} registros)")
         else:
             logger.warning("Nenhum dado Yahoo capturado.")
@@ -1,5 +1,6 @@
 import os
 import sys
+import argparse
 import pandas as pd
 from dotenv import load_dotenv
 
@@ -9,9 +10,33 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(os.path.join(project_root, 'stock-market-etl'))
 
 from src.config.logging_config import setup_logging
-from src.extract.funds_explorer import FundsExplorerScraper
-from src.extract.yahoo_finance import YahooFinanceScraper
-from src.transform.loader import load_bronze_to_silver
+# Scrapers, loader e materializações são importados dentro das etapas: selenium, yfinance e a
+# calculadora só são carregados quando a etapa que precisa deles roda
+from src.pipeline.dag import Stage, DAGRunner, TickerStream
+from src.utils.metrics import metrics
+from src.utils.profiling import add_profile_arguments, configure_profiling, write_profile_report
+
+# Configurações de caminhos
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BRONZE_DIR = os.path.join(BASE_DIR, 'data', 'bronze')
+INPUT_DIR = os.path.join(BASE_DIR, 'data', 'input')
+STATE_DIR = os.path.join(BASE_DIR, 'data', 'state')
+LOG_DIR = os.path.join(BASE_DIR, 'logs')
+FUNDAMENTOS_CACHE = os.path.join(STATE_DIR, 'yahoo_balancos_cache.json')
+
+CATEGORIAS = ['FII', 'FIAGRO', 'FIINFRA']
+
+# Subcomando -> etapas de trabalho (as etapas que publicam tickers são acrescentadas conforme os filtros)
+COMANDOS = {
+    'all': ['funds_paginas', 'yahoo', 'fundamentos', 'loader', 'oceans14', 'gold', 'incremental'],
+    'crawl-funds': ['funds_paginas'],
+    'fetch-yahoo': ['yahoo'],
+    'fetch-fundamentals': ['fundamentos'],
+    'load': ['loader', 'oceans14'],
+    'materialize': ['gold', 'incremental'],
+    'reextract': ['reextracao'],
+}
+ETAPAS_COM_TICKERS = {'funds_paginas', 'yahoo', 'fundamentos'}
 
 def load_manual_tickers(filepath):
     if not os.path.exists(filepath):
@@ -20,61 +45,300 @@ def load_manual_tickers(filepath):
         tickers = [line.strip() for line in f.readlines() if line.strip()]
     return tickers
 
-def main():
+def _lista(valor):
+    return [item.strip() for item in valor.split(',') if item.strip()]
+
+def _com_subcomando(argv):
+    """Sem subcomando, insere 'all' depois das opções globais (ex.: main.py --profile --tickers XPML11)."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if any(arg in COMANDOS for arg in argv):
+        return argv
+    i = 0
+    while i < len(argv) and argv[i] in ('-h', '--help', '--profile', '--profile-dir') or \
+            (i < len(argv) and argv[i].startswith('--profile-dir=')):
+        i += 2 if argv[i] == '--profile-dir' else 1
+    return argv[:i] + ['all'] + argv[i:]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="ETL de FIIs: Funds Explorer, Yahoo Finance, carga e materialização.",
+        epilog="Sem subcomando roda o pipeline completo (equivale a 'all').")
+    add_profile_arguments(parser)
+
+    # Filtros comuns a todos os subcomandos
+    filtros = argparse.ArgumentParser(add_help=False)
+    filtros.add_argument('--tickers', type=_lista, help="Só estes tickers, separados por vírgula (ex.: XPML11,KNRI11)")
+    filtros.add_argument('--categoria', type=lambda v: [c.upper() for c in _lista(v)],
+                         help=f"Só estas categorias do funds_ativos.csv ({', '.join(CATEGORIAS)})")
+    filtros.add_argument('--dry-run', action='store_true',
+                         help="Mostra as etapas e a estimativa de requisições e sai sem executar nada")
+    yahoo = argparse.ArgumentParser(add_help=False)
+    yahoo.add_argument('--intervals', type=_lista, help="Intervalos do Yahoo (ex.: 1d,1wk). Padrão: todos")
+    gold = argparse.ArgumentParser(add_help=False)
+    gold.add_argument('--full-refresh', action='store_true', help="Recalcula as tabelas gold do zero")
+
+    sub = parser.add_subparsers(dest='command', metavar='COMANDO')
+    sub.add_parser('all', parents=[filtros, yahoo, gold], help="Pipeline completo (padrão)")
+    sub.add_parser('crawl-funds', parents=[filtros], help="Descoberta e páginas dos fundos no Funds Explorer")
+    sub.add_parser('fetch-yahoo', parents=[filtros, yahoo], help="Cotações do Yahoo Finance")
+    fundamentos = sub.add_parser('fetch-fundamentals', parents=[filtros], help="Histórico de balanço (VP) do Yahoo Finance")
+    fundamentos.add_argument('--full-refresh', action='store_true',
+                             help="Ignora o cache de balanços e consulta todos os tickers")
+    carga = sub.add_parser('load', parents=[filtros], help="Carga bronze -> silver (sempre todos os tickers do bronze)")
+    carga.add_argument('--full-refresh', action='store_true',
+                       help="Recarrega os CSVs da Oceans14 mesmo sem alterações desde a última carga")
+    sub.add_parser('materialize', parents=[filtros, gold], help="Materialização gold e indicadores incrementais")
+    reextrair = sub.add_parser('reextract', parents=[filtros],
+                               help="Regenera as tabelas funds_* a partir do arquivo de páginas, sem rede")
+    reextrair.add_argument('--since', help="Capturas a partir desta data (AAAA-MM-DD)")
+    reextrair.add_argument('--until', help="Capturas até esta data, inclusive (AAAA-MM-DD)")
+    reextrair.add_argument('--workers', type=int, help="Processos do pool (padrão: núcleos da máquina)")
+    reextrair.add_argument('--all-snapshots', action='store_true',
+                           help="Uma linha de indicadores por captura (padrão: a última de cada ticker por dia)")
+
+    args = parser.parse_args(_com_subcomando(argv))
+    for opcao, padrao in (('tickers', None), ('categoria', None), ('intervals', None), ('full_refresh', False),
+                          ('dry_run', False), ('since', None), ('until', None), ('workers', None),
+                          ('all_snapshots', False)):
+        if not hasattr(args, opcao):
+            setattr(args, opcao, padrao)
+
+    if args.categoria and set(args.categoria) - set(CATEGORIAS):
+        parser.error(f"--categoria inválida: {', '.join(sorted(set(args.categoria) - set(CATEGORIAS)))}")
+    if args.intervals:
+        from src.extract.yahoo_finance import INTERVALOS
+        invalidos = [i for i in args.intervals if i not in INTERVALOS]
+        if invalidos:
+            parser.error(f"--intervals inválido: {', '.join(invalidos)} (válidos: {', '.join(INTERVALOS)})")
+    if args.categoria and not os.path.exists(os.path.join(BRONZE_DIR, 'funds_ativos.csv')):
+        parser.error("--categoria usa o funds_ativos.csv da última descoberta; rode 'crawl-funds' antes")
+    return args
+
+def _ler_ativos():
+    path = os.path.join(BRONZE_DIR, 'funds_ativos.csv')
+    return pd.read_csv(path) if os.path.exists(path) else pd.DataFrame(columns=['Categoria', 'Ticker'])
+
+def resolver_tickers(args, df_ativos):
+    """Tickers pedidos por --tickers/--categoria (na ordem informada), ou None para o universo inteiro."""
+    if not args.tickers and not args.categoria:
+        return None
+    alvo = [t.upper() for t in args.tickers] if args.tickers else df_ativos['Ticker'].tolist()
+    if args.categoria:
+        da_categoria = set(df_ativos.loc[df_ativos['Categoria'].isin(args.categoria), 'Ticker'])
+        alvo = [t for t in alvo if t in da_categoria]
+    return list(dict.fromkeys(alvo))
+
+def selecionar_etapas(command, subconjunto):
+    """Nomes das etapas do subcomando, incluindo as que publicam os tickers quando alguma etapa os consome."""
+    trabalho = COMANDOS[command]
+    if not ETAPAS_COM_TICKERS & set(trabalho):
+        return list(trabalho)
+    if subconjunto or command not in ('all', 'crawl-funds'):
+        # Lista fixa (filtros ou última descoberta): nenhuma listagem é baixada
+        fontes = ['tickers_selecionados']
+    else:
+        fontes = ['tickers_manuais', 'funds_descoberta'] if command == 'all' else ['funds_descoberta']
+    return fontes + trabalho
+
+def forcar_fundamentos(args):
+    # --full-refresh só ignora o cache de balanços no fetch-fundamentals (no all/materialize vale para o gold)
+    return args.command == 'fetch-fundamentals' and args.full_refresh
+
+def estimar_requisicoes(etapas, n_tickers, n_fundos, n_intervalos, n_fundamentos=None):
+    """
+    Estimativa (mínimo, máximo) de requisições externas por etapa. Os máximos vêm dos fallbacks: rendimentos
+    pela página antiga, 4 variantes de ticker por intervalo no Yahoo e balanço anual + info nos fundamentos.
+    n_fundamentos: tickers com balanço vencido no cache (padrão: todos).
+    """
+    n_fundamentos = n_tickers if n_fundamentos is None else n_fundamentos
+    estimativas = {
+        'funds_descoberta': (3, 3),
+        'funds_paginas': (n_fundos, n_fundos * 2),
+        'yahoo': (n_tickers * n_intervalos, n_tickers * n_intervalos * 4),
+        'fundamentos': (n_fundamentos, n_fundamentos * 3),
+    }
+    return {etapa: estimativas.get(etapa, (0, 0)) for etapa in etapas}
+
+def dry_run(args, etapas, alvo, manual_tickers, df_ativos):
+    from src.extract.yahoo_finance import INTERVALOS
+
+    if alvo is not None:
+        lista = alvo
+        n_fundos = len(alvo)
+        origem = "filtros"
+    else:
+        fundos = df_ativos['Ticker'].tolist()
+        lista = list(dict.fromkeys(manual_tickers + fundos))
+        n_fundos = len(fundos)
+        origem = "última descoberta (funds_ativos.csv) + tickers manuais"
+    n_tickers = len(lista)
+    n_intervalos = len(args.intervals or INTERVALOS)
+    n_fundamentos = None
+    if 'fundamentos' in etapas and not forcar_fundamentos(args):
+        from src.extract.historical_indicators import HistoricalIndicatorsExtractor
+        cache = HistoricalIndicatorsExtractor(BRONZE_DIR, cache_path=FUNDAMENTOS_CACHE)
+        n_fundamentos = sum(cache.needs_refresh(t) for t in lista)
+
+    print(f"Comando: {args.command}")
+    print(f"Etapas: {' -> '.join(etapas)}")
+    if ETAPAS_COM_TICKERS & set(etapas):
+        print(f"Tickers: {n_tickers} ({origem})")
+    if alvo is not None:
+        print(f"  {', '.join(alvo[:20])}{' ...' if len(alvo) > 20 else ''}")
+    if 'yahoo' in etapas:
+        print(f"Intervalos do Yahoo: {', '.join(args.intervals or INTERVALOS)}")
+
+    if n_fundamentos is not None:
+        print(f"Fundamentos: {n_fundamentos} de {n_tickers} tickers com balanço vencido no cache")
+
+    estimativas = estimar_requisicoes(etapas, n_tickers, n_fundos, n_intervalos, n_fundamentos)
+    print(f"\n{'etapa':<22} {'requisições (mín - máx)':>26}")
+    for etapa, (minimo, maximo) in estimativas.items():
+        print(f"{etapa:<22} {minimo:>12} - {maximo:<12}")
+    total_min = sum(m for m, _ in estimativas.values())
+    total_max = sum(m for _, m in estimativas.values())
+    print(f"{'total':<22} {total_min:>12} - {total_max:<12}")
+
+def main(args=None):
+    args = args or parse_args()
     load_dotenv()
-    
-    # Configurações de caminhos
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    BRONZE_DIR = os.path.join(BASE_DIR, 'data', 'bronze')
-    INPUT_DIR = os.path.join(BASE_DIR, 'data', 'input')
-    LOG_DIR = os.path.join(BASE_DIR, 'logs')
-    
+
+    manual_tickers = load_manual_tickers(os.path.join(INPUT_DIR, 'possiveis ativos.txt'))
+    df_ativos_conhecidos = _ler_ativos()
+    alvo = resolver_tickers(args, df_ativos_conhecidos)
+    subconjunto = alvo is not None
+    etapas = selecionar_etapas(args.command, subconjunto)
+
+    if args.dry_run:
+        dry_run(args, etapas, alvo, manual_tickers, df_ativos_conhecidos)
+        return
+
     # Setup Logging
     logger = setup_logging(log_dir=LOG_DIR)
-    logger.info("Iniciando processo ETL...")
-    
-    # 1. Funds Explorer Scraper
-    logger.info("=== Iniciando Funds Explorer Scraper ===")
-    try:
-        funds_scraper = FundsExplorerScraper(headless=False)
-        funds_scraper.scrape_all(BRONZE_DIR)
-    except Exception as e:
-        logger.error(f"Erro no Funds Explorer Scraper: {e}", exc_info=True)
-    
-    # Carregar tickers descobertos
+    logger.info(f"Iniciando processo ETL (comando: {args.command}, etapas: {', '.join(etapas)})...")
+    if subconjunto:
+        logger.info(f"Subconjunto de {len(alvo)} tickers: {', '.join(alvo)}")
+        if not alvo:
+            logger.warning("Nenhum ticker corresponde aos filtros informados.")
+    configure_profiling(args.profile, args.profile_dir)
+
+    # Tickers fluem da descoberta para o Yahoo e os fundamentos conforme são encontrados: os manuais entram
+    # de imediato e os do Funds Explorer a cada listagem lida (FIIs, Fiagros, Fiinfras)
     funds_ativos_path = os.path.join(BRONZE_DIR, 'funds_ativos.csv')
-    if os.path.exists(funds_ativos_path):
-        df_funds = pd.read_csv(funds_ativos_path)
-        tickers_funds = df_funds['Ticker'].tolist()
-    else:
-        tickers_funds = []
-        logger.warning(f"Arquivo {funds_ativos_path} não encontrado. Nenhum ticker de FIIs carregado.")
-        
-    # Carregar tickers manuais
-    manual_tickers = load_manual_tickers(os.path.join(INPUT_DIR, 'possiveis ativos.txt'))
-    
-    # Unificar lista de tickers
-    all_tickers = list(set(tickers_funds + manual_tickers))
-    logger.info(f"Total de tickers para processar: {len(all_tickers)}")
-    
-    # Criar DataFrame único para passar para os scrapers
-    df_all_tickers = pd.DataFrame({'Ticker': all_tickers})
-    
-    # 3. Yahoo Finance Scraper
-    logger.info("=== Iniciando Yahoo Finance Scraper ===")
-    try:
-        yahoo_scraper = YahooFinanceScraper()
-        yahoo_scraper.scrape_all(all_tickers, BRONZE_DIR)
-    except Exception as e:
-         logger.error(f"Erro no Yahoo Finance Scraper: {e}", exc_info=True)
-    
-    # 4. Loader (Bronze -> Silver)
-    logger.info("=== Iniciando Carga para Banco de Dados ===")
-    try:
+    produtores = [nome for nome in ('tickers_manuais', 'funds_descoberta', 'tickers_selecionados') if nome in etapas]
+    tickers = TickerStream(producers=max(len(produtores), 1))
+    estado = {}
+    # Execuções parciais trocam só as linhas dos tickers/intervalos buscados nos CSVs do bronze
+    merge = subconjunto
+
+    def publicar_manuais():
+        try:
+            logger.info(f"{len(manual_tickers)} tickers manuais publicados.")
+            tickers.put_many(manual_tickers)
+        finally:
+            tickers.close()
+
+    def descobrir_fundos():
+        from src.extract.funds_explorer import FundsExplorerScraper
+        try:
+            estado['funds_scraper'] = FundsExplorerScraper(headless=False)
+            estado['df_ativos'] = estado['funds_scraper'].discover(BRONZE_DIR, on_found=tickers.put_many)
+        finally:
+            # Se a descoberta falhar, usa a lista da última execução (se houver)
+            if 'df_ativos' not in estado:
+                if os.path.exists(funds_ativos_path):
+                    tickers.put_many(pd.read_csv(funds_ativos_path)['Ticker'].tolist())
+                else:
+                    logger.warning(f"Arquivo {funds_ativos_path} não encontrado. Nenhum ticker de FIIs carregado.")
+            tickers.close()
+
+    def publicar_selecionados():
+        # Sem filtros (ex.: fetch-yahoo), usa a última descoberta + tickers manuais em vez de abrir o navegador
+        try:
+            lista = alvo if subconjunto else manual_tickers + df_ativos_conhecidos['Ticker'].tolist()
+            conhecidos = df_ativos_conhecidos[df_ativos_conhecidos['Ticker'].isin(lista)]
+            if subconjunto:
+                # Tickers fora do funds_ativos.csv são tratados como FII
+                faltantes = [t for t in lista if t not in set(conhecidos['Ticker'])]
+                conhecidos = pd.concat([conhecidos, pd.DataFrame({'Categoria': 'FII', 'Ticker': faltantes})],
+                                       ignore_index=True)
+            estado['df_ativos'] = conhecidos
+            tickers.put_many(lista)
+            logger.info(f"{len(lista)} tickers selecionados publicados.")
+        finally:
+            tickers.close()
+
+    def coletar_paginas_fundos():
+        if 'funds_scraper' not in estado:
+            from src.extract.funds_explorer import FundsExplorerScraper
+            estado['funds_scraper'] = FundsExplorerScraper(headless=False)
+        estado['funds_scraper'].crawl(estado['df_ativos'], BRONZE_DIR, merge=merge)
+
+    def coletar_yahoo():
+        from src.extract.yahoo_finance import YahooFinanceScraper
+        YahooFinanceScraper(args.intervals).scrape_all(tickers, BRONZE_DIR, merge=merge or bool(args.intervals))
+        logger.info(f"Total de tickers processados no Yahoo: {len(tickers)}")
+
+    def coletar_fundamentos():
+        from src.extract.historical_indicators import HistoricalIndicatorsExtractor
+        extractor = HistoricalIndicatorsExtractor(output_dir=BRONZE_DIR, cache_path=FUNDAMENTOS_CACHE,
+                                                  max_workers=int(os.getenv('ETL_FUNDAMENTALS_WORKERS', 4)))
+        extractor.process_tickers(tickers, merge=merge, force=forcar_fundamentos(args))
+
+    def carregar():
+        from src.transform.loader import load_bronze_to_silver
         load_bronze_to_silver(BRONZE_DIR)
-    except Exception as e:
-        logger.error(f"Erro no Loader: {e}", exc_info=True)
-    
+
+    def carregar_oceans14():
+        from src.transform.oceans14 import load_oceans14_to_silver
+        load_oceans14_to_silver(force=args.command == 'load' and args.full_refresh)
+
+    def materializar():
+        from src.transform.gold import load_silver_to_gold
+        load_silver_to_gold(BRONZE_DIR, tickers=alvo, full_refresh=args.full_refresh)
+
+    def atualizar_incrementais():
+        from src.transform.incremental import update_incremental_indicators
+        update_incremental_indicators(BRONZE_DIR, os.path.join(STATE_DIR, 'indicadores_incrementais.json'),
+                                      tickers=alvo)
+
+    def reextrair():
+        from src.extract.reextract import reextract
+        reextract(BRONZE_DIR, tickers=alvo, since=args.since, until=args.until, workers=args.workers,
+                  all_snapshots=args.all_snapshots)
+
+    todas = [
+        Stage('tickers_manuais', publicar_manuais),
+        Stage('funds_descoberta', descobrir_fundos),
+        Stage('tickers_selecionados', publicar_selecionados),
+        Stage('funds_paginas', coletar_paginas_fundos, depends_on=['funds_descoberta', 'tickers_selecionados'], required=True),
+        Stage('yahoo', coletar_yahoo),
+        Stage('fundamentos', coletar_fundamentos),
+        Stage('reextracao', reextrair),
+        # 4. Loader (Bronze -> Silver)
+        Stage('loader', carregar, depends_on=['funds_paginas', 'yahoo', 'fundamentos']),
+        Stage('oceans14', carregar_oceans14),
+        # 5. Materialização (Silver -> Gold)
+        Stage('gold', materializar, depends_on=['loader']),
+        # 6. Indicadores incrementais (médias móveis, banda de P/VP, DY 12M)
+        Stage('incremental', atualizar_incrementais, depends_on=['gold']),
+    ]
+    # Só as etapas do subcomando; dependências fora da seleção são ignoradas
+    stages = [
+        Stage(stage.name, stage.func, [dep for dep in stage.depends_on if dep in etapas], stage.required)
+        for stage in todas if stage.name in etapas
+    ]
+
+    runner = DAGRunner(stages, max_workers=int(os.getenv('ETL_MAX_WORKERS', 4)))
+    runner.run()
+    # Relatório JSON: tempos por etapa + métricas (latência de página, linhas/s por tabela, pico de RSS)
+    runner.write_report(LOG_DIR, extra={'command': args.command, 'tickers': len(tickers),
+                                        'subconjunto': alvo, 'metrics': metrics.report()})
+    # Opcional: arquivo no formato texto do Prometheus (ex.: diretório do textfile collector)
+    if os.getenv('ETL_METRICS_PROM'):
+        metrics.write_prometheus(os.getenv('ETL_METRICS_PROM'))
+    write_profile_report()
+
     logger.info("=== Processo ETL Finalizado ===")
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class Stage:
+    """
+    Etapa do ETL: uma função sem argumentos e os nomes das etapas das quais depende.
+    Com required=True, a falha de uma dependência faz a etapa ser pulada; com False (padrão, igual ao
+    fluxo sequencial antigo) ela roda mesmo assim com o que estiver disponível no bronze.
+    """
+
+    def __init__(self, name, func, depends_on=(), required=False):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.required = required
+
+class TickerStream:
+    """
+    Canal entre etapas: produtores publicam tickers assim que são descobertos e consumidores
+    iteram sobre eles sem esperar a descoberta terminar. Tickers repetidos são descartados.
+    Cada iteração é um consumidor independente (ex.: Yahoo e fundamentos) que recebe todos os tickers,
+    inclusive os publicados antes de ele começar. A iteração termina quando todos os `producers` chamarem close().
+    """
+
+    _FIM = object()
+
+    def __init__(self, producers=1):
+        self._seen = []
+        self._seen_set = set()
+        self._consumers = []
+        self._lock = threading.Lock()
+        self._open_producers = producers
+
+    def put_many(self, tickers):
+        with self._lock:
+            novos = []
+            for ticker in tickers:
+                if ticker and ticker not in self._seen_set:
+                    self._seen_set.add(ticker)
+                    self._seen.append(ticker)
+                    novos.append(ticker)
+            for consumer in self._consumers:
+                for ticker in novos:
+                    consumer.put(ticker)
+        return len(novos)
+
+    def close(self):
+        with self._lock:
+            self._open_producers -= 1
+            if self._open_producers == 0:
+                for consumer in self._consumers:
+                    consumer.put(self._FIM)
+
+    def __iter__(self):
+        # Fila própria do consumidor, já com o que foi publicado até agora
+        consumer = queue.Queue()
+        with self._lock:
+            for ticker in self._seen:
+                consumer.put(ticker)
+            if self._open_producers <= 0:
+                consumer.put(self._FIM)
+            self._consumers.append(consumer)
+        while True:
+            ticker = consumer.get()
+            if ticker is self._FIM:
+                return
+            yield ticker
+
+    def __len__(self):
+        return len(self._seen)
+
+class DAGRunner:
+    """
+    Executa as etapas respeitando as dependências; etapas independentes rodam em paralelo
+    (ThreadPoolExecutor, as etapas do ETL passam a maior parte do tempo em I/O).
+    Etapas prontas são submetidas na ordem da lista: declare produtores de um TickerStream antes dos
+    consumidores, para que um pool pequeno não fique ocupado só com consumidores esperando.
+    """
+
+    def __init__(self, stages, max_workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        self.results = {}
+        self._validate()
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Etapa '{stage.name}' depende de etapa inexistente '{dep}'.")
+        # Detecta ciclos com ordenação topológica
+        pendentes = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        while pendentes:
+            prontas = [name for name, deps in pendentes.items() if not deps]
+            if not prontas:
+                raise ValueError(f"Dependências cíclicas entre as etapas: {sorted(pendentes)}")
+            for name in prontas:
+                del pendentes[name]
+            for deps in pendentes.values():
+                deps.difference_update(prontas)
+
+    def _run_stage(self, stage):
+        started_at = datetime.now()
+        start = time.perf_counter()
+        logger.info(f"=== Iniciando etapa {stage.name} ===")
+        result = {'stage': stage.name, 'depends_on': list(stage.depends_on), 'started_at': started_at.isoformat()}
+        try:
+            stage.func()
+            result['status'] = 'ok'
+        except Exception as e:
+            logger.error(f"Erro na etapa {stage.name}: {e}", exc_info=True)
+            result['status'] = 'error'
+            result['error'] = str(e)
+        result['finished_at'] = datetime.now().isoformat()
+        result['duration_s'] = round(time.perf_counter() - start, 2)
+        logger.info(f"=== Etapa {stage.name} finalizada ({result['status']}, {result['duration_s']}s) ===")
+        return result
+
+    def run(self):
+        start = time.perf_counter()
+        pendentes = dict(self.stages)
+        em_execucao = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='etl') as executor:
+            while pendentes or em_execucao:
+                for name, stage in list(pendentes.items()):
+                    if not all(dep in self.results for dep in stage.depends_on):
+                        continue
+                    del pendentes[name]
+                    falhas = [dep for dep in stage.depends_on if self.results[dep]['status'] != 'ok']
+                    if stage.required and falhas:
+                        logger.warning(f"Etapa {name} pulada: dependências com falha {falhas}.")
+                        self.results[name] = {'stage': name, 'depends_on': list(stage.depends_on),
+                                              'status': 'skipped', 'error': f"dependências com falha: {falhas}"}
+                        continue
+                    em_execucao[executor.submit(self._run_stage, stage)] = name
+
+                if not em_execucao:
+                    # Etapas puladas liberam dependentes: volta a avaliar as pendentes
+                    continue
+                concluidas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for future in concluidas:
+                    name = em_execucao.pop(future)
+                    self.results[name] = future.result()
+
+        self.elapsed = time.perf_counter() - start
+        return self.results
+
+    def report(self):
+        ordem = [name for name in self.stages if name in self.results]
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'total_duration_s': round(getattr(self, 'elapsed', 0.0), 2),
+            'max_workers': self.max_workers,
+            'stages': [self.results[name] for name in ordem],
+        }
+
+    def write_report(self, report_dir, extra=None):
+        """Salva o relatório da execução (tempos por etapa) em report_dir/run_report_<timestamp>.json."""
+        os.makedirs(report_dir, exist_ok=True)
+        report = self.report()
+        if extra:
+            report.update(extra)
+        path = os.path.join(report_dir, f"run_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"Relatório da execução salvo em: {path}")
+        return path
@@ -0,0 +1,175 @@
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import String, DateTime
+from src.utils.db import insert_dataframe, get_db_engine, table_exists, ensure_index, delete_tickers, mark_data_version
+from src.config.logging_config import get_logger
+
+# O cálculo de DY e P/VP vive em analise_de_Indicadores; reutilizamos a mesma calculadora dos dashboards
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from analise_de_Indicadores.calculo_indicadores import IndicadoresCalculator
+
+logger = get_logger(__name__)
+
+# Tabela gold -> colunas da chave (já no formato de clean_column_name)
+GOLD_TABLES = {
+    "gold_dy_mensal": ["ticker", "date"],
+    "gold_pvp_mensal": ["ticker", "date"],
+    "gold_dy_12m": ["ticker", "date"],
+    "gold_snapshot": ["ticker", "date"],
+}
+
+# Guarda a impressão digital dos dados de entrada usada na última materialização de cada ticker
+GOLD_MANIFEST_TABLE = "gold_manifest"
+
+def _ticker_fingerprints(calc):
+    """
+    Calcula uma impressão digital por ticker a partir de todas as fontes usadas no cálculo.
+    Um ticker só é rematerializado quando alguma das suas linhas de entrada muda.
+    """
+    sources = {
+        "rendimentos": calc.df_rendimentos,
+        "yahoo": calc.df_yahoo,
+        "yahoo_hist": calc.df_yahoo_hist,
+        "oceans": calc.df_indicadores_oceans,
+        "indicadores": calc.df_indicadores_atual,
+    }
+    parts = {}
+    for name, df in sources.items():
+        if df.empty or 'Ticker' not in df.columns:
+            continue
+        tickers = df['Ticker'].astype(str).str.replace('.SA', '', regex=False)
+        hashes = pd.util.hash_pandas_object(df, index=False)
+        parts[name] = hashes.groupby(tickers.values).sum()
+
+    if not parts:
+        return pd.Series(dtype=str)
+
+    df_parts = pd.DataFrame(parts).fillna(0).astype('uint64')
+    return df_parts.apply(lambda row: '-'.join(f"{v:x}" for v in row), axis=1)
+
+def _load_manifest(engine):
+    if not table_exists(engine, GOLD_MANIFEST_TABLE):
+        return {}
+    df = pd.read_sql(f"SELECT ticker, fingerprint FROM {GOLD_MANIFEST_TABLE}", engine)
+    return dict(zip(df['ticker'], df['fingerprint']))
+
+def _build_tables(calc, tickers):
+    """Calcula as linhas gold dos tickers em lote (painéis do calculador). Retorna dict tabela -> DataFrame."""
+    tables = {}
+
+    df_dy = calc.get_dy_panel(tickers)
+    if not df_dy.empty:
+        tables["gold_dy_mensal"] = df_dy.drop(columns=['DY_12M'])
+        tables["gold_dy_12m"] = df_dy[['Ticker', 'Date', 'DY_12M']]
+
+    df_pvp = calc.get_pvp_panel('M', tickers)
+    if not df_pvp.empty:
+        tables["gold_pvp_mensal"] = df_pvp
+
+    # Snapshot: último valor conhecido de cada indicador
+    snapshots = []
+    if not df_pvp.empty:
+        last_pvp = df_pvp.groupby('Ticker').tail(1).set_index('Ticker')
+        snapshots.append(last_pvp[['Date', 'Close', 'VP_Used', 'P_VP', 'VP_Source']])
+    if not df_dy.empty:
+        last_dy = df_dy.groupby('Ticker').tail(1).set_index('Ticker')
+        snapshots.append(last_dy[['Date', 'DY_Monthly', 'DY_12M']].rename(columns={'Date': 'Dividend_Date'}))
+    if snapshots:
+        df_snap = pd.concat(snapshots, axis=1)
+        if 'Date' not in df_snap.columns:
+            df_snap['Date'] = df_snap['Dividend_Date']
+        elif 'Dividend_Date' in df_snap.columns:
+            df_snap['Date'] = df_snap[['Date', 'Dividend_Date']].max(axis=1)
+        df_snap.index.name = 'Ticker'
+        tables["gold_snapshot"] = df_snap.reset_index()
+
+    return tables
+
+def load_silver_to_gold(bronze_dir, engine=None, *, tickers=None, full_refresh=False):
+    """
+    Materializa as tabelas gold (DY mensal, P/VP mensal, DY 12M e snapshot por ticker).
+    Por padrão só recalcula os tickers cujos dados de entrada mudaram desde a última execução.
+    """
+    logger.info(f"Iniciando materialização das tabelas gold a partir de {bronze_dir}...")
+    if engine is None:
+        try:
+            engine = get_db_engine()
+        except Exception as e:
+            logger.critical(f"Falha ao conectar ao banco de dados: {e}", exc_info=True)
+            return
+
+    calc = IndicadoresCalculator(data_dir_bronze=bronze_dir)
+    all_fingerprints = _ticker_fingerprints(calc)
+    fingerprints = all_fingerprints
+    if tickers is not None:
+        fingerprints = fingerprints[fingerprints.index.isin(tickers)]
+
+    # Sem manifesto ou sem alguma tabela gold não há base para carga incremental: recria tudo
+    tables_ready = all(table_exists(engine, t) for t in [*GOLD_TABLES, GOLD_MANIFEST_TABLE])
+    rebuild = not tables_ready or (full_refresh and tickers is None)
+    stored = _load_manifest(engine) if tables_ready else {}
+    manifest = {} if full_refresh else stored
+    changed = [t for t, fp in fingerprints.items() if manifest.get(t) != fp]
+
+    # Tickers que saíram das entradas (fundo deslistado, linhas removidas dos CSVs) saem também das tabelas gold.
+    # No rebuild as tabelas são recriadas só com os tickers atuais.
+    removed = [] if rebuild else sorted(set(stored) - set(all_fingerprints.index))
+    if tickers is not None:
+        removed = [t for t in removed if t in set(tickers)]
+    if removed:
+        for table in [*GOLD_TABLES, GOLD_MANIFEST_TABLE]:
+            delete_tickers(engine, table, removed)
+        logger.info(f"Removidos das tabelas gold {len(removed)} tickers que não estão mais nas entradas.")
+
+    if not changed:
+        if removed:
+            mark_data_version(engine, "gold")
+        logger.info("Nenhum ticker com dados alterados. Tabelas gold já estão atualizadas.")
+        return
+
+    logger.info(f"Recalculando {len(changed)} de {len(fingerprints)} tickers (rebuild={rebuild}).")
+
+    results = _build_tables(calc, changed)
+
+    if_exists = "replace" if rebuild else "append"
+    for table, key_columns in GOLD_TABLES.items():
+        if not rebuild:
+            delete_tickers(engine, table, changed)
+        df = results.get(table)
+        if df is not None and not df.empty:
+            insert_dataframe(df, table, engine, if_exists=if_exists, drop_existing=rebuild)
+        elif rebuild:
+            logger.warning(f"Nenhum dado para {table}.")
+            continue
+        ensure_index(engine, table, key_columns, unique=True)
+
+    df_manifest = pd.DataFrame({
+        'ticker': changed,
+        'fingerprint': [fingerprints[t] for t in changed],
+        'refreshed_at': datetime.now(),
+    })
+    if not rebuild:
+        delete_tickers(engine, GOLD_MANIFEST_TABLE, changed)
+    df_manifest.to_sql(
+        GOLD_MANIFEST_TABLE,
+        con=engine,
+        index=False,
+        if_exists=if_exists,
+        dtype={'ticker': String(length=64), 'fingerprint': String(length=255), 'refreshed_at': DateTime()},
+    )
+    ensure_index(engine, GOLD_MANIFEST_TABLE, ["ticker"])
+    mark_data_version(engine, "gold")
+
+    logger.info(f"Materialização concluída ({len(changed)} tickers atualizados).")
+
+if __name__ == "__main__":
+    from src.config.logging_config import setup_logging
+    setup_logging()
+    BRONZE_DIR = os.path.join("stock-market-etl", "data", "bronze")
+    load_silver_to_gold(BRONZE_DIR)
@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import math
+from collections import deque
+from datetime import datetime
+import pandas as pd
+from src.utils.db import insert_dataframe, get_db_engine, mark_data_version
+from src.config.logging_config import get_logger
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from analise_de_Indicadores.calculo_indicadores import IndicadoresCalculator
+
+logger = get_logger(__name__)
+
+INCREMENTAL_TABLE = "gold_indicadores_incrementais"
+
+# Proventos são relidos a partir do início do mês de (último provento - DY_RELEITURA): eventos publicados
+# com atraso, um segundo evento na mesma data-base ou valores corrigidos dentro dessa janela entram no DY 12M
+DY_RELEITURA = pd.Timedelta(days=45)
+
+class RollingWindow:
+    """
+    Janela deslizante de tamanho fixo com soma e soma dos quadrados mantidas a cada push (O(1)).
+    As somas são recalculadas a partir da janela a cada `size` pushes para não acumular erro de ponto flutuante.
+    """
+
+    def __init__(self, size, values=None):
+        self.size = size
+        self.values = deque(values or [], maxlen=size)
+        self._resync()
+
+    def _resync(self):
+        self.total = math.fsum(self.values)
+        self.total_sq = math.fsum(v * v for v in self.values)
+        self._pushes = 0
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._resync()
+
+    def __len__(self):
+        return len(self.values)
+
+    def mean(self, min_periods=None):
+        n = len(self.values)
+        if n == 0 or n < (min_periods or self.size):
+            return None
+        return self.total / n
+
+    def std(self, min_periods=None):
+        """Desvio padrão amostral (ddof=1), igual ao rolling().std() do pandas."""
+        n = len(self.values)
+        if n < max(2, min_periods or self.size):
+            return None
+        var = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self):
+        return list(self.values)
+
+class MonthlySumWindow:
+    """
+    Soma móvel de N meses de calendário (meses sem evento contam como zero), igual ao
+    rolling(12, min_periods=1) sobre o calendário completo usado em get_dy_panel.
+    """
+
+    def __init__(self, months=12, buckets=None):
+        self.months = months
+        # [ordinal_do_mes, soma_do_mes] em ordem crescente de mês
+        self.buckets = deque(buckets or [])
+        self.total = math.fsum(v for _, v in self.buckets)
+
+    def _evict(self, as_of):
+        while self.buckets and self.buckets[0][0] <= as_of - self.months:
+            _, value = self.buckets.popleft()
+            self.total -= value
+
+    def add(self, month, value):
+        if self.buckets and self.buckets[-1][0] == month:
+            self.buckets[-1][1] += value
+        elif self.buckets and self.buckets[-1][0] > month:
+            raise ValueError(f"Mês {month} anterior ao último processado ({self.buckets[-1][0]}).")
+        else:
+            self.buckets.append([month, value])
+        self.total += value
+        self._evict(month)
+
+    def drop_from(self, month):
+        """Descarta os meses a partir de `month`, que serão somados de novo."""
+        while self.buckets and self.buckets[-1][0] >= month:
+            self.buckets.pop()
+        self.total = math.fsum(v for _, v in self.buckets)
+
+    def sum(self, as_of):
+        """Soma dos meses (as_of - N, as_of]; descarta definitivamente os meses que saíram da janela."""
+        self._evict(as_of)
+        return self.total if self.buckets else 0.0
+
+    def to_dict(self):
+        return [list(b) for b in self.buckets]
+
+def _month_ordinal(ts):
+    return ts.year * 12 + ts.month - 1
+
+class TickerState:
+    """Estado incremental de um ticker: janelas de preço, de P/VP e de DY mensal."""
+
+    def __init__(self, ma_windows, pvp_window, data=None):
+        data = data or {}
+        self.last_price_date = pd.Timestamp(data['last_price_date']) if data.get('last_price_date') else None
+        self.last_dividend_date = pd.Timestamp(data['last_dividend_date']) if data.get('last_dividend_date') else None
+        self.last_close = data.get('last_close')
+        self.last_pvp = data.get('last_pvp')
+        self.last_vp_source = data.get('last_vp_source')
+        self.closes = {w: RollingWindow(w, data.get('closes', {}).get(str(w))) for w in ma_windows}
+        self.pvp = RollingWindow(pvp_window, data.get('pvp'))
+        self.dy = MonthlySumWindow(12, data.get('dy'))
+
+    def push_price(self, date, close, pvp, vp_source):
+        # O P/VP entra na janela com o VP vigente no momento do push (ver IncrementalIndicatorEngine)
+        for window in self.closes.values():
+            window.push(close)
+        if pvp is not None and not pd.isna(pvp):
+            self.pvp.push(float(pvp))
+            self.last_pvp = float(pvp)
+        self.last_close = float(close)
+        self.last_vp_source = vp_source
+        self.last_price_date = date
+
+    def push_dividends(self, dates, dy_monthly, since=None):
+        """
+        Soma os proventos (em ordem de data) aos meses da janela de DY. Com since (início do mês relido),
+        os meses a partir dele são recalculados só com os proventos recebidos, sem contar duas vezes os já vistos.
+        """
+        if since is not None:
+            self.dy.drop_from(_month_ordinal(since))
+        for date, value in zip(dates, dy_monthly):
+            self.dy.add(_month_ordinal(date), float(value))
+            if self.last_dividend_date is None or date > self.last_dividend_date:
+                self.last_dividend_date = date
+
+    def to_dict(self):
+        return {
+            'last_price_date': self.last_price_date.isoformat() if self.last_price_date is not None else None,
+            'last_dividend_date': self.last_dividend_date.isoformat() if self.last_dividend_date is not None else None,
+            'last_close': self.last_close,
+            'last_pvp': self.last_pvp,
+            'last_vp_source': self.last_vp_source,
+            'closes': {str(w): window.to_dict() for w, window in self.closes.items()},
+            'pvp': self.pvp.to_dict(),
+            'dy': self.dy.to_dict(),
+        }
+
+class IncrementalIndicatorEngine:
+    """
+    Mantém, por ticker, médias móveis de preço, banda de P/VP (média ± k desvios) e DY 12M
+    a partir de janelas persistidas em JSON. Cada execução processa apenas pregões posteriores aos já
+    vistos e relê os proventos dos meses recentes (DY_RELEITURA), em vez de recalcular o histórico completo.
+    Limitação: um VP publicado depois, com data anterior ao último pregão processado, só vale para os
+    pregões seguintes; os P/VP que já entraram na janela com o VP antigo não são corrigidos (o recálculo
+    completo aplica o VP novo via merge_asof). Apague o arquivo de estado para reconstruir a janela.
+    """
+
+    def __init__(self, state_path, ma_windows=(20, 50, 200), pvp_window=252, pvp_min_periods=20, pvp_band_k=2.0):
+        self.state_path = state_path
+        self.ma_windows = tuple(ma_windows)
+        self.pvp_window = pvp_window
+        self.pvp_min_periods = pvp_min_periods
+        self.pvp_band_k = pvp_band_k
+        self.states = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+
+        config = payload.get('config', {})
+        if tuple(config.get('ma_windows', ())) != self.ma_windows or config.get('pvp_window') != self.pvp_window:
+            logger.warning("Configuração das janelas mudou; estado incremental será reconstruído do zero.")
+            return
+
+        self.states = {
+            ticker: TickerState(self.ma_windows, self.pvp_window, data)
+            for ticker, data in payload.get('tickers', {}).items()
+        }
+        logger.info(f"Estado incremental carregado: {len(self.states)} tickers.")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        payload = {
+            'config': {'ma_windows': list(self.ma_windows), 'pvp_window': self.pvp_window},
+            'saved_at': datetime.now().isoformat(),
+            'tickers': {ticker: state.to_dict() for ticker, state in self.states.items()},
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _state(self, ticker):
+        if ticker not in self.states:
+            self.states[ticker] = TickerState(self.ma_windows, self.pvp_window)
+        return self.states[ticker]
+
+    def update(self, calc, tickers=None):
+        """
+        Alimenta as janelas com os pregões e proventos novos do calculador.
+        tickers=None atualiza todo o universo. Retorna o número de linhas processadas.
+        """
+        since_price = {t: s.last_price_date for t, s in self.states.items() if s.last_price_date is not None}
+        releitura = {t: (s.last_dividend_date - DY_RELEITURA).to_period('M').to_timestamp()
+                     for t, s in self.states.items() if s.last_dividend_date is not None}
+
+        df_pvp = calc.get_pvp_panel('D', tickers, since=since_price)
+        # _filter_since é estrito (>): 1ns antes do início do mês inclui os proventos do primeiro dia
+        df_div = calc.get_dividend_events(tickers, since={t: d - pd.Timedelta(1, 'ns') for t, d in releitura.items()})
+
+        processed = 0
+        if not df_pvp.empty:
+            # Só as últimas max(janela) observações de cada ticker influenciam o estado final
+            keep = max(max(self.ma_windows), self.pvp_window)
+            df_pvp = df_pvp.groupby('Ticker', sort=False).tail(keep)
+            for row in df_pvp.itertuples(index=False):
+                self._state(row.Ticker).push_price(row.Date, row.Close, row.P_VP, row.VP_Source)
+            processed += len(df_pvp)
+
+        if not df_div.empty and 'DY_Monthly' in df_div.columns:
+            df_div = df_div.dropna(subset=['DY_Monthly'])
+            for ticker, grupo in df_div.groupby('Ticker', sort=False):
+                self._state(ticker).push_dividends(grupo['Date'], grupo['DY_Monthly'], since=releitura.get(ticker))
+            processed += len(df_div)
+
+        logger.info(f"Indicadores incrementais atualizados ({processed} linhas novas).")
+        return processed
+
+    def snapshot(self):
+        """Valores atuais de todos os tickers: uma linha por ticker."""
+        rows = []
+        for ticker, state in self.states.items():
+            row = {
+                'Ticker': ticker,
+                'Date': state.last_price_date,
+                'Close': state.last_close,
+                'P_VP': state.last_pvp,
+                'VP_Source': state.last_vp_source,
+                'Last_Dividend_Date': state.last_dividend_date,
+            }
+            for w, window in state.closes.items():
+                row[f'MM_{w}'] = window.mean()
+
+            pvp_mean = state.pvp.mean(self.pvp_min_periods)
+            pvp_std = state.pvp.std(self.pvp_min_periods)
+            row['PVP_Media'] = pvp_mean
+            row['PVP_Banda_Inf'] = pvp_mean - self.pvp_band_k * pvp_std if pvp_std is not None else None
+            row['PVP_Banda_Sup'] = pvp_mean + self.pvp_band_k * pvp_std if pvp_std is not None else None
+
+            # DY 12M no mês do último pregão (ou do último provento, se não houver preço)
+            ref_date = state.last_price_date or state.last_dividend_date
+            row['DY_12M'] = state.dy.sum(_month_ordinal(ref_date)) if state.last_dividend_date is not None else None
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+def update_incremental_indicators(bronze_dir, state_path, engine=None, *, tickers=None):
+    """Etapa do ETL: atualiza o estado incremental e publica o snapshot em gold_indicadores_incrementais."""
+    logger.info("Iniciando atualização incremental de indicadores...")
+    calc = IndicadoresCalculator(data_dir_bronze=bronze_dir)
+    motor = IncrementalIndicatorEngine(state_path)
+    motor.update(calc, tickers)
+    motor.save()
+
+    df = motor.snapshot()
+    if df.empty:
+        logger.warning("Nenhum indicador incremental calculado.")
+        return
+
+    if engine is None:
+        engine = get_db_engine()
+    insert_dataframe(df, INCREMENTAL_TABLE, engine)
+    mark_data_version(engine, "incremental")
+
+if __name__ == "__main__":
+    from src.config.logging_config import setup_logging
+    setup_logging()
+    BRONZE_DIR = os.path.join("stock-market-etl", "data", "bronze")
+    STATE_PATH = os.path.join("stock-market-etl", "data", "state", "indicadores_incrementais.json")
+    update_incremental_indicators(BRONZE_DIR, STATE_PATH)
@@ -1,6 +1,8 @@
 import os
+import time
 import pandas as pd
-from src.utils.db import insert_dataframe, get_db_engine
+from src.utils.db import insert_dataframe, get_db_engine, mark_data_version, ensure_index, table_exists, delete_ticker_range
+from src.utils.metrics import metrics
 from src.config.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -20,6 +22,14 @@ CSV_TO_TABLE_MAP = {
     "yahoo_cotacoes": "cotacoes_historico"
 }
 
+# Índices recriados após cada carga (as tabelas são recriadas por insert_dataframe).
+# Os dashboards filtram por ticker nessas tabelas.
+TABLE_INDEXES = {
+    "funds_ativos": [["ticker"]],
+    "funds_rendimentos": [["ticker"]],
+    "cotacoes_historico": [["ticker", "intervalo"]],
+}
+
 def load_bronze_to_silver(bronze_dir):
     logger.info(f"Iniciando carga de {bronze_dir} para o banco de dados...")
     try:
@@ -41,27 +51,48 @@ def load_bronze_to_silver(bronze_dir):
                 filepath = os.path.join(bronze_dir, filename)
                 try:
                     logger.info(f"Processando arquivo: {filename} -> Tabela: {table_name}")
+                    start = time.perf_counter()
                     try:
                         df = pd.read_csv(filepath)
                     except UnicodeDecodeError:
                          logger.warning(f"Encoding padrão falhou para {filename}, tentando latin1")
                          df = pd.read_csv(filepath, encoding='latin1')
+                    metrics.rows('csv_read', len(df), time.perf_counter() - start, table=table_name)
                     
                     # Special handling for appending history instead of replacing
                     if table_name == "funds_indicadores_diarios":
-                        # HISTÓRICO: append (não dropa tabela)
+                        # HISTÓRICO: append (não dropa tabela). As linhas já gravadas dos mesmos tickers no
+                        # intervalo do CSV são trocadas, para que recargas e a re-extração não dupliquem o histórico
+                        if not df.empty and table_exists(engine, table_name):
+                            ts = df['timestamp'].astype(str)
+                            delete_ticker_range(engine, table_name, df['Ticker'].unique().tolist(),
+                                                'timestamp', ts.min(), ts.max())
                         insert_dataframe(df, table_name, engine, if_exists="append", drop_existing=False)
                     else:
                         insert_dataframe(df, table_name, engine)
+
+                    with metrics.timer('ensure_index_seconds', table=table_name):
+                        for columns in TABLE_INDEXES.get(table_name, []):
+                            ensure_index(engine, table_name, columns)
                 except Exception as e:
+                    metrics.inc('load_errors', table=table_name)
                     logger.error(f"Erro ao carregar {filename}: {e}", exc_info=True)
             else:
                 logger.debug(f"Arquivo {filename} ignorado (sem mapeamento definido).")
-                
+
+    # Sinaliza aos dashboards que os dados mudaram (invalida os caches de consulta)
+    mark_data_version(engine, "loader")
     logger.info("Carga concluída.")
 
 if __name__ == "__main__":
+    import argparse
     from src.config.logging_config import setup_logging
+    from src.utils.profiling import add_profile_arguments, configure_profiling, write_profile_report
+    parser = argparse.ArgumentParser(description="Carga bronze -> silver.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
     setup_logging()
+    configure_profiling(args.profile, args.profile_dir)
     BRONZE_DIR = os.path.join("stock-market-etl", "data", "bronze")
     load_bronze_to_silver(BRONZE_DIR)
+    write_profile_report()
@@ -0,0 +1,197 @@
+import os
+import re
+import sys
+import hashlib
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import String, Integer, DateTime
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.db import insert_dataframe, get_db_engine, table_exists, ensure_index, delete_tickers, clean_column_name, mark_data_version
+from src.utils.metrics import metrics
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Mesmo diretório que a IndicadoresCalculator lê (dados/oceans14_output_csvs na raiz do projeto)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+OCEANS14_DIR = os.getenv('OCEANS14_DIR', os.path.join(PROJECT_ROOT, 'dados', 'oceans14_output_csvs'))
+
+# Arquivo (sem extensão) -> tabela, coluna do período e colunas que continuam texto (as demais são numéricas).
+# Balanco/Indicadores/Lucratividade têm uma linha por (ticker, período); cri/fiis/imoveis são listas de
+# posições por (ticker, ano), numeradas em "item" dentro de cada ano.
+OCEANS14_FILES = {
+    "Balanco": {"table": "oceans14_balanco", "periodo": "Periodo", "texto": []},
+    "Indicadores": {"table": "oceans14_indicadores", "periodo": "Trimestre", "texto": []},
+    "Lucratividade": {"table": "oceans14_lucratividade", "periodo": "Trimestre", "texto": []},
+    "cri": {"table": "oceans14_cri", "periodo": "Ano", "texto": ["Nome", "CNPJ", "Emissão", "Série"]},
+    "fiis": {"table": "oceans14_fiis", "periodo": "Ano", "texto": ["Papel", "Nome do fundo", "CNPJ"]},
+    "imoveis": {"table": "oceans14_imoveis", "periodo": "Ano",
+                "texto": ["Nome", "Endereço", "Papel", "Nome do fundo", "CNPJ", "Emissão", "Série"]},
+}
+
+# sha256 de cada arquivo na última carga: arquivos sem mudança não são relidos
+OCEANS14_MANIFEST_TABLE = "oceans14_manifest"
+
+_MULTIPLICADORES = {'K': 1e3, 'M': 1e6, 'B': 1e9}
+
+def parse_br_number(series):
+    """
+    Converte textos numéricos da Oceans14 (pt-BR) em float: "8.227" -> 8227, "1,03" -> 1.03,
+    "231,07 M" -> 231070000, "0,43%" -> 0.43 (pontos percentuais) e "69.697,51 m2" -> 69697.51.
+    Valores que não são números viram NaN.
+    """
+    s = series.astype(str).str.strip()
+    s = s.str.replace(r'\s*(%|m2|m²)$', '', regex=True)
+    multiplicador = s.str.extract(r'\s*([KMB])$', expand=False).map(_MULTIPLICADORES).fillna(1.0)
+    s = s.str.replace(r'\s*[KMB]$', '', regex=True)
+    s = s.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(s, errors='coerce') * multiplicador
+
+def parse_periodo(series):
+    """
+    Data de referência do período: "M/AAAA" (balanço mensal) -> último dia do mês, "1T2023" -> fim do
+    trimestre (mesma convenção da IndicadoresCalculator) e "AAAA" (fechamento anual) -> 31/12.
+    Períodos fora desses formatos (ex.: "Hoje") viram NaT.
+    """
+    s = series.astype(str).str.strip()
+    partes = s.str.extract(r'^(?:(?P<mes>\d{1,2})/|(?P<trimestre>[1-4])T)?(?P<ano>\d{4})$')
+    mes = pd.to_numeric(partes['mes'], errors='coerce')
+    mes = mes.fillna(pd.to_numeric(partes['trimestre'], errors='coerce') * 3).fillna(12)
+    ano = pd.to_numeric(partes['ano'], errors='coerce')
+
+    inicio = pd.to_datetime(pd.DataFrame({'year': ano, 'month': mes.where(mes.between(1, 12)), 'day': 1}),
+                            errors='coerce')
+    return inicio + pd.offsets.MonthEnd(0)
+
+def _nome_coluna(column):
+    # "% despesas" -> pct_despesas, "P/VP" -> p_vp, "Núm. unidades" -> num_unidades
+    nome = clean_column_name(column.replace('%', 'pct ').replace('/', ' '))
+    return re.sub(r'_+', '_', nome).strip('_')
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+def prepare_oceans14(path, spec):
+    """Lê um CSV da Oceans14 e devolve o DataFrame tipado da tabela silver e as colunas da chave."""
+    # dtype=str: sem isso o pandas lê "235.059" como 235.059 em vez de 235059
+    df = pd.read_csv(path, dtype=str)
+    periodo = spec["periodo"]
+    texto = set(spec["texto"])
+
+    df = df.dropna(subset=['Ticker', periodo])
+    df['Ticker'] = df['Ticker'].str.strip().str.upper()
+    for col in df.columns:
+        if col not in texto and col not in ('Ticker', periodo):
+            df[col] = parse_br_number(df[col])
+
+    if periodo == "Ano":
+        df[periodo] = pd.to_numeric(df[periodo], errors='coerce')
+        df = df.dropna(subset=[periodo]).astype({periodo: 'int64'})
+        # A fonte repete linhas idênticas; o que sobra é numerado dentro de (ticker, ano) na ordem do arquivo
+        df = df.drop_duplicates()
+        df['item'] = df.groupby(['Ticker', periodo]).cumcount() + 1
+        df['data_referencia'] = pd.to_datetime(df[periodo].astype(str) + '-12-31')
+        chave = ['Ticker', periodo, 'item']
+    else:
+        df['data_referencia'] = parse_periodo(df[periodo])
+        invalidos = df['data_referencia'].isna()
+        if invalidos.any():
+            logger.warning(f"{os.path.basename(path)}: {int(invalidos.sum())} linhas com período não reconhecido "
+                           f"ignoradas ({', '.join(sorted(df.loc[invalidos, periodo].unique())[:5])}).")
+            df = df[~invalidos]
+        chave = ['Ticker', periodo]
+        duplicados = df.duplicated(subset=chave, keep='last')
+        if duplicados.any():
+            logger.warning(f"{os.path.basename(path)}: {int(duplicados.sum())} linhas repetidas em (ticker, período); "
+                           f"mantida a última.")
+            df = df[~duplicados]
+
+    df = df.rename(columns=_nome_coluna)
+    return df.reset_index(drop=True), [_nome_coluna(c) for c in chave]
+
+def _load_manifest(engine):
+    if not table_exists(engine, OCEANS14_MANIFEST_TABLE):
+        return {}
+    df = pd.read_sql(f"SELECT arquivo, sha256 FROM {OCEANS14_MANIFEST_TABLE}", engine)
+    return dict(zip(df['arquivo'], df['sha256']))
+
+def _save_manifest(engine, registros):
+    df = pd.DataFrame(registros, columns=['arquivo', 'tabela', 'sha256', 'linhas', 'carregado_em'])
+    if table_exists(engine, OCEANS14_MANIFEST_TABLE):
+        delete_tickers(engine, OCEANS14_MANIFEST_TABLE, df['arquivo'], ticker_column="arquivo")
+    df.to_sql(
+        OCEANS14_MANIFEST_TABLE,
+        con=engine,
+        index=False,
+        if_exists="append",
+        dtype={'arquivo': String(length=64), 'tabela': String(length=64), 'sha256': String(length=64),
+               'linhas': Integer(), 'carregado_em': DateTime()},
+    )
+    ensure_index(engine, OCEANS14_MANIFEST_TABLE, ["arquivo"], unique=True)
+
+def load_oceans14_to_silver(oceans_dir=OCEANS14_DIR, engine=None, *, force=False):
+    """
+    Carrega os CSVs da Oceans14 nas tabelas oceans14_* com valores numéricos, data de referência do período
+    e índice único na chave (ticker, período). Só recarrega os arquivos cujo sha256 mudou desde a última
+    carga (force=True recarrega todos). Retorna {tabela: registros} das tabelas carregadas.
+    """
+    if not os.path.isdir(oceans_dir):
+        logger.warning(f"Diretório da Oceans14 não encontrado: {oceans_dir}")
+        return {}
+    if engine is None:
+        try:
+            engine = get_db_engine()
+        except Exception as e:
+            logger.critical(f"Falha ao conectar ao banco de dados: {e}", exc_info=True)
+            return {}
+
+    manifest = {} if force else _load_manifest(engine)
+    carregadas = {}
+    registros = []
+    for file_key, spec in OCEANS14_FILES.items():
+        path = os.path.join(oceans_dir, f"{file_key}.csv")
+        if not os.path.exists(path):
+            logger.debug(f"{file_key}.csv não encontrado em {oceans_dir}.")
+            continue
+
+        table = spec["table"]
+        sha256 = _file_sha256(path)
+        if manifest.get(file_key) == sha256 and table_exists(engine, table):
+            logger.info(f"{file_key}.csv sem alterações desde a última carga; {table} mantida.")
+            continue
+
+        try:
+            with metrics.timer('oceans14_prepare_seconds', table=table):
+                df, chave = prepare_oceans14(path, spec)
+            insert_dataframe(df, table, engine)
+            ensure_index(engine, table, chave, unique=True)
+            ensure_index(engine, table, ["ticker", "data_referencia"])
+        except Exception as e:
+            metrics.inc('load_errors', table=table)
+            logger.error(f"Erro ao carregar {file_key}.csv: {e}", exc_info=True)
+            continue
+        carregadas[table] = len(df)
+        registros.append((file_key, table, sha256, len(df), datetime.now()))
+
+    if registros:
+        _save_manifest(engine, registros)
+        mark_data_version(engine, "oceans14")
+    logger.info(f"Oceans14: {len(carregadas)} tabelas carregadas ({', '.join(carregadas) or 'nenhum arquivo alterado'}).")
+    return carregadas
+
+if __name__ == "__main__":
+    import argparse
+    from src.config.logging_config import setup_logging
+    parser = argparse.ArgumentParser(description="Carga dos CSVs da Oceans14 -> silver.")
+    parser.add_argument('--dir', default=OCEANS14_DIR, help="Diretório com os CSVs da Oceans14")
+    parser.add_argument('--force', action='store_true', help="Recarrega todos os arquivos, ignorando o manifesto")
+    args = parser.parse_args()
+    setup_logging()
+    load_oceans14_to_silver(args.dir, force=args.force)
@@ -0,0 +1,33 @@
+import os
+import pandas as pd
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+def write_bronze_csv(df, path, *, tickers=None, ticker_column="Ticker", replace_where=None):
+    """
+    Grava um CSV do bronze. Sem tickers, substitui o arquivo (execução completa). Com tickers (execução
+    parcial, ex.: `main.py crawl-funds --tickers XPML11`), troca apenas as linhas desses tickers e mantém
+    as demais, para que atualizar um ativo não apague o resto do universo.
+    replace_where ({coluna: valores}) restringe ainda mais as linhas trocadas (ex.: só os intervalos
+    do Yahoo que foram buscados).
+    """
+    if tickers is None or not os.path.exists(path):
+        df.to_csv(path, index=False)
+        return len(df)
+
+    try:
+        existing = pd.read_csv(path)
+    except pd.errors.EmptyDataError:
+        existing = pd.DataFrame()
+
+    if ticker_column in existing.columns:
+        substituir = existing[ticker_column].isin(set(tickers))
+        for column, values in (replace_where or {}).items():
+            if column in existing.columns:
+                substituir &= existing[column].isin(set(values))
+        existing = existing[~substituir]
+    merged = pd.concat([existing, df], ignore_index=True) if not df.empty else existing
+    merged.to_csv(path, index=False)
+    logger.debug(f"{path}: {len(df)} registros de {len(set(tickers))} tickers mesclados ({len(merged)} no total).")
+    return len(merged)
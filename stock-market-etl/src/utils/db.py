@@ -1,12 +1,15 @@
 import pandas as pd
-from sqlalchemy import create_engine, Integer, Float, String, DateTime, text, Double
+from sqlalchemy import create_engine, Integer, Float, String, DateTime, text, Double, inspect, bindparam
 from sqlalchemy.types import DECIMAL
 from datetime import datetime
 import unicodedata
 import re
 import os
+import time
 import numpy as np
 from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+from src.utils.profiling import profiled
 
 logger = get_logger(__name__)
 
@@ -59,10 +62,12 @@ def clean_column_name(column_name):
     column_name = column_name.lower()
     return column_name
 
+@profiled('db.insert_dataframe')
 def insert_dataframe(df, table_name, engine=None, *, if_exists: str = "replace", drop_existing: bool = True):
     if engine is None:
         engine = get_db_engine()
 
+    start = time.perf_counter()
     try:
         initial_count = len(df)
         # Remover duplicados
@@ -101,7 +106,7 @@ def insert_dataframe(df, table_name, engine=None, *, if_exists: str = "replace",
             elif df[col].dtype == 'float64':
                 # Usar Double ou Float em vez de DECIMAL fixo para evitar "Out of range" em valores com muitos decimais
                 dtype_mapping[col] = Double() 
-            elif df[col].dtype == 'datetime64[ns]':
+            elif pd.api.types.is_datetime64_any_dtype(df[col]):
                 dtype_mapping[col] = DateTime()
             else:
                 # Definir um comprimento padrão para VARCHAR
@@ -116,8 +121,11 @@ def insert_dataframe(df, table_name, engine=None, *, if_exists: str = "replace",
                 else:
                     dtype_mapping[col] = String(length=final_length)
 
+        metrics.observe('insert_prepare_seconds', time.perf_counter() - start, table=table_name)
+
         # Inserir DataFrame na tabela, recriando-a
         # chunksize ajuda em grandes volumes
+        to_sql_start = time.perf_counter()
         df.to_sql(
             table_name,
             con=engine,
@@ -126,7 +134,71 @@ def insert_dataframe(df, table_name, engine=None, *, if_exists: str = "replace",
             dtype=dtype_mapping,
             chunksize=5000,
         )
+        metrics.rows('to_sql', len(df), time.perf_counter() - to_sql_start, table=table_name)
+        metrics.rows('insert_dataframe', len(df), time.perf_counter() - start, table=table_name)
         logger.info(f"Tabela {table_name} atualizada com sucesso ({len(df)} registros inseridos, if_exists={if_exists}).")
     except Exception as e:
+        metrics.inc('insert_errors', table=table_name)
         logger.error(f"Erro ao inserir dados na tabela {table_name}: {e}", exc_info=True)
         raise
+
+def table_exists(engine, table_name):
+    return inspect(engine).has_table(table_name)
+
+def ensure_index(engine, table_name, columns, *, unique=False, index_name=None):
+    """
+    Cria um índice em (columns) se ainda não existir.
+    Verifica via inspector porque MySQL não aceita CREATE INDEX IF NOT EXISTS.
+    """
+    index_name = index_name or f"ix_{table_name}_{'_'.join(columns)}"
+    existing = {ix['name'] for ix in inspect(engine).get_indexes(table_name)}
+    if index_name in existing:
+        return
+
+    unique_sql = "UNIQUE " if unique else ""
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE {unique_sql}INDEX {index_name} ON {table_name} ({', '.join(columns)})"))
+    logger.info(f"Índice {index_name} criado em {table_name} ({', '.join(columns)}).")
+
+def delete_tickers(engine, table_name, tickers, *, ticker_column="ticker", chunk_size=500):
+    """Remove de table_name todas as linhas dos tickers informados (usado nas cargas incrementais)."""
+    tickers = list(tickers)
+    stmt = text(f"DELETE FROM {table_name} WHERE {ticker_column} IN :tickers").bindparams(
+        bindparam("tickers", expanding=True)
+    )
+    deleted = 0
+    with engine.begin() as connection:
+        for start in range(0, len(tickers), chunk_size):
+            result = connection.execute(stmt, {"tickers": tickers[start:start + chunk_size]})
+            deleted += result.rowcount or 0
+    logger.debug(f"Removidos {deleted} registros de {table_name} para {len(tickers)} tickers.")
+    return deleted
+
+def delete_ticker_range(engine, table_name, tickers, column, start, end, *, ticker_column="ticker", chunk_size=500):
+    """Remove as linhas dos tickers com `column` entre start e end (inclusive). Usado para regravar um trecho de histórico."""
+    tickers = list(tickers)
+    stmt = text(
+        f"DELETE FROM {table_name} WHERE {ticker_column} IN :tickers AND {column} >= :start AND {column} <= :end"
+    ).bindparams(bindparam("tickers", expanding=True))
+    deleted = 0
+    with engine.begin() as connection:
+        for offset in range(0, len(tickers), chunk_size):
+            result = connection.execute(stmt, {"tickers": tickers[offset:offset + chunk_size], "start": start, "end": end})
+            deleted += result.rowcount or 0
+    logger.debug(f"Removidos {deleted} registros de {table_name} entre {start} e {end} para {len(tickers)} tickers.")
+    return deleted
+
+# Tabela de uma linha com a versão dos dados; os dashboards invalidam seus caches quando ela muda
+DATA_VERSION_TABLE = "etl_data_version"
+
+def mark_data_version(engine, source="etl"):
+    """Registra que uma carga terminou (chamado ao fim do loader e das materializações)."""
+    df = pd.DataFrame({"version": [datetime.now()], "source": [source]})
+    df.to_sql(
+        DATA_VERSION_TABLE,
+        con=engine,
+        index=False,
+        if_exists="replace",
+        dtype={"version": DateTime(), "source": String(length=64)},
+    )
+    logger.debug(f"Versão dos dados atualizada ({source}).")
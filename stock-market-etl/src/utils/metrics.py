@@ -0,0 +1,174 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from src.config.logging_config import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de memória fica de fora do relatório
+    resource = None
+
+logger = get_logger(__name__)
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+class MetricsRegistry:
+    """
+    Métricas de uma execução do ETL: contadores, histogramas (valores brutos, resumidos em p50/p95)
+    e vazão de linhas por tabela. Thread-safe, pois as etapas do DAG rodam em paralelo.
+    Labels devem ter baixa cardinalidade (tabela, endpoint, intervalo), nunca o ticker.
+    """
+
+    def __init__(self, prefix='etl'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._rows = set()
+        self.started_at = datetime.now()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.histograms.setdefault(key, []).append(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Mede a duração do bloco (segundos) no histograma `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def rows(self, name, rows, seconds, **labels):
+        """Registra `rows` linhas processadas em `seconds`; o relatório calcula linhas/s por label."""
+        self.inc(f"{name}_rows", rows, **labels)
+        self.observe(f"{name}_seconds", seconds, **labels)
+        with self._lock:
+            self._rows.add(name)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self._rows.clear()
+            self.started_at = datetime.now()
+
+    @staticmethod
+    def peak_rss_mb():
+        if resource is None:
+            return None
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+
+    @staticmethod
+    def _summary(values):
+        arr = np.asarray(values, dtype=float)
+        return {
+            'count': int(arr.size),
+            'sum': round(float(arr.sum()), 4),
+            'p50': round(float(np.percentile(arr, 50)), 4),
+            'p95': round(float(np.percentile(arr, 95)), 4),
+            'max': round(float(arr.max()), 4),
+        }
+
+    def report(self):
+        """Resumo da execução em formato serializável (entra no run_report do DAG)."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: list(values) for key, values in self.histograms.items()}
+            rows_names = set(self._rows)
+
+        throughput = []
+        for name in sorted(rows_names):
+            for (hist_name, labels), values in histograms.items():
+                if hist_name != f"{name}_seconds":
+                    continue
+                total_rows = counters.get((f"{name}_rows", labels), 0)
+                total_s = sum(values)
+                throughput.append({
+                    'metric': name, **dict(labels), 'rows': total_rows,
+                    'seconds': round(total_s, 3),
+                    'rows_per_sec': round(total_rows / total_s, 1) if total_s > 0 else None,
+                })
+
+        return {
+            'started_at': self.started_at.isoformat(),
+            'peak_rss_mb': self.peak_rss_mb(),
+            'counters': [{'metric': name, **dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items())],
+            'histograms': [{'metric': name, **dict(labels), **self._summary(values)}
+                           for (name, labels), values in sorted(histograms.items())],
+            'throughput': throughput,
+        }
+
+    def to_prometheus(self):
+        """Formato texto do Prometheus (para o textfile collector do node_exporter)."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: list(values) for key, values in self.histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for name in sorted({name for name, _ in histograms}):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for (n, labels), values in sorted(histograms.items()):
+                if n != name:
+                    continue
+                summary = self._summary(values)
+                for quantile in ('p50', 'p95'):
+                    q = '0.5' if quantile == 'p50' else '0.95'
+                    lines.append(f"{metric}{_format_labels(labels, {'quantile': q})} {summary[quantile]}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {summary['sum']}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {summary['count']}")
+
+        peak = self.peak_rss_mb()
+        if peak is not None:
+            lines.append(f"# TYPE {self.prefix}_peak_rss_bytes gauge")
+            lines.append(f"{self.prefix}_peak_rss_bytes {int(peak * 1024 * 1024)}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    def write_prometheus(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Escreve em arquivo temporário e renomeia: o collector nunca lê um arquivo pela metade
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        logger.info(f"Métricas Prometheus salvas em: {path}")
+        return path
+
+# Registro único do processo, usado por scrapers, loader e insert_dataframe
+metrics = MetricsRegistry()
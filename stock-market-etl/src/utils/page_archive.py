@@ -0,0 +1,247 @@
+import os
+import re
+import sys
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:  # Sem zstandard as páginas novas são gravadas com zlib (as já gravadas em zstd exigem o pacote)
+    zstandard = None
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+SEGMENT_MAX_BYTES = int(os.getenv('PAGE_ARCHIVE_SEGMENT_MB', 256)) * 1024 * 1024
+ZSTD_LEVEL = int(os.getenv('PAGE_ARCHIVE_ZSTD_LEVEL', 10))
+ZLIB_LEVEL = 9
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+# Cabeçalho de cada registro no segmento: magic, codec, tamanho comprimido e sha256 do HTML original.
+# Permite validar o conteúdo na leitura e percorrer um segmento sem o índice.
+_MAGIC = b'FXP1'
+_HEADER_SIZE = len(_MAGIC) + 1 + 4 + 32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    content_hash TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    codec INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    url TEXT,
+    fetched_at TEXT NOT NULL,
+    content_hash TEXT NOT NULL REFERENCES blobs(content_hash)
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_ticker ON snapshots (ticker, fetched_at);
+CREATE INDEX IF NOT EXISTS ix_snapshots_fetched_at ON snapshots (fetched_at);
+"""
+
+class PageArchive:
+    """
+    Arquivo de páginas HTML endereçado por conteúdo (sha256). Cada conteúdo distinto é comprimido (zstd,
+    ou zlib sem o pacote zstandard) e gravado uma única vez, em segmentos grandes só de acréscimo
+    (segment_000001.pack, ...); o índice SQLite guarda onde está cada conteúdo e cada captura
+    (ticker, endpoint, url, fetched_at -> content_hash). Um escritor por arquivo; leitores podem ser vários.
+    """
+
+    def __init__(self, root, segment_max_bytes=SEGMENT_MAX_BYTES, zstd_level=ZSTD_LEVEL):
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        self.zstd_level = zstd_level
+        os.makedirs(os.path.join(root, 'segments'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._readers = {}
+        self._compressor = zstandard.ZstdCompressor(level=zstd_level) if zstandard else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    # --- escrita -------------------------------------------------------------------------------------------
+
+    def _current_segment(self, incoming):
+        row = self._conn.execute("SELECT segment FROM blobs ORDER BY rowid DESC LIMIT 1").fetchone()
+        name = row[0] if row else 'segment_000001.pack'
+        path = os.path.join(self.root, 'segments', name)
+        if os.path.exists(path) and os.path.getsize(path) + incoming > self.segment_max_bytes:
+            numero = int(re.search(r'(\d+)', name).group(1)) + 1
+            name = f'segment_{numero:06d}.pack'
+        return name
+
+    def _compress(self, raw):
+        if self._compressor is not None:
+            return CODEC_ZSTD, self._compressor.compress(raw)
+        return CODEC_ZLIB, zlib.compress(raw, ZLIB_LEVEL)
+
+    def put(self, html, *, ticker, endpoint, url=None, fetched_at=None):
+        """Registra uma captura da página; o conteúdo só é gravado se ainda não estiver no arquivo. Retorna o hash."""
+        raw = html.encode('utf-8')
+        digest = hashlib.sha256(raw)
+        content_hash = digest.hexdigest()
+        fetched_at = (fetched_at or datetime.now()).isoformat(timespec='seconds')
+
+        with self._lock:
+            novo = self._conn.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone() is None
+            if novo:
+                codec, payload = self._compress(raw)
+                segment = self._current_segment(_HEADER_SIZE + len(payload))
+                path = os.path.join(self.root, 'segments', segment)
+                with open(path, 'ab') as f:
+                    offset = f.tell() + _HEADER_SIZE
+                    f.write(_MAGIC + bytes([codec]) + len(payload).to_bytes(4, 'big') + digest.digest() + payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._conn.execute("INSERT INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                                   (content_hash, segment, offset, len(payload), len(raw), codec))
+                metrics.inc('archive_bytes_raw', len(raw), endpoint=endpoint)
+                metrics.inc('archive_bytes_stored', len(payload), endpoint=endpoint)
+            else:
+                metrics.inc('archive_dedup_hits', endpoint=endpoint)
+            self._conn.execute("INSERT INTO snapshots (ticker, endpoint, url, fetched_at, content_hash) VALUES (?, ?, ?, ?, ?)",
+                               (ticker, endpoint, url, fetched_at, content_hash))
+            self._conn.commit()
+        return content_hash
+
+    # --- leitura -------------------------------------------------------------------------------------------
+
+    def _reader(self, segment):
+        handle = self._readers.get(segment)
+        if handle is None:
+            handle = self._readers[segment] = open(os.path.join(self.root, 'segments', segment), 'rb')
+        return handle
+
+    def get(self, content_hash, verify=False):
+        """HTML de um conteúdo do arquivo (KeyError se o hash não existir)."""
+        row = self._conn.execute("SELECT segment, offset, length, codec FROM blobs WHERE content_hash = ?",
+                                 (content_hash,)).fetchone()
+        if row is None:
+            raise KeyError(content_hash)
+        segment, offset, length, codec = row
+        with self._lock:
+            handle = self._reader(segment)
+            handle.seek(offset)
+            payload = handle.read(length)
+        if codec == CODEC_ZSTD:
+            if self._decompressor is None:
+                raise RuntimeError("Página comprimida com zstd: instale o pacote 'zstandard' para lê-la.")
+            raw = self._decompressor.decompress(payload)
+        else:
+            raw = zlib.decompress(payload)
+        if verify and hashlib.sha256(raw).hexdigest() != content_hash:
+            raise ValueError(f"Conteúdo corrompido no arquivo: {content_hash}")
+        return raw.decode('utf-8')
+
+    def snapshots(self, tickers=None, endpoint=None, since=None, until=None, latest_per_day=False):
+        """Capturas registradas (DataFrame), filtradas por tickers, endpoint e intervalo de datas (inclusivo)."""
+        query = "SELECT id, ticker, endpoint, url, fetched_at, content_hash FROM snapshots WHERE 1 = 1"
+        params = []
+        if tickers:
+            query += f" AND ticker IN ({','.join('?' * len(tickers))})"
+            params += list(tickers)
+        if endpoint:
+            query += " AND endpoint = ?"
+            params.append(endpoint)
+        if since:
+            query += " AND fetched_at >= ?"
+            params.append(pd.Timestamp(since).isoformat())
+        if until:
+            query += " AND fetched_at < ?"
+            params.append((pd.Timestamp(until) + pd.Timedelta(days=1)).normalize().isoformat())
+        df = pd.read_sql_query(query + " ORDER BY fetched_at, id", self._conn, params=params)
+        df['fetched_at'] = pd.to_datetime(df['fetched_at'])
+        if latest_per_day and not df.empty:
+            df = df.groupby([df['ticker'], df['fetched_at'].dt.date], sort=False).tail(1).reset_index(drop=True)
+        return df
+
+    def iter_pages(self, **filters):
+        """(captura, html) para cada captura de snapshots(**filters); conteúdos repetidos são lidos uma vez por sequência."""
+        ultimo_hash, ultimo_html = None, None
+        for snap in self.snapshots(**filters).itertuples(index=False):
+            if snap.content_hash != ultimo_hash:
+                ultimo_hash, ultimo_html = snap.content_hash, self.get(snap.content_hash)
+            yield snap, ultimo_html
+
+    def stats(self):
+        blobs, raw, stored = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(length), 0) FROM blobs").fetchone()
+        snapshots = self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+        segments = sorted(os.listdir(os.path.join(self.root, 'segments')))
+        return {
+            'snapshots': snapshots,
+            'conteudos_unicos': blobs,
+            'segmentos': len(segments),
+            'mb_html_unico': round(raw / 1024 / 1024, 1),
+            'mb_gravados': round(stored / 1024 / 1024, 1),
+            'taxa_compressao': round(raw / stored, 1) if stored else None,
+        }
+
+    # --- migração ------------------------------------------------------------------------------------------
+
+    def import_html_files(self, raw_pages_dir, remove=False):
+        """
+        Importa as páginas do formato antigo (raw_pages/<endpoint>/<ticker>_<YYYYmmdd_HHMMSS>.html).
+        Com remove=True, apaga cada arquivo depois de arquivado. Retorna quantas páginas foram importadas.
+        """
+        padrao = re.compile(r'^(?P<ticker>.+)_(?P<ts>\d{8}_\d{6})\.html$')
+        importadas = 0
+        for endpoint in sorted(os.listdir(raw_pages_dir)):
+            endpoint_dir = os.path.join(raw_pages_dir, endpoint)
+            if endpoint == os.path.basename(self.root) or not os.path.isdir(endpoint_dir):
+                continue
+            for filename in sorted(os.listdir(endpoint_dir)):
+                match = padrao.match(filename)
+                if not match:
+                    continue
+                filepath = os.path.join(endpoint_dir, filename)
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    html = f.read()
+                ticker = match.group('ticker').upper()
+                self.put(html, ticker=ticker, endpoint=endpoint,
+                         url=f"https://www.fundsexplorer.com.br/{endpoint}/{ticker.lower()}",
+                         fetched_at=datetime.strptime(match.group('ts'), '%Y%m%d_%H%M%S'))
+                importadas += 1
+                if remove:
+                    os.remove(filepath)
+        logger.info(f"{importadas} páginas importadas de {raw_pages_dir}.")
+        return importadas
+
+    def close(self):
+        with self._lock:
+            for handle in self._readers.values():
+                handle.close()
+            self._readers.clear()
+            self._conn.close()
+
+if __name__ == "__main__":
+    from src.config.logging_config import setup_logging
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Arquivo comprimido de páginas do Funds Explorer.")
+    parser.add_argument('acao', choices=['stats', 'migrate'])
+    parser.add_argument('--raw-pages', default="stock-market-etl/data/bronze/raw_pages",
+                        help="Diretório raw_pages (o arquivo fica em raw_pages/archive)")
+    parser.add_argument('--remove', action='store_true', help="migrate: apaga os .html depois de arquivados")
+    args = parser.parse_args()
+
+    archive = PageArchive(os.path.join(args.raw_pages, 'archive'))
+    if args.acao == 'migrate':
+        archive.import_html_files(args.raw_pages, remove=args.remove)
+    print(archive.stats())
+    archive.close()
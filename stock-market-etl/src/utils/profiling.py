@@ -0,0 +1,34 @@
+import os
+import sys
+from src.config.logging_config import get_logger
+
+# O profiler é compartilhado com a calculadora e os dashboards (analise_de_Indicadores/profiling.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from analise_de_Indicadores.profiling import profiler, profiled, PROFILE_ENV, PROFILE_DIR_ENV
+
+logger = get_logger(__name__)
+
+def add_profile_arguments(parser):
+    """Adiciona --profile/--profile-dir a um argparse.ArgumentParser."""
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Ativa o profiling dos caminhos quentes (equivale a {PROFILE_ENV}=1)")
+    parser.add_argument('--profile-dir', default=None,
+                        help=f"Diretório dos artefatos de profiling (padrão: ${PROFILE_DIR_ENV} ou ./profiles)")
+
+def configure_profiling(enabled=False, output_dir=None):
+    """Liga o profiling se pedido pela CLI (o ambiente já é tratado na importação do profiler)."""
+    if enabled or profiler.enabled:
+        run_dir = profiler.enable(output_dir)
+        logger.info(f"Profiling ativo. Artefatos em: {run_dir}")
+    return profiler.enabled
+
+def write_profile_report(top_n=25):
+    """Grava os .prof e o resumo top-N da execução; retorna o caminho do resumo."""
+    path = profiler.dump(top_n)
+    if path:
+        logger.info(f"Resumo do profiling salvo em: {path}")
+    return path
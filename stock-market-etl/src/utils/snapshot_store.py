@@ -0,0 +1,346 @@
+import os
+import re
+import sys
+import argparse
+import threading
+from datetime import datetime
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (engine do to_parquet/read_parquet)
+except ImportError:  # Sem pyarrow as partições são gravadas em pickle (tipadas, mas sem leitura por coluna)
+    pyarrow = None
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.config.logging_config import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Subdiretório do bronze com o histórico (data/bronze/indicadores_diarios)
+SNAPSHOT_STORE_DIR = 'indicadores_diarios'
+FORMATO = 'parquet' if pyarrow is not None else 'pkl'
+_PARTICAO = re.compile(r'^date=(\d{4}-\d{2}-\d{2})\.(parquet|pkl)$')
+
+# Colunas fixas de cada linha; as demais (preco_atual, p_vp, dy_12m...) são indicadores numéricos
+CHAVE = ['Ticker', 'timestamp']
+
+def _ler(path, columns=None):
+    """Lê uma partição; colunas pedidas que ela não tem (indicador novo) são ignoradas."""
+    if path.endswith('.parquet'):
+        if columns:
+            import pyarrow.parquet as pq
+            existentes = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in existentes]
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_pickle(path)
+    return df[[c for c in columns if c in df.columns]] if columns else df
+
+def _gravar(base_path, df):
+    """Grava base_path.<formato> de forma atômica e remove a versão no outro formato, se houver."""
+    path = f"{base_path}.{FORMATO}"
+    tmp_path = f"{path}.tmp"
+    if FORMATO == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    for ext in ('parquet', 'pkl'):
+        outro = f"{base_path}.{ext}"
+        if outro != path and os.path.exists(outro):
+            os.remove(outro)
+
+def tipar_indicadores(df):
+    """Ticker, timestamp (datetime) e indicadores numéricos (float); valores que não são números viram NaN."""
+    df = df.copy()
+    df['Ticker'] = df['Ticker'].astype(str).str.strip().str.upper()
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed', errors='coerce')
+    for col in df.columns.difference(CHAVE):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    return df.dropna(subset=['timestamp']).sort_values(CHAVE, kind='stable').reset_index(drop=True)
+
+def _compactar(novos, anteriores, colunas):
+    """
+    Linhas de `novos` cujo valor mudou em relação à captura anterior do mesmo ticker (a última de
+    `anteriores`, ou a linha anterior de `novos`). Capturas consecutivas iguais ficam só na primeira.
+    """
+    if novos.empty:
+        return novos
+    partes = [novos.assign(_anterior=False)]
+    if not anteriores.empty:
+        partes.insert(0, anteriores.assign(_anterior=True, timestamp=pd.to_datetime(anteriores['timestamp'])))
+    combinado = pd.concat(partes, ignore_index=True)
+    combinado = combinado.sort_values(CHAVE, kind='stable').reset_index(drop=True)
+    valores = combinado[colunas]
+    previos = valores.groupby(combinado['Ticker']).shift()
+    iguais = ((valores == previos) | (valores.isna() & previos.isna())).all(axis=1)
+    primeira = combinado['Ticker'] != combinado['Ticker'].shift()
+    manter = ~combinado['_anterior'] & (primeira | ~iguais)
+    return combinado.loc[manter].drop(columns='_anterior').reset_index(drop=True)
+
+class SnapshotStore:
+    """
+    Histórico tipado dos indicadores diários (funds_indicadores_diarios) em partições por data
+    (date=AAAA-MM-DD.parquet, ou .pkl sem pyarrow), compactado: uma captura só é gravada quando algum
+    valor do ticker mudou desde a anterior. O índice latest.* guarda, por ticker, o valor vigente, a
+    primeira e a última captura; as consultas as-of partem dele e só leem as partições necessárias.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._latest = None
+
+    # --- leitura -------------------------------------------------------------------------------------------
+
+    def _particoes(self):
+        """{data: caminho} das partições, em ordem de data."""
+        if not os.path.isdir(self.root):
+            return {}
+        particoes = {}
+        for name in os.listdir(self.root):
+            match = _PARTICAO.match(name)
+            if match:
+                particoes[pd.Timestamp(match.group(1))] = os.path.join(self.root, name)
+        return dict(sorted(particoes.items()))
+
+    def latest(self, tickers=None):
+        """Valor vigente de cada ticker (indexado por Ticker), com primeira_captura e ultima_captura."""
+        if self._latest is None:
+            path = next((os.path.join(self.root, f"latest.{ext}") for ext in ('parquet', 'pkl')
+                         if os.path.exists(os.path.join(self.root, f"latest.{ext}"))), None)
+            self._latest = _ler(path).set_index('Ticker') if path else pd.DataFrame()
+        if tickers is None or self._latest.empty:
+            return self._latest
+        return self._latest[self._latest.index.isin(set(tickers))]
+
+    def as_of(self, quando, columns=None, tickers=None):
+        """
+        Valores de cada ticker vigentes em `quando` (a última captura até esse momento; uma data sem hora
+        vale até o fim do dia). Ex.: store.as_of('2024-06-28', columns=['p_vp']) é o P/VP de todos os fundos
+        naquele dia. Tickers capturados pela primeira vez depois de `quando` ficam de fora.
+        """
+        quando = pd.Timestamp(quando)
+        fim = quando + pd.Timedelta(days=1) if quando == quando.normalize() else quando + pd.Timedelta(1, 'ns')
+        latest = self.latest(tickers)
+        if latest.empty:
+            return pd.DataFrame()
+        columns = list(columns) if columns else [c for c in latest.columns if c not in ('primeira_captura', 'ultima_captura')]
+        esperados = latest[latest['primeira_captura'] < fim]
+
+        # Tickers cujo valor vigente começou antes de `quando` saem direto do índice
+        valores = [c for c in columns if c != 'timestamp']
+        prontos = esperados[esperados['timestamp'] < fim]
+        partes = [prontos.reindex(columns=['timestamp', *valores]).reset_index()]
+        faltando = set(esperados.index) - set(prontos.index)
+
+        lidas = 0
+        for data, path in reversed(self._particoes().items()):
+            if not faltando:
+                break
+            if data >= fim:
+                continue
+            df = _ler(path, columns=CHAVE + valores)
+            lidas += 1
+            df = df[df['Ticker'].isin(faltando) & (df['timestamp'] < fim)]
+            if df.empty:
+                continue
+            df = df.drop_duplicates('Ticker', keep='last')
+            partes.append(df)
+            faltando -= set(df['Ticker'])
+        metrics.inc('snapshot_store_partitions_read', lidas)
+
+        resultado = pd.concat(partes, ignore_index=True).reindex(columns=CHAVE + valores)
+        return resultado.set_index('Ticker').sort_index()
+
+    def history(self, tickers=None, since=None, until=None, columns=None):
+        """Linhas gravadas (mudanças de valor) dos tickers no intervalo [since, until], em ordem de captura."""
+        inicio = pd.Timestamp(since).normalize() if since else None
+        fim = pd.Timestamp(until).normalize() + pd.Timedelta(days=1) if until else None
+        cols = ['Ticker', 'timestamp', *[c for c in (columns or []) if c not in CHAVE]] if columns else None
+        partes = []
+        for data, path in self._particoes().items():
+            if (inicio is not None and data < inicio) or (fim is not None and data >= fim):
+                continue
+            df = _ler(path, columns=cols)
+            if tickers:
+                df = df[df['Ticker'].isin(set(tickers))]
+            partes.append(df)
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(partes, ignore_index=True).sort_values(CHAVE, kind='stable').reset_index(drop=True)
+
+    def stats(self):
+        particoes = self._particoes()
+        linhas = sum(len(_ler(path, columns=['Ticker'])) for path in particoes.values())
+        latest = self.latest()
+        return {
+            'tickers': len(latest),
+            'particoes': len(particoes),
+            'linhas_gravadas': linhas,
+            'primeira_data': min(particoes).date().isoformat() if particoes else None,
+            'ultima_captura': latest['ultima_captura'].max().isoformat() if not latest.empty else None,
+            'mb_em_disco': round(sum(os.path.getsize(p) for p in particoes.values()) / 1024 / 1024, 2),
+        }
+
+    # --- escrita -------------------------------------------------------------------------------------------
+
+    def _gravar_linhas(self, df):
+        """Acrescenta linhas já compactadas às partições das suas datas."""
+        if df.empty:
+            return
+        particoes = self._particoes()
+        for data, grupo in df.groupby(df['timestamp'].dt.normalize()):
+            path = particoes.get(data)
+            if path:
+                grupo = pd.concat([_ler(path), grupo], ignore_index=True).sort_values(CHAVE, kind='stable')
+            _gravar(os.path.join(self.root, f"date={data.date().isoformat()}"), grupo.reset_index(drop=True))
+
+    def _gravar_latest(self, latest):
+        _gravar(os.path.join(self.root, 'latest'), latest.reset_index())
+        self._latest = latest
+
+    def append(self, df):
+        """
+        Acrescenta capturas novas (ex.: o funds_indicadores_diarios de um crawl). Capturas até a última já
+        registrada de cada ticker são ignoradas, então reenviar o mesmo lote não duplica nada.
+        Retorna quantas linhas foram gravadas depois da compactação.
+        """
+        if df.empty:
+            return 0
+        novos = tipar_indicadores(df)
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            latest = self.latest()
+            if not latest.empty:
+                ultima = novos['Ticker'].map(latest['ultima_captura'])
+                novos = novos[ultima.isna() | (novos['timestamp'] > ultima)]
+            if novos.empty:
+                return 0
+
+            # Último valor gravado de cada ticker: base da compactação das capturas novas
+            anteriores = pd.DataFrame(columns=CHAVE)
+            if not latest.empty:
+                anteriores = latest[latest.index.isin(set(novos['Ticker']))].reset_index()
+                anteriores = anteriores.drop(columns=['primeira_captura', 'ultima_captura'])
+            colunas = sorted(set(novos.columns).union(anteriores.columns).difference(CHAVE))
+            gravar = _compactar(novos.reindex(columns=CHAVE + colunas), anteriores.reindex(columns=CHAVE + colunas), colunas)
+            self._gravar_linhas(gravar)
+            self._gravar_latest(self._atualizar_latest(latest, novos, gravar))
+
+        metrics.inc('snapshot_store_rows_received', len(novos))
+        metrics.inc('snapshot_store_rows_written', len(gravar))
+        logger.info(f"Snapshots: {len(gravar)} de {len(novos)} capturas gravadas "
+                    f"({len(novos) - len(gravar)} iguais à anterior compactadas).")
+        return len(gravar)
+
+    def replace(self, df, tickers, since=None):
+        """
+        Troca o histórico dos tickers pelas capturas de df (ex.: a re-extração do arquivo de páginas sem
+        --until) a partir de `since`: uma data (desde o início do dia) ou um mapeamento Ticker -> momento.
+        Sem since, cada ticker é trocado a partir da sua primeira captura em df e tickers sem captura em df
+        ficam como estão; o histórico anterior (ex.: importado com `import --csv`) é sempre preservado.
+        """
+        novos = tipar_indicadores(df) if not df.empty else pd.DataFrame(columns=CHAVE)
+        inicios = self._inicios(novos, tickers, since)
+        if inicios.empty:
+            logger.info("Snapshots: nenhuma captura para regravar.")
+            return 0
+        tickers = set(inicios.index)
+        novos = novos[novos['timestamp'] >= novos['Ticker'].map(inicios)]
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            # Valor vigente de cada ticker logo antes do seu início: base da compactação das capturas novas
+            antes = [self.as_of(inicio - pd.Timedelta(1, 'ns'), tickers=grupo.index)
+                     for inicio, grupo in inicios.groupby(inicios)]
+            antes = [a for a in antes if not a.empty]
+            anteriores = pd.concat(antes).reset_index() if antes else pd.DataFrame(columns=CHAVE)
+
+            primeira_particao = inicios.min().normalize()
+            for data, path in self._particoes().items():
+                if data < primeira_particao:
+                    continue
+                existente = _ler(path)
+                remover = existente['timestamp'] >= existente['Ticker'].map(inicios)
+                if not remover.any():
+                    continue
+                manter = existente[~remover]
+                if manter.empty:
+                    os.remove(path)
+                else:
+                    _gravar(path.rsplit('.', 1)[0], manter.reset_index(drop=True))
+
+            colunas = sorted(set(novos.columns).union(anteriores.columns).difference(CHAVE))
+            gravar = _compactar(novos.reindex(columns=CHAVE + colunas), anteriores.reindex(columns=CHAVE + colunas), colunas)
+            self._gravar_linhas(gravar)
+
+            latest = self.latest()
+            removidos = latest[latest.index.isin(tickers)]
+            latest = latest[~latest.index.isin(tickers)]
+            if not anteriores.empty:
+                base = anteriores.set_index('Ticker')
+                base['primeira_captura'] = removidos['primeira_captura']
+                base['ultima_captura'] = base['timestamp']
+                latest = pd.concat([latest, base])
+            self._gravar_latest(self._atualizar_latest(latest, novos, gravar))
+
+        logger.info(f"Snapshots: histórico de {len(tickers)} tickers regravado a partir de {inicios.min().date()} "
+                    f"({len(gravar)} de {len(novos)} capturas).")
+        return len(gravar)
+
+    @staticmethod
+    def _inicios(novos, tickers, since):
+        """Momento (Series Ticker -> Timestamp) a partir do qual o histórico de cada ticker é trocado."""
+        tickers = sorted({str(t).strip().upper() for t in tickers})
+        primeiras = novos.groupby('Ticker')['timestamp'].min().reindex(tickers)
+        if since is None:
+            inicios = primeiras
+        elif isinstance(since, (dict, pd.Series)):
+            mapa = pd.Series(since)
+            mapa.index = mapa.index.astype(str).str.strip().str.upper()
+            inicios = pd.to_datetime(mapa).reindex(tickers).fillna(primeiras)
+        else:
+            inicios = pd.Series(pd.Timestamp(since).normalize(), index=tickers)
+        return inicios.dropna().rename_axis('Ticker')
+
+    @staticmethod
+    def _atualizar_latest(latest, novos, gravados):
+        """Índice latest depois de receber as capturas `novos`, das quais `gravados` mudaram de valor."""
+        if not gravados.empty:
+            vigentes = gravados.drop_duplicates('Ticker', keep='last').set_index('Ticker')
+            if not latest.empty:
+                vigentes = vigentes.join(latest[['primeira_captura', 'ultima_captura']])
+            latest = pd.concat([latest[~latest.index.isin(vigentes.index)], vigentes]) if not latest.empty else vigentes
+        if latest.empty:
+            return latest
+
+        capturas = novos.groupby('Ticker')['timestamp'].agg(['min', 'max']).reindex(latest.index)
+        latest = latest.reindex(columns=latest.columns.union(['primeira_captura', 'ultima_captura'], sort=False))
+        primeira = pd.to_datetime(latest['primeira_captura'])
+        ultima = pd.to_datetime(latest['ultima_captura'])
+        latest['primeira_captura'] = primeira.where(primeira <= capturas['min'], capturas['min']).fillna(primeira)
+        latest['ultima_captura'] = ultima.where(ultima >= capturas['max'], capturas['max']).fillna(ultima)
+        latest.index.name = 'Ticker'
+        return latest.sort_index()
+
+if __name__ == "__main__":
+    from src.config.logging_config import setup_logging
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Histórico compactado dos indicadores diários dos fundos.")
+    parser.add_argument('acao', choices=['stats', 'as-of', 'import'])
+    parser.add_argument('--root', default="stock-market-etl/data/bronze/indicadores_diarios")
+    parser.add_argument('--date', help="as-of: data (AAAA-MM-DD) ou momento da consulta")
+    parser.add_argument('--columns', help="as-of: colunas separadas por vírgula (ex.: p_vp,dy_12m)")
+    parser.add_argument('--csv', default="stock-market-etl/data/bronze/funds_indicadores_diarios.csv",
+                        help="import: CSV (ou exportação da tabela do banco) com o histórico a acrescentar")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    if args.acao == 'import':
+        store.append(pd.read_csv(args.csv))
+    elif args.acao == 'as-of':
+        print(store.as_of(args.date or datetime.now(), columns=args.columns.split(',') if args.columns else None))
+    print(store.stats())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Os testes importam src.* (diretório do ETL) e analise_de_Indicadores.* (raiz do projeto), como o ETL em execução
+ETL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ROOT = os.path.dirname(ETL_DIR)
+for path in (ETL_DIR, PROJECT_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,70 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from analise_de_Indicadores.backtest import Backtester, VP_PUBLICATION_LAG
+
+MESES = pd.date_range('2024-01-31', periods=4, freq='ME')
+
+def _matrices(close, p_vp, dividend=None):
+    close = pd.DataFrame(close, index=MESES)
+    vazio = pd.DataFrame(np.nan, index=close.index, columns=close.columns)
+    return {
+        'Close': close,
+        'Dividend': pd.DataFrame(dividend, index=MESES) if dividend else vazio,
+        'P_VP': pd.DataFrame(p_vp, index=MESES),
+        'DY_12M': vazio,
+        'Liquidez': vazio.fillna(1e6),
+    }
+
+def test_compra_o_menor_p_vp_e_reinveste_proventos():
+    bt = Backtester(matrices=_matrices(
+        close={'AAAA11': [10.0, 11.0, 11.0, 12.1], 'BBBB11': [20.0, 20.0, 18.0, 18.0]},
+        p_vp={'AAAA11': [0.8, 0.8, 1.2, 1.2], 'BBBB11': [1.0, 1.0, 0.9, 0.9]},
+        dividend={'AAAA11': [0.0, 0.0, 0.5, 0.0], 'BBBB11': [0.0, 0.0, 0.0, 0.2]},
+    ))
+    resultado = bt.run({'signal': 'P_VP', 'ascending': True, 'top_n': 1})
+
+    # Pesos de jan e fev valem em fev e mar (AAAA11); o de mar vale em abr (BBBB11)
+    esperado = [11.0 / 10.0 - 1, (11.0 + 0.5) / 11.0 - 1, (18.0 + 0.2) / 18.0 - 1]
+    assert resultado['returns'].tolist() == pytest.approx(esperado)
+    assert resultado['equity'].iloc[-1] == pytest.approx(np.prod([1 + r for r in esperado]))
+
+def test_custo_incide_sobre_o_giro():
+    matrices = _matrices(
+        close={'AAAA11': [10.0, 11.0, 11.0, 12.1], 'BBBB11': [20.0, 20.0, 18.0, 18.0]},
+        p_vp={'AAAA11': [0.8, 0.8, 1.2, 1.2], 'BBBB11': [1.0, 1.0, 0.9, 0.9]},
+    )
+    sem_custo = Backtester(matrices=matrices).run({'top_n': 1})['returns']
+    com_custo = Backtester(matrices=matrices).run({'top_n': 1, 'cost_bps': 100})['returns']
+    # Giro = metade da soma das variações de peso: compra inicial (0,5) cobrada em fev e troca total
+    # da carteira no fechamento de mar (1,0) cobrada em abr
+    assert (sem_custo - com_custo).tolist() == pytest.approx([0.005, 0.0, 0.01])
+
+def test_sharpe_e_excesso_de_retorno_mensal_anualizado():
+    retornos = pd.Series([0.02, -0.01, 0.03, 0.01])
+    equity = (1 + retornos).cumprod()
+    giro = pd.Series(0.0, index=retornos.index)
+
+    stats = Backtester._stats(retornos, equity, giro, risk_free=0.10)
+
+    excesso = retornos - (1.10 ** (1 / 12) - 1)
+    assert stats['sharpe'] == pytest.approx(excesso.mean() / retornos.std() * math.sqrt(12))
+    assert stats['volatilidade'] == pytest.approx(retornos.std() * math.sqrt(12))
+    assert Backtester._stats(retornos, equity, giro)['sharpe'] == pytest.approx(
+        retornos.mean() / retornos.std() * math.sqrt(12))
+
+def test_p_vp_point_in_time_espera_a_divulgacao_e_nao_usa_vp_atual():
+    meses = pd.date_range('2024-03-31', periods=4, freq='ME')
+    precos = pd.DataFrame({'Ticker': ['AAAA11'] * 4 + ['BBBB11'] * 4, 'Date': list(meses) * 2,
+                           'Close': [9.0, 10.0, 11.0, 12.0, 20.0, 20.0, 20.0, 20.0]})
+    # Relatório do 4T2023 (divulgado em fev) e do 1T2024 (referência 31/03, divulgado ~15/05); BBBB11 sem histórico
+    eventos = pd.DataFrame({'Ticker': ['AAAA11', 'AAAA11'], 'Date': pd.to_datetime(['2023-12-31', '2024-03-31']),
+                            'VP_Cota': [9.0, 10.0], 'VP_Source': 'oceans14'})
+
+    p_vp = Backtester._point_in_time_pvp(precos, eventos)
+
+    assert VP_PUBLICATION_LAG == pd.Timedelta(days=45)
+    # Mar e abr ainda usam o VP do 4T2023; o do 1T2024 só vale a partir de mai
+    assert p_vp['AAAA11'].tolist() == pytest.approx([9.0 / 9.0, 10.0 / 9.0, 11.0 / 10.0, 12.0 / 10.0])
+    assert 'BBBB11' not in p_vp.columns or p_vp['BBBB11'].isna().all()
@@ -0,0 +1,108 @@
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+from src.extract.historical_indicators import HistoricalIndicatorsExtractor
+
+class StubTicker:
+    """Imita o yf.Ticker: balanço com as contas nas linhas e as datas dos relatórios nas colunas."""
+
+    def __init__(self, reports):
+        self.quarterly_balance_sheet = pd.DataFrame(
+            {pd.Timestamp(data): {'Stockholders Equity': pl, 'Share Issued': cotas} for data, (pl, cotas) in reports.items()})
+        self.balance_sheet = pd.DataFrame()
+        self.info = {}
+
+class StubFactory:
+    """ticker_factory que devolve os balanços configurados em `reports` e registra os símbolos consultados."""
+
+    def __init__(self, reports):
+        self.reports = reports
+        self.chamadas = []
+
+    def __call__(self, symbol):
+        self.chamadas.append(symbol)
+        return StubTicker(self.reports[symbol.removesuffix('.SA')])
+
+def _extractor(tmp_path, factory):
+    return HistoricalIndicatorsExtractor(str(tmp_path), ticker_factory=factory, max_workers=2)
+
+def _csv(tmp_path):
+    return pd.read_csv(os.path.join(tmp_path, 'yahoo_historical_indicators.csv'))
+
+def test_needs_refresh_pula_consulta_recente_e_relatorio_recente(tmp_path):
+    agora = datetime(2024, 6, 30)
+    extractor = _extractor(tmp_path, StubFactory({}))
+    extractor.cache = {
+        # Consultado há 2 dias: não consulta mesmo com relatório antigo
+        'AAAA11': {'fetched_at': (agora - timedelta(days=2)).isoformat(), 'reports': {'2023-06-30': {}}},
+        # Último relatório há 91 dias: ainda dentro do trimestre
+        'BBBB11': {'fetched_at': (agora - timedelta(days=30)).isoformat(), 'reports': {'2024-03-31': {}}},
+        # Último relatório com mais de um trimestre e consulta antiga: vencido
+        'CCCC11': {'fetched_at': (agora - timedelta(days=30)).isoformat(), 'reports': {'2023-12-31': {}}},
+        # Consulta antiga sem nenhum relatório
+        'DDDD11': {'fetched_at': (agora - timedelta(days=30)).isoformat(), 'reports': {}},
+    }
+
+    assert not extractor.needs_refresh('AAAA11', now=agora)
+    assert not extractor.needs_refresh('BBBB11', now=agora)
+    assert extractor.needs_refresh('CCCC11', now=agora)
+    assert extractor.needs_refresh('DDDD11', now=agora)
+    assert extractor.needs_refresh('EEEE11', now=agora)
+
+def test_process_tickers_so_consulta_vencidos(tmp_path):
+    factory = StubFactory({'AAAA11': {'2024-03-31': (1000.0, 10.0)}, 'BBBB11': {'2024-03-31': (2000.0, 10.0)}})
+    extractor = _extractor(tmp_path, factory)
+    extractor.cache = {'AAAA11': {'fetched_at': datetime.now().isoformat(timespec='seconds'),
+                                  'reports': {'2024-03-31': {'Patrimonio_Liquido': 900.0, 'Cotas': 10.0, 'VP_Cota': 90.0}}}}
+
+    extractor.process_tickers(['AAAA11', 'BBBB11'])
+
+    assert factory.chamadas == ['BBBB11.SA']
+    df = _csv(tmp_path).set_index('Ticker')
+    assert df.loc['AAAA11', 'VP_Cota'] == 90.0
+    assert df.loc['BBBB11', 'VP_Cota'] == 200.0
+
+def test_relatorios_se_acumulam_entre_execucoes(tmp_path):
+    factory = StubFactory({'AAAA11': {'2023-12-31': (1000.0, 10.0), '2024-03-31': (1100.0, 10.0)}})
+    _extractor(tmp_path, factory).process_tickers(['AAAA11'])
+
+    # O Yahoo só devolve os últimos trimestres: o de dez/2023 some, o de mar/2024 é revisado
+    factory.reports = {'AAAA11': {'2024-03-31': (1200.0, 10.0), '2024-06-30': (1300.0, 10.0)}}
+    extractor = _extractor(tmp_path, factory)
+    extractor.process_tickers(['AAAA11'], force=True)
+
+    reports = extractor.cache['AAAA11']['reports']
+    assert sorted(reports) == ['2023-12-31', '2024-03-31', '2024-06-30']
+    assert reports['2024-03-31']['VP_Cota'] == 120.0
+    df = _csv(tmp_path)
+    assert list(df['Date']) == ['2023-12-31', '2024-03-31', '2024-06-30']
+    assert list(df['VP_Cota']) == [100.0, 120.0, 130.0]
+    # O cache gravado em disco tem o mesmo histórico
+    assert _extractor(tmp_path, factory).cache['AAAA11']['reports'] == reports
+
+def test_merge_troca_so_as_linhas_dos_tickers_processados(tmp_path):
+    pd.DataFrame({
+        'Date': ['2023-12-31', '2023-12-31', '2024-03-31'],
+        'Patrimonio_Liquido': [500.0, 700.0, 800.0],
+        'Ticker': ['AAAA11', 'ZZZZ11', 'ZZZZ11'],
+        'Cotas': [10.0, 10.0, 10.0],
+        'VP_Cota': [50.0, 70.0, 80.0],
+    }).to_csv(os.path.join(tmp_path, 'yahoo_historical_indicators.csv'), index=False)
+
+    factory = StubFactory({'AAAA11': {'2024-03-31': (1000.0, 10.0)}})
+    _extractor(tmp_path, factory).process_tickers(['AAAA11'], merge=True)
+
+    df = _csv(tmp_path)
+    assert df.loc[df['Ticker'] == 'ZZZZ11', 'VP_Cota'].tolist() == [70.0, 80.0]
+    aaaa = df[df['Ticker'] == 'AAAA11']
+    assert pd.to_datetime(aaaa['Date'], format='mixed').tolist() == [pd.Timestamp('2024-03-31')]
+    assert aaaa['VP_Cota'].tolist() == [100.0]
+
+def test_sem_merge_regrava_o_arquivo(tmp_path):
+    pd.DataFrame({'Date': ['2023-12-31'], 'Patrimonio_Liquido': [700.0], 'Ticker': ['ZZZZ11'],
+                  'Cotas': [10.0], 'VP_Cota': [70.0]}).to_csv(
+        os.path.join(tmp_path, 'yahoo_historical_indicators.csv'), index=False)
+
+    _extractor(tmp_path, StubFactory({'AAAA11': {'2024-03-31': (1000.0, 10.0)}})).process_tickers(['AAAA11'])
+
+    assert _csv(tmp_path)['Ticker'].tolist() == ['AAAA11']
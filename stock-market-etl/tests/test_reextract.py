@@ -0,0 +1,52 @@
+import os
+import re
+from datetime import datetime
+import pandas as pd
+from benchmarks.fixtures import make_fund_page
+from src.utils.page_archive import PageArchive
+from src.extract.reextract import reextract
+
+def _arquivar(bronze_dir, paginas):
+    """Grava no arquivo de páginas do bronze as capturas [(ticker, fetched_at, html)]."""
+    archive = PageArchive(os.path.join(bronze_dir, 'raw_pages', 'archive'))
+    for ticker, fetched_at, html in paginas:
+        archive.put(html, ticker=ticker, endpoint='funds', fetched_at=fetched_at)
+    archive.close()
+
+def _rendimentos(bronze_dir):
+    return pd.read_csv(os.path.join(bronze_dir, 'funds_rendimentos.csv'))
+
+def test_until_nao_volta_o_estado_atual_para_uma_pagina_antiga(tmp_path):
+    bronze_dir = str(tmp_path)
+    _arquivar(bronze_dir, [
+        ('AAAA11', datetime(2024, 1, 15, 18), make_fund_page('AAAA11', n_dividends=5)),
+        ('AAAA11', datetime(2024, 6, 15, 18), make_fund_page('AAAA11', n_dividends=20)),
+    ])
+    reextract(bronze_dir, workers=1)
+    assert len(_rendimentos(bronze_dir)) == 20
+
+    totais = reextract(bronze_dir, until='2024-02-01', workers=1)
+
+    assert set(totais) == {'funds_indicadores_diarios'}
+    assert len(_rendimentos(bronze_dir)) == 20
+    historico = pd.read_csv(os.path.join(bronze_dir, 'funds_indicadores_diarios.csv'))
+    assert pd.to_datetime(historico['timestamp']).dt.month.tolist() == [1, 6]
+
+def test_ticker_sem_tabela_na_pagina_mantem_as_linhas_do_crawl(tmp_path):
+    bronze_dir = str(tmp_path)
+    # Rendimentos do BBBB11 vieram da página antiga (get_rendimentos_old), que não é arquivada
+    pd.DataFrame({'Ticker': ['BBBB11'] * 3, 'Data Base': ['01/01/2024', '01/02/2024', '01/03/2024'],
+                  'Valor': ['0,90'] * 3}).to_csv(os.path.join(bronze_dir, 'funds_rendimentos.csv'), index=False)
+    sem_tabela = re.sub(r'<table>.*?</table>', '', make_fund_page('BBBB11'), flags=re.S)
+    _arquivar(bronze_dir, [
+        ('AAAA11', datetime(2024, 6, 15, 18), make_fund_page('AAAA11', n_dividends=12)),
+        ('BBBB11', datetime(2024, 6, 15, 18), sem_tabela),
+    ])
+
+    reextract(bronze_dir, workers=1)
+
+    rendimentos = _rendimentos(bronze_dir)
+    assert (rendimentos['Ticker'] == 'BBBB11').sum() == 3
+    assert (rendimentos['Ticker'] == 'AAAA11').sum() == 12
+    info = pd.read_csv(os.path.join(bronze_dir, 'funds_info_completa.csv'))
+    assert set(info['Ticker']) == {'AAAA11', 'BBBB11'}
@@ -0,0 +1,60 @@
+import pandas as pd
+from src.utils.snapshot_store import SnapshotStore
+from src.extract.reextract import _history_outside_window
+
+def _capturas(ticker, datas, p_vp):
+    return pd.DataFrame({'Ticker': ticker, 'timestamp': pd.to_datetime(datas), 'p_vp': p_vp})
+
+def test_replace_sem_since_preserva_historico_anterior_ao_arquivo(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'indicadores_diarios'))
+    # Histórico importado (import --csv) antes de existir o arquivo de páginas
+    store.append(pd.concat([
+        _capturas('AAAA11', ['2024-01-10 18:00', '2024-02-10 18:00', '2024-03-10 18:00'], [0.90, 0.95, 1.00]),
+        _capturas('BBBB11', ['2024-01-10 18:00', '2024-03-10 18:00'], [1.10, 1.20]),
+    ]))
+
+    # Re-extração sem --since: o arquivo só tem capturas a partir de março
+    reextraido = pd.concat([
+        _capturas('AAAA11', ['2024-03-10 18:00', '2024-03-11 18:00'], [1.01, 1.02]),
+        _capturas('BBBB11', ['2024-03-15 18:00'], [1.25]),
+    ])
+    store.replace(reextraido, ['AAAA11', 'BBBB11', 'CCCC11'])
+
+    fevereiro = store.as_of('2024-02-28', columns=['p_vp'])
+    assert fevereiro.loc['AAAA11', 'p_vp'] == 0.95
+    assert fevereiro.loc['BBBB11', 'p_vp'] == 1.10
+    assert store.as_of('2024-03-12', columns=['p_vp']).loc['AAAA11', 'p_vp'] == 1.02
+    # Cada ticker é trocado a partir da sua primeira captura arquivada: a de 10/03 do BBBB11 é anterior
+    assert store.as_of('2024-03-12', columns=['p_vp']).loc['BBBB11', 'p_vp'] == 1.20
+    assert store.as_of('2024-03-15', columns=['p_vp']).loc['BBBB11', 'p_vp'] == 1.25
+
+    latest = store.latest()
+    assert latest.loc['AAAA11', 'primeira_captura'] == pd.Timestamp('2024-01-10 18:00')
+    assert latest.loc['BBBB11', 'p_vp'] == 1.25
+    assert list(store.history(tickers=['AAAA11'])['p_vp']) == [0.90, 0.95, 1.01, 1.02]
+
+    # O estado em disco é o mesmo que um store novo relê
+    relido = SnapshotStore(store.root)
+    pd.testing.assert_frame_equal(relido.as_of('2024-02-28', columns=['p_vp']), fevereiro)
+
+def test_replace_com_since_troca_a_partir_da_data(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'indicadores_diarios'))
+    store.append(_capturas('AAAA11', ['2024-01-10', '2024-02-10', '2024-03-10'], [0.90, 0.95, 1.00]))
+
+    store.replace(_capturas('AAAA11', ['2024-02-10 09:00'], [0.97]), ['AAAA11'], since='2024-02-10')
+
+    assert list(store.history(tickers=['AAAA11'])['p_vp']) == [0.90, 0.97]
+    assert store.as_of('2024-03-31', columns=['p_vp']).loc['AAAA11', 'p_vp'] == 0.97
+
+def test_history_outside_window_por_ticker(tmp_path):
+    path = tmp_path / 'funds_indicadores_diarios.csv'
+    pd.DataFrame({
+        'Ticker': ['AAAA11', 'AAAA11', 'BBBB11', 'BBBB11'],
+        'timestamp': ['2024-01-10 18:00:00', '2024-03-10 18:00:00', '2024-01-10 18:00:00', '2024-03-20 18:00:00'],
+        'p_vp': [0.9, 1.0, 1.1, 1.2],
+    }).to_csv(path, index=False)
+    inicio = pd.Series(pd.to_datetime(['2024-03-10 18:00', '2024-03-15 18:00']), index=['AAAA11', 'BBBB11'])
+
+    fora = _history_outside_window(str(path), ['AAAA11', 'BBBB11'], inicio, None)
+
+    assert list(zip(fora['Ticker'], fora['p_vp'])) == [('AAAA11', 0.9), ('BBBB11', 1.1)]